@@ -0,0 +1,463 @@
+import ast
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from collections import Counter
+from datetime import date
+from functools import partial
+from itertools import accumulate, compress
+from operator import attrgetter, ge, le, not_
+from Series import Series
+from SeriesCollection import index_key
+from SeriesStore import date_to_ordinal
+from RecordFile import is_record_file
+from Storage import is_sqlite_file
+from FileLock import get_lock
+from Journal import get_journal
+from Snapshot import load_snapshot
+
+# Aggregations and columnar export of the series catalogue for reporting.
+#
+# The catalogue is first turned into columns (CatalogueColumns): ID, Season, PosFile and Erased
+# as int64/int8 arrays, DateCreation as date ordinals, Director as codes into the list of
+# distinct directors, and Name. A SeriesStore already has this layout and is used as it is;
+# a list of Series is converted once. Filters and counts then run over whole columns: with
+# NumPy when it is installed (boolean masks and unique), otherwise with map/compress and
+# Counter, which iterate in C (each filter only reads the rows that passed the previous ones).
+# Both give the same results.
+#
+# Export writes one .npy file per column into a directory, plus meta.json (row count, the
+# distinct directors and the DateCreation values that are not dates). The files are written
+# without NumPy, and load_columns maps them back with mmap without copying them (numpy.load
+# with mmap_mode='r' reads them too). Parquet is written instead when pyarrow is installed
+# and asked for.
+
+# NumPy and pyarrow are optional. They are imported on first use only (None = not tried yet,
+# False = not installed), like pandas in SerializeFile.
+numpy_module = None
+pyarrow_module = None
+
+def load_numpy():
+    global numpy_module
+    if numpy_module is None:
+        try:
+            import numpy
+            numpy_module = numpy
+        except ImportError:
+            numpy_module = False
+    return numpy_module or None
+
+def load_pyarrow():
+    global pyarrow_module
+    if pyarrow_module is None:
+        try:
+            import pyarrow
+            import pyarrow.parquet
+            pyarrow_module = pyarrow
+        except ImportError:
+            pyarrow_module = False
+    return pyarrow_module or None
+
+COLUMNS_VERSION = 1
+META_FILE = 'meta.json'
+# .npy type descriptions of the array typecodes used by the columns
+NPY_TYPES = {'q': '<i8', 'i': '<i4', 'b': '|i1', 'B': '|u1'}
+NPY_MAGIC = b'\x93NUMPY\x01\x00'
+# Numeric columns: file name, attribute and array typecode
+NUMERIC_COLUMNS = (('ID', 'ids', 'q'), ('DateCreation', 'dates', 'i'), ('Season', 'seasons', 'q'),
+                   ('Director', 'director_codes', 'i'), ('PosFile', 'positions', 'q'), ('Erased', 'erased', 'b'))
+# Date ordinal of the Unix epoch (Parquet dates count days from it)
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+# Name column of an exported catalogue: the UTF-8 names one after the other and the offset
+# where each one starts; names are decoded when they are read
+class TextColumn:
+    def __init__(self, data, offsets):
+        self.data = data
+        self.offsets = offsets
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, row):
+        return bytes(self.data[self.offsets[row]:self.offsets[row + 1]]).decode('utf-8')
+
+    def __iter__(self):
+        for row in range(len(self)):
+            yield self[row]
+
+# Columns of a catalogue. Numeric columns are arrays or memoryviews (anything with the buffer
+# protocol); dates are ordinals, 0 when the value is not a date (kept verbatim in raw_dates).
+class CatalogueColumns:
+    def __init__(self, ids, names, dates, seasons, director_codes, directors, positions, erased,
+                 raw_dates=None, maps=()):
+        self.ids = ids
+        self.names = names
+        self.dates = dates
+        self.seasons = seasons
+        self.director_codes = director_codes
+        self.directors = directors
+        self.positions = positions
+        self.erased = erased
+        self.raw_dates = raw_dates or {}
+        # Memory maps and views of loaded columns, released by close()
+        self.maps = list(maps)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # Method to release the memory maps of loaded columns (NumPy arrays made from them must be
+    # gone first)
+    def close(self):
+        close_maps(self.maps)
+        self.maps = []
+
+# Function to convert a column of numbers typed in the GUI (strings until the file is read again)
+def number_column(typecode, values, heading):
+    try:
+        return array(typecode, map(index_key, values))
+    except (TypeError, OverflowError):
+        raise ValueError(f"The column {heading} has values that are not numbers.")
+
+# Function to get the columns of a catalogue from its values, column by column in
+# Series.headings order (lists or iterables). DateCreation is converted once per distinct value.
+def columns_from_lists(ids, names, dates, seasons, directors, positions, erased):
+    ids = number_column('q', ids, 'ID')
+    seasons = number_column('q', seasons, 'Season')
+    positions = number_column('q', positions, 'PosFile')
+    erased = number_column('b', erased, 'Erased')
+
+    date_values = list(map(str, dates))
+    ordinals = {value: date_to_ordinal(value) for value in set(date_values)}
+    dates = array('i', map(ordinals.__getitem__, date_values))
+    raw_dates = {row: value for row, value in enumerate(date_values) if not ordinals[value]}
+
+    director_values = list(map(str, directors))
+    directors = list(dict.fromkeys(director_values))
+    codes = {director: code for code, director in enumerate(directors)}
+    director_codes = array('i', map(codes.__getitem__, director_values))
+    names = list(map(str, names))
+    return CatalogueColumns(ids, names, dates, seasons, director_codes, directors, positions, erased, raw_dates)
+
+# Function to get the columns of a list of series (a SeriesCollection, a list of Series); each
+# attribute is read with one map() over the list
+def columns_from_series(series_list):
+    items = list(series_list)
+    return columns_from_lists(*(map(attrgetter(field), items) for field in
+                                ('ID', 'name', 'datecreation', 'season', 'director', 'posFile', 'erased')))
+
+# Function to get the columns of a SeriesStore (its arrays are used as they are, not copied)
+def columns_from_store(store):
+    return CatalogueColumns(store.ids, store.names, store.dates, store.seasons, store.director_codes,
+                            store.directors, store.positions, store.erased, store.raw_dates)
+
+# Function to read the columns of a series file without a Series object per row. A CSV file is
+# read from its snapshot (see Snapshot), or into a SeriesStore when there is no valid snapshot,
+# with the pending journal records applied in memory (a read never rewrites the file); record
+# and SQLite files are loaded and converted.
+def read_catalogue_columns(file):
+    # Imported here: they import the storage backends, which plain column files do not need
+    from SerializeFile import read_series_store
+    from SeriesEngine import load_series
+    if is_record_file(file) or is_sqlite_file(file):
+        return columns_from_series(load_series(file))
+    with get_lock(file).shared():
+        snapshot = load_snapshot(file)
+        if snapshot is None:
+            return columns_from_store(read_series_store(file, use_pandas=False))
+        journal = get_journal(file)
+        if journal.size():
+            rows = journal.merge_rows(zip(*snapshot))
+            snapshot = list(zip(*rows)) if rows else [[] for _ in Series.headings]
+    return columns_from_lists(*snapshot)
+
+# Function to get the date ordinals of the first and last day of a range given as DD/MM/YYYY
+# dates and/or years (None leaves that side open)
+def ordinal_range(date_from=None, date_to=None, year_from=None, year_to=None):
+    low = high = None
+    if date_from or date_to:
+        low = date_to_ordinal(date_from) if date_from else None
+        high = date_to_ordinal(date_to) if date_to else None
+        if (date_from and not low) or (date_to and not high):
+            raise ValueError("Invalid date format. It must be in DD/MM/YYYY format.")
+    try:
+        if year_from is not None:
+            low = max(low or 0, date(int(year_from), 1, 1).toordinal())
+        if year_to is not None:
+            last = date(int(year_to), 12, 31).toordinal()
+            high = last if high is None else min(high, last)
+    except ValueError:
+        raise ValueError("Invalid year. It must be a number between 1 and 9999.")
+    return low, high
+
+# Filters of the aggregations (every given one must match):
+#   director                  a director or a list of directors
+#   season_min, season_max    Season range (inclusive)
+#   date_from, date_to        DateCreation range (DD/MM/YYYY, inclusive)
+#   year_from, year_to        DateCreation years (inclusive)
+#   include_erased            also count erased series (skipped by default)
+class CatalogueFilter:
+    def __init__(self, director=None, season_min=None, season_max=None, date_from=None, date_to=None,
+                 year_from=None, year_to=None, include_erased=False):
+        if isinstance(director, str):
+            director = [director]
+        self.directors = None if director is None else set(director)
+        self.season_min = None if season_min is None else int(season_min)
+        self.season_max = None if season_max is None else int(season_max)
+        self.date_low, self.date_high = ordinal_range(date_from, date_to, year_from, year_to)
+        if self.date_high is not None and self.date_low is None:
+            # Values that are not dates (ordinal 0) never match a date filter
+            self.date_low = 1
+        self.include_erased = include_erased
+
+    # Method to check if every row matches
+    def is_empty(self):
+        return (self.include_erased and self.directors is None and self.season_min is None
+                and self.season_max is None and self.date_low is None)
+
+    # Method to get the director codes of a catalogue selected by the filter
+    def director_codes(self, columns):
+        return [code for code, director in enumerate(columns.directors) if director in self.directors]
+
+    # Method to get the tests of the filter as (column, predicate) pairs, the most selective first
+    def python_tests(self, columns):
+        tests = []
+        if self.directors is not None:
+            tests.append((columns.director_codes, set(self.director_codes(columns)).__contains__))
+        if self.date_low is not None:
+            tests.append((columns.dates, partial(le, self.date_low)))
+        if self.date_high is not None:
+            tests.append((columns.dates, partial(ge, self.date_high)))
+        if self.season_min is not None:
+            tests.append((columns.seasons, partial(le, self.season_min)))
+        if self.season_max is not None:
+            tests.append((columns.seasons, partial(ge, self.season_max)))
+        # Most catalogues have no erased series: checking that once is cheaper than testing each row
+        if not self.include_erased and any(columns.erased):
+            tests.append((columns.erased, not_))
+        return tests
+
+    # Method to get the numbers of the selected rows (None when every row matches). Each test
+    # only reads the rows that passed the previous ones.
+    def python_rows(self, columns):
+        rows = None
+        for values, test in self.python_tests(columns):
+            if rows is None:
+                rows = list(compress(range(len(values)), map(test, values)))
+            else:
+                rows = list(compress(rows, map(test, map(values.__getitem__, rows))))
+        return rows
+
+    # Method to get the selected rows as a NumPy boolean array (None when every row matches)
+    def numpy_mask(self, columns, np):
+        if self.is_empty():
+            return None
+        mask = np.ones(len(columns), dtype=bool)
+        if not self.include_erased:
+            mask &= numpy_column(np, columns.erased) == 0
+        if self.directors is not None:
+            mask &= np.isin(numpy_column(np, columns.director_codes), self.director_codes(columns))
+        seasons = numpy_column(np, columns.seasons)
+        if self.season_min is not None:
+            mask &= seasons >= self.season_min
+        if self.season_max is not None:
+            mask &= seasons <= self.season_max
+        dates = numpy_column(np, columns.dates)
+        if self.date_low is not None:
+            mask &= dates >= self.date_low
+        if self.date_high is not None:
+            mask &= dates <= self.date_high
+        return mask
+
+# Function to view a numeric column as a NumPy array (no copy)
+def numpy_column(np, values):
+    return np.frombuffer(values, dtype=NPY_TYPES[memoryview(values).format])
+
+# Function to select the rows of a catalogue matching a filter: None when every row matches,
+# otherwise a boolean mask with NumPy (np) or a list of row numbers without it
+def select_rows(columns, catalogue_filter, np=None):
+    if np is not None:
+        return catalogue_filter.numpy_mask(columns, np)
+    return catalogue_filter.python_rows(columns)
+
+# Function to count the values of a column in the rows chosen by select_rows: {value: count}
+def count_values(values, selection, np=None):
+    if np is not None:
+        values = numpy_column(np, values)
+        values, counts = np.unique(values if selection is None else values[selection], return_counts=True)
+        return dict(zip(values.tolist(), counts.tolist()))
+    return Counter(values if selection is None else map(values.__getitem__, selection))
+
+# Aggregations of a catalogue. Every method takes the filters of CatalogueFilter as keyword
+# arguments; use_numpy=False forces the pure Python path.
+class CatalogueStats:
+    def __init__(self, columns, use_numpy=None):
+        self.columns = columns
+        self.np = load_numpy() if use_numpy is not False else None
+
+    # Method to select the rows matching some filters (passed on to the *_selected methods)
+    def select(self, **filters):
+        return select_rows(self.columns, CatalogueFilter(**filters), self.np)
+
+    # Methods to run one aggregation with some filters
+    def counts_by_director(self, top=None, **filters):
+        return self.counts_by_director_selected(self.select(**filters), top)
+
+    def season_distribution(self, **filters):
+        return self.season_distribution_selected(self.select(**filters))
+
+    def titles_per_year(self, **filters):
+        return self.titles_per_year_selected(self.select(**filters))
+
+    # Method to count the series of each director, most frequent first: [(director, count)]
+    def counts_by_director_selected(self, selection, top=None):
+        directors = self.columns.directors
+        counts = [(directors[code], count)
+                  for code, count in count_values(self.columns.director_codes, selection, self.np).items()]
+        counts.sort(key=lambda item: (-item[1], item[0]))
+        return counts[:top]
+
+    # Method to count the series of each season: {season: count} ordered by season
+    def season_distribution_selected(self, selection):
+        return dict(sorted(count_values(self.columns.seasons, selection, self.np).items()))
+
+    # Method to count the series created each year: {year: count} ordered by year (values of
+    # DateCreation that are not dates are not counted)
+    def titles_per_year_selected(self, selection):
+        years = Counter()
+        # Counted by distinct date first, so only a few thousand ordinals are turned into years
+        for ordinal, count in count_values(self.columns.dates, selection, self.np).items():
+            if ordinal:
+                years[date.fromordinal(ordinal).year] += count
+        return dict(sorted(years.items()))
+
+    # Method to get every aggregation at once (for reports and the command line)
+    def summary(self, top=None, **filters):
+        selection = self.select(**filters)
+        per_director = self.counts_by_director_selected(selection, top)
+        seasons = self.season_distribution_selected(selection)
+        return {
+            'series': sum(seasons.values()),
+            'directors': [{'director': director, 'series': count} for director, count in per_director],
+            'seasons': {str(season): count for season, count in seasons.items()},
+            'years': {str(year): count for year, count in self.titles_per_year_selected(selection).items()},
+        }
+
+# Function to write a column to a .npy file (version 1.0 format, little-endian)
+def write_npy(path, values, typecode):
+    if not isinstance(values, array) or values.typecode != typecode:
+        values = array(typecode, values)
+    if sys.byteorder == 'big':
+        values = array(typecode, values)
+        values.byteswap()
+    header = "{'descr': '%s', 'fortran_order': False, 'shape': (%d,), }" % (NPY_TYPES[typecode], len(values))
+    # The data starts at a multiple of 64 bytes, as numpy.save does
+    header += ' ' * (-(len(NPY_MAGIC) + 2 + len(header) + 1) % 64) + '\n'
+    with open(path, 'wb') as f:
+        f.write(NPY_MAGIC + struct.pack('<H', len(header)) + header.encode('latin1'))
+        values.tofile(f)
+
+# Function to map a .npy file written by write_npy (or numpy.save, for 1-D arrays of the types
+# in NPY_TYPES): returns the memory map and the views on it, the last one being the column
+def map_npy(path):
+    with open(path, 'rb') as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        if mm[:8] != NPY_MAGIC:
+            raise ValueError
+        length = struct.unpack('<H', mm[8:10])[0]
+        header = ast.literal_eval(mm[10:10 + length].decode('latin1'))
+        typecode = {descr: typecode for typecode, descr in NPY_TYPES.items()}.get(header['descr'])
+        start = 10 + length
+        if (typecode is None or header['fortran_order'] or len(header['shape']) != 1
+                or len(mm) - start != header['shape'][0] * array(typecode).itemsize or sys.byteorder == 'big'):
+            raise ValueError
+    except (ValueError, SyntaxError, KeyError, TypeError, struct.error):
+        mm.close()
+        raise ValueError(f"{path} is not a .npy column of a supported type.")
+    whole = memoryview(mm)
+    data = whole[start:]
+    return mm, [whole, data, data.cast(typecode)]
+
+# Function to release memory maps returned by map_npy
+def close_maps(maps):
+    for mm, views in maps:
+        for view in reversed(views):
+            view.release()
+        mm.close()
+
+# Function to export the columns of a catalogue to a directory of .npy files
+def export_columns(columns, path):
+    os.makedirs(path, exist_ok=True)
+    for heading, attribute, typecode in NUMERIC_COLUMNS:
+        write_npy(os.path.join(path, heading + '.npy'), getattr(columns, attribute), typecode)
+    encoded = [name.encode('utf-8') for name in columns.names]
+    write_npy(os.path.join(path, 'Name.npy'), b''.join(encoded), 'B')
+    write_npy(os.path.join(path, 'Name.offsets.npy'), accumulate(map(len, encoded), initial=0), 'q')
+    # Written last: a directory without it is an unfinished export
+    meta = {
+        'version': COLUMNS_VERSION,
+        'rows': len(columns),
+        'directors': list(columns.directors),
+        'raw_dates': {str(row): value for row, value in columns.raw_dates.items()},
+    }
+    with open(os.path.join(path, META_FILE), 'w', encoding='utf-8') as f:
+        json.dump(meta, f, ensure_ascii=False)
+
+# Function to load a catalogue exported by export_columns. The column files are memory-mapped,
+# not read: close() the result (or use it in a with block) to unmap them.
+def load_columns(path):
+    try:
+        with open(os.path.join(path, META_FILE), 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        raise ValueError(f"{path} is not an exported catalogue.")
+    if meta.get('version') != COLUMNS_VERSION:
+        raise ValueError(f"Unsupported catalogue export version {meta.get('version')}.")
+
+    maps = []
+    try:
+        columns = {}
+        for heading, attribute, _ in NUMERIC_COLUMNS:
+            maps.append(map_npy(os.path.join(path, heading + '.npy')))
+            columns[attribute] = maps[-1][1][-1]
+        for heading in ('Name', 'Name.offsets'):
+            maps.append(map_npy(os.path.join(path, heading + '.npy')))
+            columns[heading] = maps[-1][1][-1]
+        if any(len(columns[attribute]) != meta['rows'] for _, attribute, _ in NUMERIC_COLUMNS):
+            raise ValueError(f"The columns of {path} do not have {meta['rows']} rows.")
+    except BaseException:
+        close_maps(maps)
+        raise
+    names = TextColumn(columns.pop('Name'), columns.pop('Name.offsets'))
+    raw_dates = {int(row): value for row, value in meta['raw_dates'].items()}
+    return CatalogueColumns(names=names, directors=meta['directors'], raw_dates=raw_dates, maps=maps, **columns)
+
+# Function to export the columns of a catalogue to a Parquet file (needs pyarrow). Director is
+# dictionary-encoded and DateCreation is a date (null when the value is not a date). pyarrow
+# reads it back without copying with pyarrow.parquet.read_table(path, memory_map=True).
+def export_parquet(columns, path):
+    pa = load_pyarrow()
+    if pa is None:
+        raise ImportError("pyarrow is not installed.")
+    dates = [ordinal - EPOCH_ORDINAL if ordinal else None for ordinal in columns.dates]
+    table = pa.table({
+        'ID': pa.array(columns.ids, pa.int64()),
+        'Name': pa.array(list(columns.names), pa.string()),
+        'DateCreation': pa.array(dates, pa.date32()),
+        'Season': pa.array(columns.seasons, pa.int64()),
+        'Director': pa.DictionaryArray.from_arrays(pa.array(columns.director_codes, pa.int32()),
+                                                   pa.array(list(columns.directors), pa.string())),
+        'PosFile': pa.array(columns.positions, pa.int64()),
+        'Erased': pa.array(columns.erased, pa.int8()),
+    })
+    pa.parquet.write_table(table, path)
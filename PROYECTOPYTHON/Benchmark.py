@@ -0,0 +1,208 @@
+import argparse
+import csv
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from Series import Series
+from SeriesEngine import (load_series, create_series, modify_series, delete_series_file,
+                          purge_series, sort_series)
+from Storage import close_storages
+
+# Headless benchmark of the storage operations on synthetic catalogues:
+#   python -m Benchmark --sizes 1000 10000 100000 --repeats 5 --output bench.json
+# Every run works on a fresh copy of the catalogue in a temporary directory. Times are taken
+# without tracing; peak memory comes from one extra traced run of each operation.
+
+DEFAULT_SIZES = (1000, 10000, 100000)
+# Number of series added, modified or deleted by the single-row operations
+DEFAULT_OPS = 100
+
+WORDS = ('Dark', 'House', 'Crown', 'Night', 'Lost', 'City', 'Blood', 'River', 'Game', 'Mind',
+         'Black', 'Mirror', 'Stranger', 'Things', 'Broken', 'Line', 'Silent', 'Wolf', 'Peaky',
+         'Kingdom', 'Empire', 'Secret', 'Garden', 'Ocean', 'Storm', 'Fire', 'Queen', 'Code')
+FIRST_NAMES = ('Ana', 'Luis', 'David', 'Sofia', 'Jorge', 'Marta', 'Peter', 'Laura', 'Alex', 'Elena')
+LAST_NAMES = ('Garcia', 'Smith', 'Fincher', 'Lopez', 'Nolan', 'Martin', 'Kurosawa', 'Perez', 'Allen', 'Reyes')
+
+# Function to build the director pool; a few directors get most titles (Zipf-like weights)
+def director_pool(rng, count=500):
+    names = [f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} {i}' for i in range(count)]
+    weights = [1 / (rank + 1) for rank in range(count)]
+    return names, weights
+
+# Function to write a synthetic catalogue of the given size to a CSV file
+def generate_catalogue(path, size, seed=0):
+    rng = random.Random(seed)
+    directors, weights = director_pool(rng)
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(Series.headings)
+        chunk = 10000
+        for first in range(1, size + 1, chunk):
+            count = min(chunk, size + 1 - first)
+            chosen = rng.choices(directors, weights, k=count)
+            writer.writerows(
+                [i, ' '.join(rng.sample(WORDS, rng.randint(1, 4))),
+                 f'{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/{rng.randint(1950, 2023)}',
+                 rng.randint(1, 15), director, i, 0]
+                for i, director in zip(range(first, first + count), chosen))
+
+# Each operation is a pair (setup, run): setup prepares state on the fresh copy (not timed)
+# and returns the argument of run, which is the timed part.
+def setup_none(file, size, ops):
+    return None
+
+def setup_loaded(file, size, ops):
+    return load_series(file)
+
+# Validated IDs have at most 3 digits, and a catalogue of 1000 rows or more uses all of them:
+# the series with IDs 1..ops are purged beforehand so the timed adds can reuse those IDs
+MAX_ID = 999
+
+def setup_add(file, size, ops):
+    series_list = load_series(file)
+    for series in series_list:
+        if series.ID <= ops:
+            series.erased = -1
+    purge_series(file, series_list, renumber=False)
+    return series_list
+
+def setup_deleted(file, size, ops):
+    series_list = load_series(file)
+    for series in list(series_list)[:ops]:
+        series.erased = -1
+    return series_list
+
+def run_read(file, size, ops, state):
+    load_series(file)
+
+def run_add(file, size, ops, state):
+    # IDs freed by setup_add; the new series go to PosFiles past the end of the catalogue
+    for i in range(1, ops + 1):
+        create_series(file, state, str(i), f'Added {i}', '01/01/2020', '1', 'Bench Director', str(size + i))
+    close_storages()
+
+def run_modify(file, size, ops, state):
+    rng = random.Random(1)
+    for series in rng.sample(list(state), min(ops, len(state))):
+        state.modify(series, season=int(series.season) + 1)
+        modify_series(file, series)
+    close_storages()
+
+def run_delete(file, size, ops, state):
+    rng = random.Random(2)
+    for series in rng.sample(list(state), min(ops, len(state))):
+        delete_series_file(file, state, series)
+    close_storages()
+
+def run_purge(file, size, ops, state):
+    purge_series(file, state)
+
+def run_sort(file, size, ops, state):
+    sort_series(file, ['Director', ('DateCreation', True)])
+
+operations = {
+    'read_series': (setup_none, run_read),
+    'add_series': (setup_add, run_add),
+    'modify_series': (setup_loaded, run_modify),
+    'delete_series': (setup_loaded, run_delete),
+    'purge_deleted_series': (setup_deleted, run_purge),
+    'sort_series': (setup_none, run_sort),
+}
+
+# Function to run an operation once on a fresh copy of the catalogue; returns (seconds, peak bytes)
+def run_once(source, workdir, operation, size, ops, trace=False):
+    setup, run = operations[operation]
+    file = os.path.join(workdir, 'series.csv')
+    for name in os.listdir(workdir):
+        os.remove(os.path.join(workdir, name))
+    shutil.copyfile(source, file)
+    state = setup(file, size, ops)
+
+    if trace:
+        tracemalloc.start()
+    start = time.perf_counter()
+    run(file, size, ops, state)
+    elapsed = time.perf_counter() - start
+    peak = None
+    if trace:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    close_storages()
+    return elapsed, peak
+
+# Function to benchmark an operation: warmup runs, timed repeats and one traced run
+def measure(source, workdir, operation, size, ops, warmup, repeats):
+    for _ in range(warmup):
+        run_once(source, workdir, operation, size, ops)
+    times = sorted(run_once(source, workdir, operation, size, ops)[0] for _ in range(repeats))
+    _, peak = run_once(source, workdir, operation, size, ops, trace=True)
+    return {
+        'operation': operation,
+        'rows': size,
+        'ops': ops if operation in ('add_series', 'modify_series', 'delete_series', 'purge_deleted_series') else None,
+        'repeats': repeats,
+        'min_s': times[0],
+        'median_s': times[len(times) // 2],
+        'max_s': times[-1],
+        'peak_memory_bytes': peak,
+    }
+
+# Function to describe the environment so results from different commits can be compared
+def environment():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        'commit': commit,
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m Benchmark', description='Benchmark the series storage operations.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES), help='catalogue sizes (1e3 to 1e7)')
+    parser.add_argument('--operations', nargs='+', choices=list(operations), default=list(operations))
+    parser.add_argument('--ops', type=int, default=DEFAULT_OPS, help='rows touched by add/modify/delete/purge')
+    parser.add_argument('--warmup', type=int, default=1)
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='JSON file for the results (printed when omitted)')
+    args = parser.parse_args(argv)
+    if 'add_series' in args.operations and not 1 <= args.ops <= MAX_ID:
+        parser.error(f'--ops must be between 1 and {MAX_ID} to benchmark add_series (IDs have at most 3 digits)')
+
+    results = {'environment': environment(), 'results': []}
+    with tempfile.TemporaryDirectory() as tmp:
+        workdir = os.path.join(tmp, 'work')
+        os.mkdir(workdir)
+        for size in args.sizes:
+            source = os.path.join(tmp, f'catalogue_{size}.csv')
+            generate_catalogue(source, size, args.seed)
+            for operation in args.operations:
+                result = measure(source, workdir, operation, size, args.ops, args.warmup, args.repeats)
+                results['results'].append(result)
+                print(f"{operation:>22} {size:>9} rows: median {result['median_s'] * 1000:.1f} ms, "
+                      f"peak {(result['peak_memory_bytes'] or 0) / 1e6:.1f} MB", file=sys.stderr)
+
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+    else:
+        print(text)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,132 @@
+import csv
+import json
+from Series import Series
+from Storage import get_storage
+from SeriesEngine import f_series, series_values_error, load_series
+from Metrics import instrumented
+
+# Number of input rows validated together before they are added to the collection
+BATCH_SIZE = 5000
+
+# Result of a bulk import: how many rows were accepted and why the others were rejected
+class ImportReport:
+    def __init__(self):
+        self.accepted = 0
+        # List of (line number in the source, row values, reason)
+        self.rejected = []
+
+    def reject(self, line, row, reason):
+        self.rejected.append((line, row, reason))
+
+    def to_dict(self):
+        return {
+            'accepted': self.accepted,
+            'rejected': [{'line': line, 'row': row, 'reason': reason} for line, row, reason in self.rejected],
+        }
+
+    def __str__(self):
+        return f"ImportReport(accepted={self.accepted}, rejected={len(self.rejected)})"
+
+# Function to iterate over the rows of a CSV source as (line, [ID, Name, DateCreation, Season, Director, PosFile])
+def iter_csv_source(source):
+    with open(source, 'r', newline='', encoding='utf-8') as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
+            return
+        # Sources without a header row start directly with data
+        if header[:6] != Series.headings[:6]:
+            yield 1, header[:6]
+        for row in reader:
+            if row:
+                yield reader.line_num, row[:6]
+
+# Function to iterate over the objects of a JSONL source (one object per line, keyed by Series.headings)
+def iter_jsonl_source(source):
+    with open(source, 'r', encoding='utf-8') as f:
+        for line, text in enumerate(f, 1):
+            if not text.strip():
+                continue
+            try:
+                data = json.loads(text)
+            except ValueError:
+                yield line, None
+                continue
+            if not isinstance(data, dict):
+                yield line, None
+                continue
+            yield line, [data.get(column, '') for column in Series.headings[:6]]
+
+# Function to validate one batch of rows; returns the accepted rows as (line, row, series).
+# Nothing is added to the collection here: the caller appends them once they are written.
+def import_batch(batch, series_list, report):
+    accepted = []
+    # IDs and PosFiles taken by the accepted rows of this batch (the collection holds the others)
+    ids, positions = set(), set()
+    for line, row in batch:
+        if row is None:
+            report.reject(line, row, "The line is not a valid JSON object.")
+            continue
+        if len(row) < 6:
+            report.reject(line, row, "The row does not have the 6 series fields.")
+            continue
+
+        ID, name, datecreation, season, director, posFile = (str(value).strip() for value in row)
+        error = series_values_error(ID, name, datecreation, season)
+        if error is None and not (posFile.isdigit() and int(posFile) >= 1):
+            error = "Invalid PosFile format. It must be a positive integer."
+        if error is None:
+            try:
+                series = Series(int(ID), name, datecreation, int(season), director, int(posFile), 0)
+                # The collection checks ID and PosFile uniqueness against its hash indexes
+                series_list.check_unique(series.ID, series.posFile)
+                if series.ID in ids:
+                    raise ValueError(f"The ID {ID} has already been assigned to another series.")
+                if series.posFile in positions:
+                    raise ValueError(f"The PosFile {posFile} is already used by another series.")
+            except ValueError as e:
+                error = str(e)
+        if error:
+            report.reject(line, row, error)
+        else:
+            ids.add(series.ID)
+            positions.add(series.posFile)
+            accepted.append((line, row, series))
+    return accepted
+
+# Function to write the accepted series of a batch and then add them to the collection, so the
+# collection never holds series the file does not. The batch is written as a whole or not at
+# all: if the write fails, every row of the batch is reported as rejected with the reason.
+def store_batch(file, accepted, series_list, report):
+    if not accepted:
+        return 0
+    series = [s for _, _, s in accepted]
+    try:
+        get_storage(file).insert_many(series)
+    except (ValueError, OSError) as e:
+        for line, row, _ in accepted:
+            report.reject(line, row, f"The batch could not be written: {e}")
+        return 0
+    series_list.extend(series)
+    return len(series)
+
+# Function to import many series from a CSV or JSONL source. Rows are validated in batches of
+# BATCH_SIZE with the precompiled patterns, the accepted rows of each batch are written with one
+# buffered append, and a report of the rejected rows is returned instead of stopping at the
+# first error.
+@instrumented('bulk_import')
+def bulk_import(source, file=f_series, series_list=None):
+    if series_list is None:
+        series_list = load_series(file)
+    report = ImportReport()
+
+    rows = iter_jsonl_source(source) if str(source).endswith(('.jsonl', '.json')) else iter_csv_source(source)
+    batch = []
+    for item in rows:
+        batch.append(item)
+        if len(batch) >= BATCH_SIZE:
+            report.accepted += store_batch(file, import_batch(batch, series_list, report), series_list, report)
+            batch = []
+    if batch:
+        report.accepted += store_batch(file, import_batch(batch, series_list, report), series_list, report)
+    return report
@@ -0,0 +1,133 @@
+import os
+import threading
+from contextlib import contextmanager
+try:
+    import fcntl
+except ImportError:
+    # Windows: msvcrt only has exclusive locks, so shared locks are exclusive there
+    fcntl = None
+    import msvcrt
+
+# Advisory lock of a series file shared by every process using it (GUI sessions, the command
+# line, batch jobs). It is held on a lock file next to the data (series.csv -> series.csv.lock):
+# readers take it shared, writers exclusive. Locks are reentrant within a process, and a
+# shared lock is converted to an exclusive one when a write happens inside a read.
+#
+# The lock file also holds two generation counters, written under the exclusive lock:
+#   generation  bumped by every write (journal records, record file slots, rewrites)
+#   base        bumped when the base file is rewritten (compaction, sort, purge, clear)
+# A process compares them with the values it saw when it loaded the file to find out whether
+# its in-memory list is stale, and whether the journal records after its offset are enough to
+# bring it up to date (same base) or it has to reload.
+
+LOCK_SUFFIX = '.lock'
+
+# Open locks, one per file, so the lock file descriptor is reused
+locks = {}
+
+# Functions to lock and unlock a whole lock file
+def lock_fd(fd, exclusive):
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        return
+    os.lseek(fd, 0, os.SEEK_SET)
+    while True:
+        try:
+            msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+            return
+        except OSError:
+            # LK_LOCK gives up after 10 seconds; keep waiting like flock does
+            continue
+
+def unlock_fd(fd):
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+        return
+    os.lseek(fd, 0, os.SEEK_SET)
+    msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+
+class FileLock:
+    def __init__(self, file):
+        self.path = file + LOCK_SUFFIX
+        # Serializes the threads of this process; the file lock serializes the processes
+        self.mutex = threading.RLock()
+        self.fd = None
+        self.exclusive_held = False
+        self.depth = 0
+
+    def acquire(self, exclusive):
+        # msvcrt locks are always exclusive, and cannot be taken twice
+        exclusive = exclusive or fcntl is None
+        self.mutex.acquire()
+        try:
+            if self.fd is None:
+                self.fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o666)
+            if self.depth == 0 or (exclusive and not self.exclusive_held):
+                # Converting a shared lock is not atomic: another writer may get in between
+                lock_fd(self.fd, exclusive)
+                self.exclusive_held = self.exclusive_held or exclusive
+        except BaseException:
+            self.mutex.release()
+            raise
+        self.depth += 1
+
+    def release(self):
+        self.depth -= 1
+        if self.depth == 0:
+            unlock_fd(self.fd)
+            self.exclusive_held = False
+        self.mutex.release()
+
+    @contextmanager
+    def shared(self):
+        self.acquire(False)
+        try:
+            yield self
+        finally:
+            self.release()
+
+    @contextmanager
+    def exclusive(self):
+        self.acquire(True)
+        try:
+            yield self
+        finally:
+            self.release()
+
+    # Method to read the (generation, base) counters; (0, 0) for a new lock file
+    def counters(self):
+        with self.shared():
+            os.lseek(self.fd, 0, os.SEEK_SET)
+            data = os.read(self.fd, 64).split()
+        if len(data) != 2:
+            return 0, 0
+        return int(data[0]), int(data[1])
+
+    # Method to record a write (rewrite=True when the base file was replaced); returns the new counters
+    def bump(self, rewrite=False):
+        with self.exclusive():
+            generation, base = self.counters()
+            generation += 1
+            base += bool(rewrite)
+            data = f'{generation} {base}\n'.encode('ascii')
+            os.lseek(self.fd, 0, os.SEEK_SET)
+            os.write(self.fd, data)
+            os.ftruncate(self.fd, len(data))
+        return generation, base
+
+    def close(self):
+        with self.mutex:
+            if self.fd is not None and self.depth == 0:
+                os.close(self.fd)
+                self.fd = None
+
+# Function to get the (shared) lock of a series file
+def get_lock(file):
+    lock = locks.get(file)
+    if lock is None:
+        lock = locks[file] = FileLock(file)
+    return lock
+
+def close_locks():
+    for lock in locks.values():
+        lock.close()
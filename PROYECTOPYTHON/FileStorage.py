@@ -0,0 +1,250 @@
+import os
+import tempfile
+from contextlib import contextmanager
+from Series import Series
+from Storage import SeriesStorage
+from SerializeFile import read_file_series
+from RecordFile import is_record_file, create_record_file, write_series_record, write_series_records, erase_series_record
+from RecordFile import save_record_order, load_record_order
+from SeriesCollection import SeriesCollection, index_key
+from Journal import get_journal, compact_if_needed, OP_ADD
+from SortFile import sort_file, parse_specs, make_key
+from FileLock import get_lock
+from Snapshot import save_snapshot
+from SerializeFile import iter_rows_csv
+
+# Storage backend for the file formats: a CSV base file with its journal, or a fixed-width
+# record file ('.dat') updated in place.
+#
+# Other processes may use the same file (see FileLock): reads hold the shared lock and writes
+# the exclusive one. Before writing, the list filled by the last load() is brought up to date
+# with the writes of the other processes (the journal records after the offset it was read up
+# to, or a reload if the base file was rewritten), and a series another process changed in the
+# meantime is not written: ValueError is raised and the list holds their version instead.
+class FileStorage(SeriesStorage):
+    def __init__(self, file):
+        self.file = file
+        self.record_file = is_record_file(file)
+        self.lock = get_lock(file)
+        # Collection used by get_by_id/get_by_pos, loaded on first lookup and kept up to date
+        self.cache = None
+        # List filled by the last load(), the lock counters it reflects and the journal offset
+        # it was read up to
+        self.loaded = None
+        self.seen = None
+        self.journal_offset = 0
+
+    def load(self, series_list):
+        with self.lock.shared():
+            read_file_series(self.file, series_list)
+            # Record files are always stored by PosFile: the order saved by sort() is applied here
+            order = load_record_order(self.file) if self.record_file else None
+            if order is not None:
+                ordered = list(self.ordered(series_list, *order))
+                series_list.clear()
+                for series in ordered:
+                    series_list.append(series)
+            self.track(series_list)
+
+    # Method to remember that a list reflects the file as it is now (called with the lock held)
+    def track(self, series_list):
+        self.loaded = series_list
+        self.seen = self.lock.counters()
+        self.journal_offset = 0 if self.record_file else get_journal(self.file).size()
+
+    def locked(self):
+        return self.lock.exclusive()
+
+    # Method to apply the writes of other processes to the list filled by the last load().
+    # Returns the IDs they changed, or None if the list had to be reloaded. Series in pending
+    # (changes of this process not written yet) are dropped from the list if another process
+    # changed the same ID, so the list ends up with their version.
+    def refresh(self, series_list=None, pending=()):
+        if series_list is None:
+            series_list = self.loaded
+        if series_list is None or series_list is not self.loaded:
+            return set()
+        with self.lock.shared():
+            counters = self.lock.counters()
+            if counters == self.seen:
+                return set()
+            self.cache = None
+            if self.record_file or counters[1] != self.seen[1]:
+                self.load(series_list)
+                return None
+
+            journal = get_journal(self.file)
+            entries = list(journal.entries(self.journal_offset))
+            changed = {key for _, row, previous in entries for key in (row[0], previous)}
+            for series in pending:
+                if index_key(series.ID) in changed and series_list.find_by_id(series.ID) is series:
+                    series_list.remove(series)
+            journal.replay(series_list, entries)
+            self.seen = counters
+            self.journal_offset = journal.size()
+            return changed
+
+    # Context manager around every write: holds the exclusive lock, refreshes the loaded list
+    # and refuses to write series that another process changed since it was loaded
+    @contextmanager
+    def writing(self, *series_list):
+        with self.lock.exclusive():
+            changed = self.refresh(pending=series_list)
+            if changed is None and series_list:
+                raise ValueError("The file was changed by another process; the list has been reloaded. Try again.")
+            for series in series_list:
+                if changed and index_key(series.ID) in changed:
+                    raise ValueError(f"The series {series.ID} was changed by another process; "
+                                     f"the list has been refreshed with its changes. Try again.")
+            yield
+            if self.loaded is not None:
+                self.seen = self.lock.counters()
+                self.journal_offset = 0 if self.record_file else get_journal(self.file).size()
+
+    # Method to get the lookup collection, loading it on first use
+    def lookup(self):
+        if self.cache is None:
+            self.cache = SeriesCollection()
+            with self.lock.shared():
+                read_file_series(self.file, self.cache)
+        return self.cache
+
+    def get_by_id(self, series_id):
+        return self.lookup().find_by_id(series_id)
+
+    def get_by_pos(self, pos):
+        return self.lookup().find_by_pos(pos)
+
+    # Method to apply a stored change to the lookup collection (if it was loaded)
+    def update_cache(self, series, old_id=None):
+        if self.cache is None:
+            return
+        cached = self.cache.find_by_id(series.ID if old_id is None else old_id)
+        if cached is None:
+            if not series.erased:
+                self.cache.append(Series(*series.to_row()))
+        elif series.erased:
+            self.cache.remove(cached)
+        else:
+            self.cache.modify(cached, **dict(zip(('ID', 'name', 'datecreation', 'season', 'director',
+                                                  'posFile', 'erased'), series.to_row())))
+
+    # Journal writes bump the generation counter themselves; record file writes do it here
+    def insert(self, series):
+        with self.writing(series):
+            if self.record_file:
+                write_series_record(self.file, series)
+                self.lock.bump()
+            else:
+                get_journal(self.file).log_add(series)
+                compact_if_needed(self.file)
+            self.update_cache(series)
+
+    def insert_many(self, series_list):
+        series_list = list(series_list)
+        with self.writing(*series_list):
+            if self.record_file:
+                write_series_records(self.file, series_list)
+                self.lock.bump()
+            else:
+                get_journal(self.file).append_many(OP_ADD, (series.to_row() for series in series_list))
+                compact_if_needed(self.file)
+            for series in series_list:
+                self.update_cache(series)
+
+    # Record files are updated in place: seek to the PosFile offset and overwrite one record (and
+    # blank the old slot when the PosFile changed). CSV files get an update (or tombstone) record
+    # in the journal instead of a full rewrite.
+    def upsert(self, series, old_id=None, old_pos=None):
+        with self.writing(series):
+            if self.record_file:
+                write_series_record(self.file, series, old_pos)
+                self.lock.bump()
+            else:
+                get_journal(self.file).log_update(series, old_id)
+                compact_if_needed(self.file)
+            self.update_cache(series, old_id)
+
+    def tombstone(self, series):
+        with self.writing(series):
+            if self.record_file:
+                erase_series_record(self.file, series.posFile)
+                self.lock.bump()
+                self.dead += 1
+            else:
+                get_journal(self.file).log_delete(series)
+                # A compaction drops the erased rows from the base file
+                self.dead = 0 if compact_if_needed(self.file) else self.dead + 1
+            self.update_cache(series)
+
+    # The loaded list is refreshed first, so the writes of other processes are kept when it is
+    # the list being saved
+    def save_all(self, series_list):
+        with self.writing():
+            if self.record_file:
+                # Written to a unique temporary file that atomically replaces the old one
+                fd, temp_file = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self.file)), suffix='.dat')
+                os.close(fd)
+                create_record_file(temp_file)
+                write_series_records(temp_file, [series for series in series_list if not series.erased])
+                os.replace(temp_file, self.file)
+                self.lock.bump(rewrite=True)
+            else:
+                # The list already holds every journaled change, so the journal is folded into the new base
+                get_journal(self.file).compact(series_list)
+            self.cache = None
+            self.dead = 0
+
+    # PosFile is the position of a series in the file: with renumber, a purge of the loaded list
+    # numbers the remaining series 1, 2, 3... again in list order, so a record file has no empty
+    # slots left
+    def purge(self, series_list, renumber=False):
+        if self.record_file or series_list is self.loaded:
+            with self.writing():
+                if renumber and isinstance(series_list, SeriesCollection):
+                    series_list.renumber()
+                self.save_all(series_list)
+            return
+        # A list this storage does not keep up to date: merge base and journal from disk instead,
+        # which also drops the erased series
+        with self.writing():
+            get_journal(self.file).compact()
+            self.cache = None
+            self.dead = 0
+
+    # Method to order an iterable of series by column specs (see SortFile.parse_specs)
+    def ordered(self, series_list, columns, descending=False):
+        key, reverse = make_key(parse_specs(Series.headings, columns, descending))
+        return sorted(series_list, key=lambda series: key(series.to_row()), reverse=reverse)
+
+    def sorted_scan(self, columns, descending=False):
+        series_list = SeriesCollection()
+        with self.lock.shared():
+            read_file_series(self.file, series_list)
+        return iter(self.ordered(series_list, columns, descending))
+
+    def sort(self, columns, descending=False):
+        if self.record_file:
+            # Records stay at their PosFile offset; only the load order changes, and it is saved
+            # next to the file so later loads use it too. The bump makes other processes reload.
+            parse_specs(Series.headings, columns, descending)
+            with self.writing():
+                save_record_order(self.file, columns, descending)
+                self.lock.bump()
+            return
+
+        with self.writing():
+            # Fold pending journal records into the file before reading it
+            journal = get_journal(self.file)
+            if journal.size():
+                journal.compact()
+                self.dead = 0
+            sort_file(self.file, columns, descending)
+            self.lock.bump(rewrite=True)
+            # The reload that follows a sort reads the snapshot instead of parsing the new file
+            save_snapshot(self.file, iter_rows_csv(self.file))
+            self.cache = None
+
+    def commit(self):
+        if not self.record_file:
+            get_journal(self.file).sync()
@@ -1,308 +1,197 @@
 import PySimpleGUI as sg
 from Series import *
 from SerializeFile import *
-import re
-import operator
-import os
-
-# File path for storing series data
-f_series = 'series.csv'
-# List to store series objects
-l_series = []
-# Regular expressions for patterns
-pattern_season = r"\d+"
-pattern_date_creation = r"^(0[1-9]|[12][0-9]|3[01])/(0[1-9]|1[0-2])/\d{4}$"
-pattern_id = r"\d{1,3}"
-
-# Function to save the series list to a CSV file
-def save_series_list(file, series_list):
-    with open(file, 'w', newline='', encoding='utf-8') as file:
-        csv_writer = csv.writer(file)
-        csv_writer.writerow(Series.headings)
-
-        for series in series_list:
-            if not series.erased:
-                csv_writer.writerow(series.to_row())
-
-# Function to move and clear a file
-def clean_and_move_file(original_file, new_file):
-    os.rename(original_file, new_file)
-    try:
-        os.remove(original_file)
-    except OSError as e:
-        print(f"Failed to remove the old file: {e}")
-    os.rename(new_file, original_file)
+from SeriesEngine import *
+from TableModel import *
+from SeriesQuery import SeriesQuery, parse_search
+from Worker import StorageWorker, LoadProgress, JOB_PROGRESS, JOB_DONE
+from MappedFile import open_mapped_series
+from Metrics import instrumented
+
+# Indexed collection to store series objects
+l_series = SeriesCollection()
+# Paged view of l_series shown by the table
+table_model = TableModel(l_series)
+# Search indexes over l_series, kept up to date by the collection
+series_query = SeriesQuery(l_series)
+# Background worker running the storage operations (started by interface()). While it has jobs
+# the list may be changing, so the table is only refreshed when its queue is empty.
+worker = None
+# Read-only view of the CSV file (see MappedFile) shown by the table while l_series is loading.
+# The file stays mapped until the load finishes, so nothing may write it in the meantime.
+preview = None
+# Events that need l_series (they search or change the list or the file), refused while the
+# preview is shown
+LOADED_EVENTS = ('Add', 'Delete', 'Modify', 'Clear', 'Purge', 'Sort File', 'Search', 'Show All')
 
 # Function to add a new series to the list and update the interface
-def add_series(series_list, interface_list, series_data, window):
+def add_series(series_list, model, series_data, window):
+    # Extract series data from the input dictionary
+    ID = series_data['-ID-']
+    name = series_data['-Name-']
+    datecreation = series_data['-DateCreation-']
+    season = series_data['-Season-']
+    director = series_data['-Director-']
+    posFile = series_data['-PosFile-']
+
+    # Validate the data, add the series to the list and save it to the file (on the worker;
+    # a validation error is shown by finish_job when the job finishes)
+    worker.submit('Add', create_series, f_series, series_list, ID, name, datecreation, season, director, posFile)
+
+# Function to update the interface with the visible page of the series list
+@instrumented('table_refresh')
+def update_interface(window, model):
+    window['-table-'].update(values=model.rows(), row_colors=model.row_colors())
+    window['-page-'].update(model.page_label())
+
+# Function to queue the search of the search box (every series if it is empty); the table
+# shows the results when the job finishes
+def show_search_results(window, model, search_text):
+    filters = parse_search(search_text)
+    if filters:
+        worker.submit('Search', series_query.search, **filters)
+    else:
+        model.series_list = l_series
+        if not worker.busy():
+            model.clamp()
+            update_interface(window, model)
+
+# Function to load the series of a file into the list, reporting progress through the job
+def load_series_list(file, series_list, job):
+    progress = LoadProgress(job)
+    series_list.listeners.append(progress)
     try:
-        # Extract series data from the input dictionary
-        ID = series_data['-ID-']
-        name = series_data['-Name-']
-        datecreation = series_data['-DateCreation-']
-        season = series_data['-Season-']
-        director = series_data['-Director-']
-        posFile = series_data['-PosFile-']
-        erased = 0  # Default value for erased
-
-        if not re.match(pattern_id, ID):
-            raise ValueError("Invalid ID format. It must be a positive integer with at most 3 digits.")
-
-        if not name:
-            raise ValueError("Name cannot be empty.")
-
-        if not re.match(pattern_date_creation, datecreation):
-            raise ValueError("Invalid date creation format. It must be in DD/MM/YYYY format.")
-
-        if not re.match(pattern_season, season):
-            raise ValueError("Invalid season format. It must be a non-negative integer.")
-
-        # Check if the ID is already in the list
-        if any(existing_series.ID == ID for existing_series in series_list):
-            raise ValueError("ID must be unique. This ID is already in use.")
-
-        # Create a new series object and add it to the list
-        series = Series(ID, name, datecreation, season, director, posFile, erased)
-        series_list.append(series)
-
-        # Update the CSV file with the new series
-        save_series(f_series, series)
-        # Update the interface list and table
-        interface_list.append([series.ID, series.name, series.datecreation, series.season, series.director, series.posFile, series.erased])
-        window['-table-'].update(values=interface_list)
-    except ValueError as e:
-        sg.popup_error(f'Error adding the series: {e}')
-
-# Function to update the interface with the current series list
-def update_interface(window, l_series):
-    interface_list = []
-    for o in l_series:
-        if not o.erased:
-            interface_list.append([o.ID, o.name, o.datecreation, o.season, o.director, o.posFile])
-
-    window['-table-'].update(values=interface_list)
+        read_series(file, series_list)
+    finally:
+        series_list.listeners.remove(progress)
+    return len(series_list)
+
+# Whether a job finished since the table was last refreshed changed the rows it shows
+table_stale = False
+
+# Function to show l_series instead of the preview once it is loaded
+def close_preview(model):
+    global preview
+    if preview is not None:
+        model.series_list = l_series
+        preview.close()
+        preview = None
+
+# Function to handle a job finished by the worker
+def finish_job(job, window, model, search_text):
+    window['-status-'].update(job.status())
+    if job.name == 'Load':
+        close_preview(model)
+    # Errors raised by a job (validation errors included) are reported here
+    if job.error is not None:
+        sg.popup_error(job.status())
+    elif job.name == 'Search':
+        model.series_list = job.result
+        model.go_to_page(0)
+    elif search_text and job.name != 'Stop':
+        # Search results are a snapshot of the list: run the search again after a change
+        show_search_results(window, model, search_text)
+
+    # An Add or Modify of a series that is not on the visible page leaves its rows as they are
+    global table_stale
+    if not (job.error is None and job.name in ('Add', 'Modify') and model.series_list is l_series
+            and not model.is_visible(job.result)):
+        table_stale = True
+
+    # The list is only read again once every queued job has finished
+    if not worker.busy():
+        model.clamp()
+        if table_stale:
+            update_interface(window, model)
+            table_stale = False
+        else:
+            window['-page-'].update(model.page_label())
 
 # Function to delete a series from the list and update the interface
-def delete_series(l_series, f_series, selected_row_index, table_data, window):
-    if 0 <= selected_row_index < len(l_series):
-        pos_in_file = l_series[selected_row_index].posFile
-
-        if pos_in_file is not None and pos_in_file != 0:
-            series_to_delete = find_series_by_pos(l_series, pos_in_file)
-
-            if series_to_delete is not None:
-                series_to_delete.erased = -1
-                modify_series(f_series, series_to_delete)
+def delete_series(l_series, f_series, selected_row_index, model, window):
+    selected_series = model.series_at(selected_row_index)
 
-                l_series.remove(series_to_delete)  # Remove directly from the list
+    if selected_series is not None:
+        # Tombstone the series in the file and remove it from the list (on the worker)
+        worker.submit('Delete', delete_series_with_id, f_series, l_series, selected_series.ID)
 
-                # Update the table and interface
-                table_data = update_table_data(l_series)
-                window['-table-'].update(values=table_data)
-                update_interface(window, l_series)
-
-# Function to update series data in the list based on position in the file
-def update_customer(l_series, t_row_customer_interface, pos_in_file):
-    try:
-        pos_in_file = int(pos_in_file)
-        selected_series = None
-        for o in l_series:
-            if o.series_in_pos(pos_in_file):
-                selected_series = o
-                break
-
-        if selected_series is not None:
-            # Update the selected series with new values
-            selected_series.set_series(
-                t_row_customer_interface[0], t_row_customer_interface[1],
-                t_row_customer_interface[2], t_row_customer_interface[3],
-                t_row_customer_interface[4], t_row_customer_interface[5],
-                t_row_customer_interface[6]
-            )
-            modify_series(f_series, selected_series)
-    except ValueError:
-        sg.popup_error('Select a valid row to update.')
-
-# Function to update the table data based on the series list
-def update_table_data(l_series):
-    total_rows = len(l_series)
-    table_data = []
-
-    for i, o in enumerate(l_series):
-        if not o.erased:
-            color = get_color(i, total_rows)
-            table_data.append([o.ID, o.name, o.datecreation, o.season, o.director, o.posFile, color])
-
-    return table_data
+# Function to delete the series with an ID; it is looked up when the job runs, after the jobs
+# queued before it (which may have reloaded the list, or purged it and renumbered PosFile)
+def delete_series_with_id(f_series, l_series, series_id):
+    series_to_delete = find_series_by_id(l_series, series_id)
+    if series_to_delete is None:
+        raise ValueError(f"No series found with ID {series_id}.")
+    delete_series_file(f_series, l_series, series_to_delete)
 
 # Function to purge deleted series from the list and update the interface
-def purge_deleted_series(l_series, f_series, interface_list, window):
-    erased_list = list(filter(lambda c: c.erased, l_series))
-
-    for c in erased_list:
-        pos_in_file = c.posFile
-        if pos_in_file is not None and pos_in_file != 0:
-            c_del = find_series_by_pos(l_series, pos_in_file)
-            if c_del is not None:
-                l_series.remove(c_del)  # Remove directly from the list
+def purge_deleted_series(l_series, f_series, model, window):
+    # Drop the erased series and rewrite the file with the remaining rows (on the worker; the
+    # table is updated when the job finishes)
+    worker.submit('Purge', purge_series, f_series, l_series)
 
-    try:
-        # Filter rows that do not have erased set to -1
-        filtered_rows = [c.to_row() for c in l_series if not c.erased]
-
-        # Overwrite the CSV file with the filtered rows
-        with open(f_series, 'w', newline='', encoding='utf-8') as file:
-            csv_writer = csv.writer(file)
-            csv_writer.writerow(Series.headings)
-            csv_writer.writerows(filtered_rows)
-
-        # Clear the list of deleted series
-        l_series = [c for c in l_series if not c.erased]
-    except Exception as e:
-        sg.popup_error(f'Error writing to the CSV file: {e}')
-
-    # Update the interface and table after deleting rows
-    table_data = update_table_data(l_series)
-    window['-table-'].update(values=table_data)
-    update_interface(window, l_series)
-
-# Function to find a series in the list based on position in the file
-def find_series_by_pos(series_list, pos):
-    for series in series_list:
-        if series.series_in_pos(pos):
-            return series
-    return None
-
-# Function to modify a series in the file
-def modify_series(file, series):
-    temp_file = file + '.temp'
-    with open(file, 'r', newline='', encoding='utf-8') as f, open(temp_file, 'w', newline='', encoding='utf-8') as temp:
-        reader = csv.reader(f)
-        writer = csv.writer(temp)
-
-        for row in reader:
-            if row and row[0].isdigit():
-                if row[5] == str(series.posFile):
-                    writer.writerow(series.to_row())
-                else:
-                    writer.writerow(row)
-
-    os.remove(file)
-    os.rename(temp_file, file)
-
-# Function to find a series in the list based on ID
-def find_series_by_id(series_list, series_id):
-    for series in series_list:
-        if series.ID == series_id:
-            return series
-    return None
-
-# Function to move and clear a file
-def move_and_clear_file(file):
-    new_file = 'newseries.csv'
-    os.rename(file, new_file)
-
-    if os.path.exists(file):  # Check if the original file still exists
-        try:
-            os.remove(file)
-        except OSError as e:
-            print(f"Failed to remove the old file: {e}")
-    os.rename(new_file, file)
-
-# Custom sorting function for sorting series based on date_creation
-def custom_sort(row):
-    date_creation_index = Series.headings.index('-DateCreation-')
-    date_creation = datetime.strptime(row[date_creation_index], '%d/%m/%Y')
-    return date_creation
-
-# Function to sort the series file based on specified columns
-def sort_series(file_path, columns):
-    with open(file_path, 'r', newline='', encoding='utf-8') as file:
-        reader = csv.reader(file)
-        header = next(reader)
-        data = [row for row in reader]
-
-    # Create a custom sorting function
-    def custom_sort(row):
-        return tuple(int(row[header.index(column)]) if column == 'ID' else row[header.index(column)] for column in columns)
-
-    # Apply the sorting
-    data = sorted(data, key=custom_sort)
-
-    # Save the sorted data to a new file
-    new_file_path = 'newseries.csv'
-    with open(new_file_path, 'w', newline='', encoding='utf-8') as new_file:
-        writer = csv.writer(new_file)
-        writer.writerow(header)
-        writer.writerows(data)
-
-    # Remove the original file and rename the new file
-    os.remove(file_path)
-    os.rename(new_file_path, file_path)
-
-# Function to update a series in the list with new data
+# Function to update a series in the list with new data (on the worker: a ValueError, such as a
+# PosFile already in use, is shown by finish_job)
 def update_series(series_list, row_to_update, posinfile):
-    try:
-        # Get the ID of the series to update
-        series_id = int(row_to_update[0])
-
-        # Find the series in the list by ID
-        series = find_series_by_id(series_list, series_id)
+    # Find the series in the list by ID
+    series = find_series_by_id(series_list, row_to_update[0])
 
-        if series:
-            # Update the series values with the new values from the interface
-            series.name = row_to_update[1]
-            series.datecreation = row_to_update[2]
-            series.season = row_to_update[3]
-            series.director = row_to_update[4]
-            series.posFile = posinfile
-
-    except ValueError:
-        print("Error updating the series: Invalid ID.")
+    if series:
+        # Update the series values with the new values from the interface
+        series_list.modify(series, name=row_to_update[1], datecreation=row_to_update[2],
+                           season=row_to_update[3], director=row_to_update[4], posFile=posinfile)
 
 # Function to handle the modify event for updating a series
-def handle_modify_event(event, values, series_list, table_data, window):
+def handle_modify_event(event, values, series_list, model, window):
     # Input validation
     valid = False
-    if re.match(pattern_id, values['-ID-']):
+    if match_id(values['-ID-']):
         # Add more validation conditions as needed
         valid = True
 
     if valid:
-        row_to_update = None
-        for t in table_data:
-            if str(t[0]) == values['-ID-']:
-                row_to_update = t
-                # Update series data with new values
-                t[1], t[2], t[3], t[4], t[5] = values['-Name-'], values['-DateCreation-'], values['-Season-'], values['-Director-'], values['-PosFile-']
-                posinfile = values['-PosFile-']
-                break
+        # Update the series list and the file with the new values (on the worker)
+        row_to_update = [values['-ID-'], values['-Name-'], values['-DateCreation-'], values['-Season-'], values['-Director-']]
+        worker.submit('Modify', modify_series_row, series_list, row_to_update, values['-PosFile-'])
+        window['-ID-'].update(disabled=False)
 
-        if row_to_update is None:
-            print("Error: No series found with the provided ID in the event.")
-            return
+# Function to apply a modification from the interface to the list and the file
+def modify_series_row(series_list, row_to_update, posinfile):
+    series = find_series_by_id(series_list, row_to_update[0])
+    if series is None:
+        raise ValueError("No series found with the provided ID.")
 
-        # Update the series list
-        update_series(series_list, row_to_update, posinfile)
+    # Update the series list with the new values
+    old_pos = series.posFile
+    update_series(series_list, row_to_update, posinfile)
 
-        # Update the CSV file with the changes
-        modify_series(f_series, find_series_by_id(series_list, int(values['-ID-'])))
+    # Update the file with the changes (a record file also frees the old PosFile slot)
+    modify_series(f_series, series, old_pos=old_pos)
+    return series
 
-        # Update the table interface
-        window['-table-'].update(table_data)
-        window['-ID-'].update(disabled=False)
+# Function to sort the file and reload the list from it
+def sort_and_reload(columns, descending, job):
+    sort_series(f_series, columns, descending)
+    return load_series_list(f_series, l_series, job)
+
+# Function to empty the file and reload the list from it
+def clear_and_reload(job):
+    move_and_clear_file(f_series)
+    return load_series_list(f_series, l_series, job)
 
-# Function to display a window for sorting the series file
+# Function to display a window for choosing the sort columns; returns (columns, descending),
+# or None if it was cancelled
 def sort_series_window():
     sg.theme('DarkGrey5')
 
     layout = [
         [sg.Text('Select columns to sort by:', font=('Arial', 14), text_color='white')],
         [sg.Checkbox(column, key=f'-{column}-', font=('Arial', 12), text_color='white', background_color='black') for column in Series.headings[:-1]],
+        [sg.Checkbox('Descending', key='-Descending-', font=('Arial', 12), text_color='white', background_color='black')],
         [sg.Button('Sort', button_color=('black', 'red')), sg.Button('Cancel', button_color=('black', 'red'))]
     ]
 
     window = sg.Window('Sort File', layout, finalize=True, background_color='black')
+    choice = None
 
     while True:
         event, values = window.read()
@@ -313,17 +202,11 @@ def sort_series_window():
         if event == 'Sort':
             selected_columns = [column for column in Series.headings[:-1] if values[f'-{column}-']]
             if selected_columns:
-                sort_series(f_series, selected_columns)
-                read_series(f_series, l_series)  # Reload the list after sorting
-                window.close()
+                choice = (selected_columns, values['-Descending-'])
                 break
 
     window.close()
-
-# Function to get color based on row index and total rows
-def get_color(i, total_rows):
-    r = int(255 - i / total_rows * 255)
-    return f'#{r:02X}0000'
+    return choice
 
 # Main interface function
 def interface():
@@ -341,18 +224,6 @@ def interface():
     font1, font2 = ('Arial', 14), ('Arial', 16)
     sg.set_options(font=font1)
 
-    # Initialize table data
-    table_data = []
-    row_to_update = []
-    read_series(f_series, l_series)
-    total_rows = len(l_series)
-
-    # Populate table data with series information, excluding those with erased set to -1
-    for i, o in enumerate(l_series):
-        if o.erased != -1:
-            color = get_color(i, total_rows)
-            table_data.append([o.ID, o.name, o.datecreation, o.season, o.director, o.posFile, color])
-
     # Define the layout of the GUI
     layout = [
         [sg.Column(
@@ -360,11 +231,20 @@ def interface():
               sg.Input(key=key, text_color='black')] for key, text in
              Series.fields.items()],
             justification='right', background_color=get_color(0, 1)),
-         sg.Table(values=table_data, headings=Series.headings[:-1], max_col_width=50, num_rows=10,
+         sg.Table(values=table_model.rows(), headings=Series.headings[:-1], max_col_width=50, num_rows=TABLE_ROWS,
+                  row_colors=table_model.row_colors(),
                   display_row_numbers=False, justification='center', enable_events=True,
                   enable_click_events=True,
                   vertical_scroll_only=False, select_mode=sg.TABLE_SELECT_MODE_BROWSE,
                   expand_x=True, bind_return_key=True, key='-table-')],
+        [sg.Push(background_color), sg.Input(key='-search-', text_color='black', size=(40, 1)),
+         sg.Button('Search', button_color=('black', 'red')), sg.Button('Show All', button_color=('black', 'red')),
+         sg.Push(background_color)],
+        [sg.Push(background_color), sg.Button('<<', button_color=('black', 'red')),
+         sg.Text(table_model.page_label(), key='-page-', text_color='black'),
+         sg.Button('>>', button_color=('black', 'red')), sg.Push(background_color)],
+        [sg.Push(background_color), sg.Text('', key='-status-', text_color='black', size=(60, 1)),
+         sg.Push(background_color)],
         [sg.Push(background_color)] +
         [sg.Button(button, button_color=('black', 'red')) for button in ('Purge','Add', 'Delete', 'Modify', 'Clear', 'Clean Cells','Sort File')] +
         [sg.Push(background_color)],
@@ -376,22 +256,62 @@ def interface():
                        background_color=get_color(0, 1))
     window['-table-'].bind("<Double-Button-1>", " Double")
 
+    # Load the series on the worker. A CSV catalogue is shown from its line index meanwhile
+    # (reopening it only reads the index); otherwise the table fills when the job finishes.
+    global worker, preview
+    preview = open_mapped_series(f_series)
+    if preview is not None:
+        table_model.series_list = preview
+        update_interface(window, table_model)
+    worker = StorageWorker(window.write_event_value)
+    worker.submit('Load', load_series_list, f_series, l_series, progress=True)
+
+    # Text of the search shown in the table ('' shows every series)
+    search_text = ''
+
     # Event loop for handling user interactions
     while True:
         event, values = window.read()
         if event == sg.WIN_CLOSED:
             break
+        if event == JOB_PROGRESS:
+            name, done, total = values[event]
+            window['-status-'].update(f'{name}: {done} series...' if total is None else f'{name}: {done} of {total}...')
+            continue
+        if event == JOB_DONE:
+            finish_job(values[event], window, table_model, search_text)
+            continue
+        if preview is not None and event in LOADED_EVENTS:
+            window['-status-'].update('Loading: the catalogue can be searched and changed once it is loaded.')
+            continue
+        if event == 'Search':
+            search_text = values['-search-']
+            table_model.go_to_page(0)
+            show_search_results(window, table_model, search_text)
+            continue
+        if event == 'Show All':
+            search_text = ''
+            window['-search-'].update('')
+            show_search_results(window, table_model, search_text)
+            continue
         # Handle various button events
         if event == 'Add':
-            add_series(l_series, table_data, values, window)
+            add_series(l_series, table_model, values, window)
         elif event == 'Delete':
-            delete_series(l_series, f_series, values['-table-'][0], table_data, window)
+            if values['-table-']:
+                delete_series(l_series, f_series, values['-table-'][0], table_model, window)
         elif event == 'Modify':
-            handle_modify_event(event, values, l_series, table_data, window)
+            handle_modify_event(event, values, l_series, table_model, window)
+        elif event in ('<<', '>>'):
+            # The list may be changing while jobs run; the table is refreshed when they finish
+            # (the preview does not change, so it can be paged while the list loads)
+            if worker.busy() and table_model.series_list is not preview:
+                window['-status-'].update('Busy: the table will be updated when the current job finishes.')
+                continue
+            table_model.scroll(-1 if event == '<<' else 1)
+            update_interface(window, table_model)
         elif event == 'Clear':
-            move_and_clear_file(f_series)
-            read_series(f_series, l_series)
-            window['-table-'].update(values=update_table_data(l_series))
+            worker.submit('Clear', clear_and_reload, progress=True)
             window['-ID-'].update('')
             window['-Name-'].update('')
             window['-DateCreation-'].update('')
@@ -407,16 +327,19 @@ def interface():
             window['-Director-'].update('')
             window['-PosFile-'].update('')
         elif event == 'Purge':
-            purge_deleted_series(l_series, f_series, table_data, window)
+            purge_deleted_series(l_series, f_series, table_model, window)
         elif event == 'Sort File':
-            sort_series_window()
-            read_series(f_series, l_series)
-            update_interface(window, l_series)
+            # The file is sorted and l_series reloaded on the worker
+            choice = sort_series_window()
+            if choice is not None:
+                worker.submit('Sort', sort_and_reload, *choice, progress=True)
         elif event == '-table-':
             # Handle double-click event on the table to display selected data in the input cells
             if values[event] and len(values[event]) > 0:
-                selected_row_index = values[event][0]
-                selected_series = l_series[selected_row_index]
+                # Rows shown by the table, even if a job is changing the list
+                selected_series = table_model.series_at(values[event][0])
+                if selected_series is None:
+                    continue
                 # Update the input cells with the selected series data
                 window['-ID-'].update(selected_series.ID)
                 window['-Name-'].update(selected_series.name)
@@ -425,8 +348,12 @@ def interface():
                 window['-Director-'].update(selected_series.director)
                 window['-PosFile-'].update(selected_series.posFile)
 
-    # Close the window when the event loop exits
+    # Let the queued jobs finish (they may be writing the file), then close the storages on the
+    # worker thread and the window
+    worker.stop(close_storages)
+    close_preview(table_model)
     window.close()
 
-# Call the interface function to run the GUI
-interface()
+# Call the interface function to run the GUI (importing this module has no side effects)
+if __name__ == '__main__':
+    interface()
@@ -0,0 +1,242 @@
+import csv
+import io
+import os
+import tempfile
+from Series import Series
+from FileLock import get_lock
+from Snapshot import save_snapshot
+from SeriesCollection import index_key
+from Metrics import instrumented
+import Metrics
+
+# Journal file written next to the base file (series.csv -> series.csv.journal)
+JOURNAL_SUFFIX = '.journal'
+# Number of journal records written between two fsync calls (1 = fsync every record)
+FSYNC_BATCH = 16
+# Journal size in bytes that triggers an automatic compaction into the base file
+COMPACT_THRESHOLD = 1024 * 1024
+
+# Journal record types
+OP_ADD = 'A'
+OP_UPDATE = 'U'
+OP_DELETE = 'D'
+
+# Open journals, one per base file, so the handle is reused between writes
+journals = {}
+
+# Function to convert the numeric columns of a row read as text (ID, Season, PosFile, Erased)
+def parse_row(row):
+    row = list(row)
+    for i in (0, 3, 5, 6):
+        row[i] = index_key(row[i])
+    return row
+
+# Append-only write-ahead journal of add, update and tombstone records for a base CSV file.
+# Several processes may append to it: every write holds the exclusive lock of the base file,
+# is flushed before the lock is released and bumps the generation counter (see FileLock).
+class Journal:
+    def __init__(self, base_file, fsync_batch=FSYNC_BATCH, compact_threshold=COMPACT_THRESHOLD):
+        self.base_file = base_file
+        self.path = base_file + JOURNAL_SUFFIX
+        self.fsync_batch = fsync_batch
+        self.compact_threshold = compact_threshold
+        self.handle = None
+        self.writer = None
+        self.pending = 0
+        self.lock = get_lock(base_file)
+
+    # Method to open the journal for appending (once; the handle is then reused unless another
+    # process compacted the journal, which removes the file the handle points to)
+    def open_handle(self):
+        if self.handle is not None:
+            try:
+                current = os.path.samestat(os.fstat(self.handle.fileno()), os.stat(self.path))
+            except FileNotFoundError:
+                current = False
+            if not current:
+                self.close()
+        if self.handle is None:
+            self.handle = open(self.path, 'a', newline='', encoding='utf-8')
+            self.writer = csv.writer(self.handle)
+
+    # Method to append one record. It is flushed at once so other processes see it, and
+    # fsynced once per batch (group commit).
+    def append(self, op, row):
+        with self.lock.exclusive():
+            self.open_handle()
+            start = self.handle.tell() if Metrics.enabled else 0
+            self.writer.writerow([op] + list(row))
+            self.handle.flush()
+            if Metrics.enabled:
+                Metrics.count_bytes('journal_append', written=self.handle.tell() - start)
+            self.pending += 1
+            if self.pending >= self.fsync_batch:
+                self.sync()
+            self.lock.bump()
+
+    # Method to append many records of the same type with a single buffered write and fsync
+    def append_many(self, op, rows):
+        with self.lock.exclusive():
+            self.open_handle()
+            start = self.handle.tell() if Metrics.enabled else 0
+            self.writer.writerows([op] + list(row) for row in rows)
+            self.sync()
+            if Metrics.enabled:
+                Metrics.count_bytes('journal_append', written=self.handle.tell() - start)
+            self.lock.bump()
+
+    def log_add(self, series):
+        self.append(OP_ADD, series.to_row())
+
+    # An update that changes the ID of a series also records the ID it was stored under
+    def log_update(self, series, old_id=None):
+        row = series.to_row()
+        if old_id is not None and index_key(old_id) != index_key(series.ID):
+            row.append(old_id)
+        self.append(OP_UPDATE, row)
+
+    def log_delete(self, series):
+        self.append(OP_DELETE, series.to_row())
+
+    # Method to force the pending records to disk
+    def sync(self):
+        if self.handle is not None:
+            self.handle.flush()
+            os.fsync(self.handle.fileno())
+        self.pending = 0
+
+    def close(self):
+        if self.handle is not None:
+            self.sync()
+            self.handle.close()
+        self.handle = None
+        self.writer = None
+
+    def size(self):
+        if self.handle is not None:
+            self.handle.flush()
+        return os.path.getsize(self.path) if os.path.exists(self.path) else 0
+
+    def needs_compaction(self):
+        return self.size() >= self.compact_threshold
+
+    # Method to iterate over the journal records as (op, row, key), from a byte offset given by
+    # size() (records already seen are skipped when refreshing a list). key is the ID the record
+    # applies to: the ID of the row, or the previous ID for an update that changed it.
+    def entries(self, start=0):
+        if self.handle is not None:
+            self.handle.flush()
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'rb') as f:
+            f.seek(start)
+            text = f.read().decode('utf-8')
+        for record in csv.reader(io.StringIO(text, newline='')):
+            key = None
+            if record and record[0] == OP_UPDATE and len(record) == len(Series.headings) + 2:
+                key = index_key(record.pop())
+            # A torn last line (crash in the middle of a write) is ignored
+            if len(record) != len(Series.headings) + 1:
+                continue
+            row = parse_row(record[1:])
+            yield record[0], row, row[0] if key is None else key
+
+    # Method to apply the journal (or the given records) onto a SeriesCollection loaded from the base file
+    def replay(self, series_list, entries=None):
+        for op, row, key in self.entries() if entries is None else entries:
+            series = series_list.find_by_id(key)
+            if op == OP_ADD:
+                if series is None:
+                    series_list.append(Series(*row))
+            elif op == OP_UPDATE:
+                if series is None:
+                    series = series_list.find_by_pos(row[5])
+                # An update of a series that is not stored yet (upsert) adds it
+                if series is None:
+                    if not row[6]:
+                        series_list.append(Series(*row))
+                else:
+                    series_list.modify(series, **dict(zip(('ID', 'name', 'datecreation', 'season',
+                                                           'director', 'posFile', 'erased'), row)))
+            elif op == OP_DELETE:
+                if series is not None:
+                    series_list.remove(series)
+
+    # Method to apply the journal records to the (parsed) rows of the base file without writing
+    # anything; returns the resulting rows in base order, added series last
+    def merge_rows(self, rows):
+        merged = {row[0]: row for row in rows}
+        for op, row, key in self.entries():
+            if key != row[0]:
+                merged.pop(key, None)
+            if op == OP_DELETE:
+                merged.pop(row[0], None)
+            else:
+                merged[row[0]] = row
+        return list(merged.values())
+
+    # Method to drop the journal once its content is part of the base file
+    def reset(self):
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    # Method to fold the journal into the base file. With a series list the base is rewritten
+    # from it (it must include the journal: refresh it first, see FileStorage.refresh);
+    # otherwise base and journal are merged from disk.
+    @instrumented('journal_compact')
+    def compact(self, series_list=None):
+        with self.lock.exclusive():
+            self.compact_locked(series_list)
+
+    def compact_locked(self, series_list):
+        if Metrics.enabled:
+            Metrics.count_bytes('journal_compact', read=Metrics.file_size(self.path) + (
+                0 if series_list is not None else Metrics.file_size(self.base_file)))
+        self.sync()
+        if series_list is not None:
+            rows = [s.to_row() for s in series_list if not s.erased]
+        else:
+            base = []
+            if os.path.exists(self.base_file):
+                with open(self.base_file, 'r', newline='', encoding='utf-8') as f:
+                    reader = csv.reader(f)
+                    next(reader, None)
+                    base = [parse_row(row) for row in reader if row and row[0].isdigit()]
+            rows = [row for row in self.merge_rows(base) if not row[6]]
+
+        # A unique temporary file in the same directory, so the replace below is atomic
+        fd, temp_file = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self.base_file)), suffix='.compact')
+        with os.fdopen(fd, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(Series.headings)
+            writer.writerows(rows)
+            f.flush()
+            os.fsync(f.fileno())
+        if Metrics.enabled:
+            Metrics.count_bytes('journal_compact', written=Metrics.file_size(temp_file))
+        os.replace(temp_file, self.base_file)
+        self.reset()
+        self.lock.bump(rewrite=True)
+        # The rows of the new base are at hand: the next load does not have to parse it
+        save_snapshot(self.base_file, rows)
+
+# Function to get the (shared) journal of a base file
+def get_journal(file):
+    journal = journals.get(file)
+    if journal is None:
+        journal = journals[file] = Journal(file)
+    return journal
+
+# Function to compact the journal of a file if it grew past its threshold; returns True if it did
+def compact_if_needed(file):
+    journal = get_journal(file)
+    if journal.needs_compaction():
+        journal.compact()
+        return True
+    return False
+
+# Function to flush and close every open journal (called when the application exits)
+def close_journals():
+    for journal in journals.values():
+        journal.close()
@@ -0,0 +1,157 @@
+import csv
+import io
+import mmap
+import os
+import struct
+import tempfile
+from array import array
+from Series import Series
+from Journal import parse_row, get_journal
+from RecordFile import is_record_file
+from Storage import is_sqlite_file
+
+# Random-access reader over a series CSV file. The file is memory-mapped and a compact index
+# with the byte offset of every data row is kept next to it (series.csv -> series.csv.idx), so
+# opening a large file only reads the index, and rows are parsed (and turned into Series) only
+# when they are requested. The index is rebuilt when the size or mtime of the CSV changes.
+#
+# It reads the base file only: pending journal records are not applied (compact them first).
+# Because it has len() and integer indexing, it can be given to TableModel as the series list:
+# the GUI shows the catalogue from it while the full load runs (see open_mapped_series).
+
+INDEX_SUFFIX = '.idx'
+INDEX_MAGIC = b'SERIEIDX'
+# Magic, CSV size, CSV mtime (ns), number of rows
+index_header = struct.Struct('<8sqqq')
+
+class MappedSeriesFile:
+    def __init__(self, file):
+        self.file = file
+        self.index_path = file + INDEX_SUFFIX
+        self.handle = open(file, 'rb')
+        stat = os.fstat(self.handle.fileno())
+        self.size = stat.st_size
+        self.mtime = stat.st_mtime_ns
+        self.mm = mmap.mmap(self.handle.fileno(), 0, access=mmap.ACCESS_READ) if self.size else b''
+        self.offsets = self.load_index()
+        if self.offsets is None:
+            self.offsets = self.build_index()
+            self.save_index()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if isinstance(self.mm, mmap.mmap):
+            self.mm.close()
+        self.handle.close()
+
+    # Method to read the persisted index if it still matches the CSV file, or None
+    def load_index(self):
+        try:
+            with open(self.index_path, 'rb') as f:
+                data = f.read(index_header.size)
+                if len(data) < index_header.size:
+                    return None
+                magic, size, mtime, count = index_header.unpack(data)
+                if magic != INDEX_MAGIC or size != self.size or mtime != self.mtime:
+                    return None
+                offsets = array('q')
+                offsets.fromfile(f, count + 1)
+                return offsets
+        except (OSError, EOFError):
+            return None
+
+    # Written to a unique temporary file that atomically replaces the old index, so a crash
+    # never leaves a truncated one
+    def save_index(self):
+        temp_file = None
+        try:
+            fd, temp_file = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self.index_path)), suffix='.idx')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(index_header.pack(INDEX_MAGIC, self.size, self.mtime, len(self.offsets) - 1))
+                self.offsets.tofile(f)
+            os.replace(temp_file, self.index_path)
+        except OSError as e:
+            # The index is only a cache: a read-only directory just means rebuilding it next time
+            print(f"Failed to save the line index: {e}")
+            if temp_file is not None and os.path.exists(temp_file):
+                os.remove(temp_file)
+
+    # Method to scan the file for row starts. The result holds the start of every data row
+    # plus the end of the file; row k starts at offsets[k] and ends before offsets[k + 1].
+    def build_index(self):
+        mm = self.mm
+        offsets = array('q')
+        end = len(mm)
+        # Skip the header row
+        pos = mm.find(b'\n') + 1 if end else 0
+        if pos == 0:
+            pos = end
+        # Quoted fields may contain newlines; only then do lines have to be checked for quotes
+        quoted = mm.find(b'"', pos) != -1
+        while pos < end:
+            start = pos
+            newline = mm.find(b'\n', pos)
+            while quoted and newline != -1 and mm[start:newline].count(b'"') % 2:
+                newline = mm.find(b'\n', newline + 1)
+            pos = end if newline == -1 else newline + 1
+            # Blank lines are not rows
+            if mm[start:pos].strip():
+                offsets.append(start)
+        offsets.append(end)
+        return offsets
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    # Method to get the parsed values of row k (same order as Series.headings)
+    def row(self, k):
+        if k < 0:
+            k += len(self)
+        if not 0 <= k < len(self):
+            raise IndexError("MappedSeriesFile index out of range")
+        text = self.mm[self.offsets[k]:self.offsets[k + 1]].decode('utf-8')
+        # Only the first record is parsed; blank lines may follow it
+        return parse_row(next(csv.reader(io.StringIO(text, newline=''))))
+
+    # Method to get the parsed values of rows start..stop-1
+    def rows(self, start, stop):
+        start, stop, _ = slice(start, stop).indices(len(self))
+        if start >= stop:
+            return []
+        text = self.mm[self.offsets[start]:self.offsets[stop]].decode('utf-8')
+        return [parse_row(row) for row in csv.reader(io.StringIO(text, newline='')) if ''.join(row).strip()]
+
+    def series(self, k):
+        return Series(*self.row(k))
+
+    def series_range(self, start, stop):
+        return [Series(*row) for row in self.rows(start, stop)]
+
+    def __getitem__(self, k):
+        if isinstance(k, slice):
+            if k.step not in (None, 1):
+                return [self.series(i) for i in range(*k.indices(len(self)))]
+            return self.series_range(k.start, k.stop)
+        return self.series(k)
+
+    def __iter__(self):
+        for k in range(len(self)):
+            yield self.series(k)
+
+# Function to open a CSV catalogue for display while it is being loaded, or None when the base
+# file alone would not show it as it is (record and SQLite files, or pending journal records)
+def open_mapped_series(file):
+    if is_record_file(file) or is_sqlite_file(file) or not os.path.exists(file):
+        return None
+    if get_journal(file).size():
+        return None
+    try:
+        return MappedSeriesFile(file)
+    except (OSError, ValueError) as e:
+        print(f"Failed to map the series file: {e}")
+        return None
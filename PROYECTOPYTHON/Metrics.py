@@ -0,0 +1,181 @@
+import atexit
+import functools
+import json
+import os
+import sys
+import threading
+import time
+
+# Opt-in instrumentation of the storage layer: call counters, latency histograms, bytes read and
+# written per operation, plus an optional cProfile mode and a trace of every call.
+#
+#   SERIES_METRICS=1          collect counters, histograms and bytes
+#   SERIES_PROFILE=1          also run the instrumented operations under cProfile
+#   SERIES_TRACE=1            print every instrumented call with its duration to stderr
+#   SERIES_METRICS_FILE=path  write a JSON snapshot to path when the process exits
+#
+# Each variable turns the collection on. When disabled, an instrumented function costs one extra
+# call and one flag test. Instrumented calls may run on several threads (the GUI and its storage
+# worker): the figures are updated under a lock, and one thread at a time runs under cProfile.
+
+tracing = os.environ.get('SERIES_TRACE') == '1'
+enabled = os.environ.get('SERIES_METRICS') == '1' or os.environ.get('SERIES_PROFILE') == '1' or tracing
+profiler = None
+
+# Upper bounds (in seconds) of the latency histogram buckets; the last bucket is open-ended
+BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+# Statistics by operation name, guarded by stats_lock
+stats = {}
+stats_lock = threading.Lock()
+# Depth of the nested instrumented calls of each thread (the profiler only follows the outermost one)
+local = threading.local()
+# Held by the thread whose calls the profiler is following
+profiling = threading.Lock()
+
+class OperationStats:
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.total_s = 0.0
+        self.max_s = 0.0
+        self.histogram = [0] * (len(BUCKETS) + 1)
+        self.bytes_read = 0
+        self.bytes_written = 0
+
+    def record(self, elapsed, failed):
+        self.calls += 1
+        self.errors += failed
+        self.total_s += elapsed
+        self.max_s = max(self.max_s, elapsed)
+        for i, bound in enumerate(BUCKETS):
+            if elapsed <= bound:
+                self.histogram[i] += 1
+                break
+        else:
+            self.histogram[-1] += 1
+
+    def to_dict(self):
+        labels = [f'<={bound}s' for bound in BUCKETS] + [f'>{BUCKETS[-1]}s']
+        return {
+            'calls': self.calls,
+            'errors': self.errors,
+            'total_s': self.total_s,
+            'mean_s': self.total_s / self.calls if self.calls else 0.0,
+            'max_s': self.max_s,
+            'histogram': dict(zip(labels, self.histogram)),
+            'bytes_read': self.bytes_read,
+            'bytes_written': self.bytes_written,
+        }
+
+def get_stats(name):
+    entry = stats.get(name)
+    if entry is None:
+        entry = stats[name] = OperationStats()
+    return entry
+
+# Function to turn the collection on or off at run time (profile=True also starts cProfile)
+def enable(profile=False, trace=None):
+    global enabled, profiler, tracing
+    enabled = True
+    if trace is not None:
+        tracing = trace
+    if profile and profiler is None:
+        import cProfile
+        profiler = cProfile.Profile()
+
+def disable():
+    global enabled, profiler
+    enabled = False
+    profiler = None
+
+def reset():
+    with stats_lock:
+        stats.clear()
+    if profiler is not None:
+        profiler.clear()
+
+# Function to add bytes read or written to an operation (callers test Metrics.enabled first)
+def count_bytes(name, read=0, written=0):
+    with stats_lock:
+        entry = get_stats(name)
+        entry.bytes_read += read
+        entry.bytes_written += written
+
+# Function to get the size of a file for count_bytes, 0 if it does not exist
+def file_size(path):
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+# Decorator recording every call of a storage operation under the given name
+def instrumented(name):
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not enabled:
+                return func(*args, **kwargs)
+            return call(name, func, args, kwargs)
+        return wrapper
+    return decorator
+
+def call(name, func, args, kwargs):
+    depth = getattr(local, 'depth', 0)
+    # Kept in a local variable: another thread may call disable() meanwhile
+    active = profiler
+    if active is not None and (depth > 0 or not profiling.acquire(blocking=False)):
+        active = None
+    local.depth = depth + 1
+    failed = True
+    if active is not None:
+        active.enable()
+    start = time.perf_counter()
+    try:
+        result = func(*args, **kwargs)
+        failed = False
+        return result
+    finally:
+        elapsed = time.perf_counter() - start
+        if active is not None:
+            active.disable()
+            profiling.release()
+        local.depth = depth
+        with stats_lock:
+            get_stats(name).record(elapsed, failed)
+        if tracing:
+            print(f"[metrics] {name} {elapsed * 1000:.3f} ms{' (failed)' if failed else ''}", file=sys.stderr)
+
+# Function to get the current figures as a dictionary
+def snapshot():
+    with stats_lock:
+        return {name: entry.to_dict() for name, entry in sorted(stats.items())}
+
+def export_json(path=None):
+    text = json.dumps(snapshot(), indent=2)
+    if path:
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
+    return text
+
+# Function to format the figures (and the profile, if any) as a text report
+def export_text(profile_lines=30):
+    lines = [f"{'operation':<26}{'calls':>8}{'errors':>8}{'mean ms':>10}{'max ms':>10}{'read KB':>10}{'written KB':>12}"]
+    with stats_lock:
+        for name, entry in sorted(stats.items()):
+            mean = entry.total_s / entry.calls if entry.calls else 0.0
+            lines.append(f"{name:<26}{entry.calls:>8}{entry.errors:>8}{mean * 1000:>10.3f}{entry.max_s * 1000:>10.3f}"
+                         f"{entry.bytes_read / 1024:>10.1f}{entry.bytes_written / 1024:>12.1f}")
+    if profiler is not None:
+        import io
+        import pstats
+        out = io.StringIO()
+        pstats.Stats(profiler, stream=out).sort_stats('cumulative').print_stats(profile_lines)
+        lines.append(out.getvalue())
+    return '\n'.join(lines)
+
+if os.environ.get('SERIES_PROFILE') == '1':
+    enable(profile=True)
+
+if os.environ.get('SERIES_METRICS_FILE'):
+    atexit.register(lambda: export_json(os.environ['SERIES_METRICS_FILE']))
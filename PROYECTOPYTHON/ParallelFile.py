@@ -0,0 +1,182 @@
+import csv
+import gc
+import io
+import heapq
+import mmap
+import os
+import pickle
+import tempfile
+from operator import itemgetter
+from Journal import parse_row
+from SortFile import parse_specs, make_key
+
+# Multi-core reading and sorting of large series CSV files. The data rows are split into byte
+# ranges that end on a record boundary, and each range is parsed (or sorted into a run file) by
+# a process of a pool. The results are handed back in file order, so the outcome is the same as
+# the serial path: loads go through SeriesCollection.extend chunk after chunk (an ID or PosFile
+# repeated anywhere in the file raises the same ValueError at the same row), and sorted runs are
+# merged stably, earlier runs first on equal keys, into the same bytes the serial sort writes.
+#
+# The number of processes is SERIES_WORKERS (environment variable) or one per core.
+#
+# The pool uses the 'spawn' start method: it is the same on every platform and safe from the
+# GUI, whose storage worker thread may hold locks when a fork would happen. Starting it costs a
+# few hundred milliseconds, so only files of at least PARALLEL_MIN_SIZE bytes are split.
+
+# Files smaller than this (in bytes) are read and sorted on a single core
+PARALLEL_MIN_SIZE = 32 * 1024 * 1024
+# Largest byte range handled by one task (bounds the memory of each process)
+CHUNK_BYTES = 16 * 1024 * 1024
+# Byte ranges per process when a file is loaded: the main process builds the series of the
+# first ranges while the pool parses the next ones
+RANGES_PER_WORKER = 4
+
+# Function to get the default number of processes
+def default_workers():
+    workers = os.environ.get('SERIES_WORKERS')
+    if workers:
+        return max(int(workers), 1)
+    return os.cpu_count() or 1
+
+# Function to check if a file is worth splitting across processes
+def use_parallel(file, workers=None):
+    workers = default_workers() if workers is None else workers
+    return workers > 1 and os.path.exists(file) and os.path.getsize(file) >= PARALLEL_MIN_SIZE
+
+# Function to find the first record boundary at or after a position. start must be a record
+# boundary: a newline ends a record when the number of quotes since start is even (quoted
+# values may contain newlines, and an escaped quote is written twice).
+def record_end(data, start, position):
+    quotes = data[start:position].count(b'"')
+    while True:
+        newline = data.find(b'\n', position)
+        if newline == -1:
+            return len(data)
+        quotes += data[position:newline].count(b'"')
+        position = newline + 1
+        if quotes % 2 == 0:
+            return position
+
+# Function to split the data rows of a CSV file (after the header) into at least count byte
+# ranges of at most chunk_bytes bytes, each ending on a record boundary
+def chunk_ranges(file, count, chunk_bytes=None):
+    chunk_bytes = chunk_bytes or CHUNK_BYTES
+    if os.path.getsize(file) == 0:
+        return []
+    with open(file, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        start = record_end(data, 0, 0)
+        size = len(data)
+        count = max(count, -(-(size - start) // chunk_bytes))
+        step = max((size - start) // count, 1)
+        ranges = []
+        while start < size:
+            end = record_end(data, start, min(start + step, size))
+            ranges.append((start, end))
+            start = end
+    return ranges
+
+# Function to read the CSV rows of a byte range of a file (empty rows skipped)
+def read_range_rows(file, start, end):
+    with open(file, 'rb') as f:
+        f.seek(start)
+        text = f.read(end - start).decode('utf-8')
+    return [row for row in csv.reader(io.StringIO(text, newline='')) if row]
+
+# Task of the pool: parse a byte range into typed rows. They are sent back as columns, which
+# pickle faster than one list per row, unless a row does not have the 7 fields of a Series.
+def parse_range(file, start, end):
+    rows = [parse_row(row) for row in read_range_rows(file, start, end)]
+    if any(len(row) != 7 for row in rows):
+        return None, rows
+    return [list(column) for column in zip(*rows)], None
+
+# Rows of a sorted run pickled together
+RUN_BATCH = 10000
+
+# File-like object collecting the lines a csv writer writes (one write call per row)
+class LineCollector:
+    def __init__(self):
+        self.lines = []
+        self.write = self.lines.append
+
+# Task of the pool: sort a byte range into a run file and return its path. The run holds
+# batches of (key, CSV line) pairs, so the merge neither parses CSV nor computes keys again.
+def sort_range(file, start, end, header, columns, descending):
+    key, reverse = make_key(parse_specs(header, columns, descending))
+    rows = read_range_rows(file, start, end)
+    keys = list(map(key, rows))
+    order = sorted(range(len(rows)), key=keys.__getitem__, reverse=reverse)
+    collector = LineCollector()
+    csv.writer(collector).writerows(rows[i] for i in order)
+    pairs = list(zip((keys[i] for i in order), collector.lines))
+
+    fd, run = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(file)), suffix='.run')
+    with os.fdopen(fd, 'wb') as f:
+        for first in range(0, len(pairs), RUN_BATCH):
+            pickle.dump(pairs[first:first + RUN_BATCH], f, pickle.HIGHEST_PROTOCOL)
+    return run
+
+# Function to iterate over the (key, CSV line) pairs of a run file
+def iter_run_pairs(run):
+    with open(run, 'rb') as f:
+        while True:
+            try:
+                yield from pickle.load(f)
+            except EOFError:
+                return
+
+# Function to start a process pool. Its processes run with the cyclic garbage collector off,
+# like the loads of the main process (see SerializeFile.gc_paused): the rows they build form no
+# cycles, and the collections would more than double the parsing time.
+def process_pool(workers):
+    # Imported here: only big files need a pool, and plain loads stay cheap to import
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                               initializer=gc.disable)
+
+# Generator over the typed rows of a CSV file parsed by a process pool, one list of rows per
+# byte range, in file order. Ranges are parsed ahead while the caller consumes earlier ones.
+def iter_row_chunks_parallel(file, workers=None):
+    workers = workers or default_workers()
+    ranges = chunk_ranges(file, workers * RANGES_PER_WORKER)
+    if not ranges:
+        return
+    starts, ends = zip(*ranges)
+    with process_pool(workers) as pool:
+        for columns, rows in pool.map(parse_range, [file] * len(ranges), starts, ends):
+            yield list(zip(*columns)) if columns is not None else rows
+
+# Function to sort a CSV file with a process pool: every byte range is sorted into a run file
+# in parallel, and the runs are merged here into a new temporary file (with the header), whose
+# path is returned. The run files are removed.
+def sort_file_parallel(file, header, columns, descending=False, workers=None):
+    workers = workers or default_workers()
+    ranges = chunk_ranges(file, workers)
+    _, reverse = make_key(parse_specs(header, columns, descending))
+    with process_pool(workers) as pool:
+        futures = [pool.submit(sort_range, file, start, end, header, columns, descending)
+                   for start, end in ranges]
+        runs = []
+        try:
+            for future in futures:
+                runs.append(future.result())
+        except BaseException:
+            # Remove the runs of the tasks still running too (the others are cancelled)
+            for future in futures:
+                if not future.cancel() and future.exception() is None and future.result() not in runs:
+                    runs.append(future.result())
+            for run in runs:
+                os.remove(run)
+            raise
+
+    try:
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(file)), suffix='.sorting')
+        with os.fdopen(fd, 'w', newline='', encoding='utf-8') as f:
+            csv.writer(f).writerow(header)
+            merged = heapq.merge(*(iter_run_pairs(run) for run in runs), key=itemgetter(0), reverse=reverse)
+            f.writelines(line for _, line in merged)
+    finally:
+        for run in runs:
+            os.remove(run)
+    return temp_path
@@ -0,0 +1,190 @@
+import csv
+import json
+import os
+import struct
+import Metrics
+
+# Fixed-width record layout: ID, Name, DateCreation, Season, Director, PosFile, Erased
+# Every record takes exactly RECORD_SIZE bytes, so the record of a series lives at
+# an offset computed from its PosFile and can be rewritten in place.
+NAME_SIZE = 100
+DATE_SIZE = 10
+DIRECTOR_SIZE = 100
+record_struct = struct.Struct(f'<i{NAME_SIZE}s{DATE_SIZE}si{DIRECTOR_SIZE}sib')
+RECORD_SIZE = record_struct.size
+
+# File header: magic bytes followed by the record size used to write the file
+MAGIC = b'SERIEDAT'
+header_struct = struct.Struct('<8sI')
+HEADER_SIZE = header_struct.size
+
+# Records stay at their PosFile offset, so the load order chosen by a sort is kept next to the
+# file instead (series.dat -> series.dat.order)
+ORDER_SUFFIX = '.order'
+
+# Byte offset of the Erased field inside a record
+ERASED_OFFSET = RECORD_SIZE - 1
+
+# Function to check whether a path refers to a fixed-width record file
+def is_record_file(file):
+    return str(file).endswith('.dat')
+
+# Function to compute the byte offset of the record stored at a given PosFile
+def record_offset(pos_file):
+    pos_file = int(pos_file)
+    if pos_file < 1:
+        raise ValueError(f"Invalid PosFile {pos_file}. It must be a positive integer.")
+    return HEADER_SIZE + (pos_file - 1) * RECORD_SIZE
+
+# Function to encode a text field into a fixed number of bytes
+def encode_text(value, size, label):
+    data = str(value).encode('utf-8')
+    if len(data) > size:
+        raise ValueError(f"{label} is too long. It must fit in {size} bytes.")
+    return data
+
+# Function to decode a fixed-size text field, dropping the zero padding
+def decode_text(data):
+    return data.rstrip(b'\x00').decode('utf-8')
+
+# Function to pack a row (same order as Series.headings) into a fixed-width record
+def pack_row(row):
+    ID, name, datecreation, season, director, pos_file, erased = row
+    return record_struct.pack(
+        int(ID),
+        encode_text(name, NAME_SIZE, 'Name'),
+        encode_text(datecreation, DATE_SIZE, 'DateCreation'),
+        int(season),
+        encode_text(director, DIRECTOR_SIZE, 'Director'),
+        int(pos_file),
+        int(erased),
+    )
+
+# Function to pack a series instance into a fixed-width record
+def pack_series(series):
+    return pack_row(series.to_row())
+
+# Function to unpack a fixed-width record into a row (same order as Series.headings)
+def unpack_row(data):
+    ID, name, datecreation, season, director, pos_file, erased = record_struct.unpack(data)
+    return [ID, decode_text(name), decode_text(datecreation), season, decode_text(director), pos_file, erased]
+
+# Function to create an empty record file with a valid header
+def create_record_file(file):
+    with open(file, 'wb') as f:
+        f.write(header_struct.pack(MAGIC, RECORD_SIZE))
+
+# Function to check the header of an open record file
+def check_header(f):
+    data = f.read(HEADER_SIZE)
+    if len(data) < HEADER_SIZE:
+        raise ValueError("The record file has no header.")
+    magic, record_size = header_struct.unpack(data)
+    if magic != MAGIC or record_size != RECORD_SIZE:
+        raise ValueError("The file is not a series record file or uses another record layout.")
+
+# Function to write (or overwrite) the record of a series at the offset given by its PosFile.
+# old_pos is the PosFile the series was stored at, when it was changed: that slot is blanked in
+# the same write, so the series is not found twice.
+def write_series_record(file, series, old_pos=None):
+    if not os.path.exists(file):
+        create_record_file(file)
+    blank = old_pos is not None and int(old_pos) != int(series.posFile)
+    data = pack_series(series)
+    with open(file, 'r+b') as f:
+        check_header(f)
+        f.seek(record_offset(series.posFile))
+        f.write(data)
+        if blank:
+            f.seek(record_offset(old_pos))
+            f.write(bytes(RECORD_SIZE))
+    if Metrics.enabled:
+        Metrics.count_bytes('record_file', written=RECORD_SIZE * (2 if blank else 1))
+
+# Function to write the records of many series with a single open of the file. Every record is
+# packed before the first write, so a series that cannot be stored leaves the file untouched.
+def write_series_records(file, series_list):
+    records = [(record_offset(series.posFile), pack_series(series)) for series in series_list]
+    if not os.path.exists(file):
+        create_record_file(file)
+    with open(file, 'r+b') as f:
+        check_header(f)
+        for offset, data in records:
+            f.seek(offset)
+            f.write(data)
+    if Metrics.enabled:
+        Metrics.count_bytes('record_file', written=RECORD_SIZE * len(records))
+
+# Function to read the row stored at a given PosFile, or None for an empty slot
+def read_series_record(file, pos_file):
+    with open(file, 'rb') as f:
+        check_header(f)
+        f.seek(record_offset(pos_file))
+        data = f.read(RECORD_SIZE)
+    if len(data) < RECORD_SIZE:
+        return None
+    row = unpack_row(data)
+    # A slot that was never written is all zeros (PosFile 0)
+    if row[5] == 0:
+        return None
+    return row
+
+# Function to mark the record at a given PosFile as erased by rewriting a single byte
+def erase_series_record(file, pos_file):
+    with open(file, 'r+b') as f:
+        check_header(f)
+        offset = record_offset(pos_file)
+        f.seek(0, os.SEEK_END)
+        if offset + RECORD_SIZE > f.tell():
+            raise ValueError(f"There is no record at PosFile {pos_file}.")
+        f.seek(offset + ERASED_OFFSET)
+        f.write(struct.pack('<b', -1))
+    if Metrics.enabled:
+        Metrics.count_bytes('record_file', written=1)
+
+# Function to iterate over every written record of the file as rows
+def iter_series_records(file):
+    with open(file, 'rb') as f:
+        check_header(f)
+        while True:
+            data = f.read(RECORD_SIZE)
+            if len(data) < RECORD_SIZE:
+                break
+            row = unpack_row(data)
+            if row[5] != 0:
+                yield row
+
+# Function to convert a series CSV file into a fixed-width record file (one-off migration)
+def convert_csv_to_records(csv_file, record_file):
+    create_record_file(record_file)
+    count = 0
+    with open(csv_file, 'r', newline='', encoding='utf-8') as src, open(record_file, 'r+b') as dst:
+        reader = csv.reader(src)
+        next(reader, None)
+        for row in reader:
+            if not row or not row[0].isdigit():
+                continue
+            dst.seek(record_offset(row[5]))
+            dst.write(pack_row(row))
+            count += 1
+    return count
+
+# Function to save the load order (column specs, descending) of a record file
+def save_record_order(file, columns, descending=False):
+    target = file + ORDER_SUFFIX
+    temp_file = target + '.tmp'
+    with open(temp_file, 'w', encoding='utf-8') as f:
+        json.dump([list(columns), bool(descending)], f)
+    os.replace(temp_file, target)
+
+# Function to read the load order saved by save_record_order, or None if there is none
+def load_record_order(file):
+    try:
+        with open(file + ORDER_SUFFIX, 'r', encoding='utf-8') as f:
+            columns, descending = json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        print(f"Failed to read the load order: {e}")
+        return None
+    return columns, descending
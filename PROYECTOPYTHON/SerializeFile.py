@@ -1,32 +1,168 @@
 import csv
-import pandas as pd
+import gc
+from contextlib import contextmanager
 from Series import Series  # Assuming Series class is defined in 'Series' module
+from RecordFile import is_record_file, iter_series_records
+from Journal import get_journal, parse_row
+from Storage import get_storage
+from FileLock import get_lock
+from Snapshot import load_snapshot, save_snapshot
+from ParallelFile import use_parallel, iter_row_chunks_parallel
+from Metrics import instrumented
+import Metrics
+from SeriesStore import SeriesStore
 import os
 
-# Function to save a series instance to a CSV file
+# pandas is an optional fast path for parsing large CSV files. It is imported on first use
+# only (None = not tried yet, False = not installed), so importing this module stays cheap.
+pandas_module = None
+
+# Function to get the pandas module, or None when it is not installed
+def load_pandas():
+    global pandas_module
+    if pandas_module is None:
+        try:
+            import pandas
+            pandas_module = pandas
+        except ImportError:
+            pandas_module = False
+    return pandas_module or None
+
+# Default number of rows parsed at a time by the streaming loader
+CHUNK_SIZE = 10000
+
+# Function to save a new series instance through the storage backend of the file (CSV files
+# get an add record in their journal, record files the series written into its slot)
+@instrumented('save_series')
 def save_series(file, series_instance):
-    with open(file, 'a', newline='', encoding='utf-8') as file:
-        csv_writer = csv.writer(file)
-        csv_writer.writerow(series_instance.to_row())
+    get_storage(file).insert(series_instance)
+
+# Generator over the rows of a series CSV file with constant memory. It yields Series
+# instances, or lists of at most chunk_size Series when chunk_size is given. pandas is used
+# when installed unless use_pandas is False.
+def iter_series(file, chunk_size=None, use_pandas=None):
+    if use_pandas is None:
+        use_pandas = load_pandas() is not None
+    if use_pandas:
+        rows = iter_rows_pandas(file, chunk_size or CHUNK_SIZE)
+    else:
+        rows = iter_rows_csv(file)
+
+    if not chunk_size:
+        for row in rows:
+            yield Series(*row)
+        return
+
+    chunk = []
+    for row in rows:
+        chunk.append(Series(*row))
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+# Function to stream the data rows of a CSV file with the csv module
+def iter_rows_csv(file):
+    with open(file, 'r', newline='', encoding='utf-8') as f:
+        reader = csv.reader(f)
+        next(reader, None)
+        for row in reader:
+            if row:
+                yield parse_row(row)
+
+# Function to stream the data rows of a CSV file with pandas, one DataFrame chunk at a time.
+# Cells are read as text and converted by parse_row like the other readers, so the rows are the
+# same as with the csv module (no NaN for empty cells, no numbers for all-digit names).
+def iter_rows_pandas(file, chunk_size):
+    pd = load_pandas()
+    if pd is None:
+        raise ImportError("pandas is not installed.")
+    try:
+        for df in pd.read_csv(file, chunksize=chunk_size, dtype=str, keep_default_na=False, na_filter=False):
+            for row in df.itertuples(index=False, name=None):
+                yield parse_row(row)
+    except pd.errors.EmptyDataError:
+        return
 
-# Function to read series data from a CSV file and populate a list
+# Function to read series data from the storage backend of a file and populate a list
+@instrumented('read_series')
 def read_series(file, list_of_series):
+    get_storage(file).load(list_of_series)
+
+# Context manager pausing the cyclic garbage collector while a load creates many objects:
+# they form no cycles, and each automatic collection would rescan everything loaded so far
+@contextmanager
+def gc_paused():
+    enabled = gc.isenabled()
+    gc.disable()
     try:
-        # Clear the set of used IDs to avoid conflicts
-        Series.used_ids = set()
+        yield
+    finally:
+        if enabled:
+            gc.enable()
 
-        # Read CSV file into a pandas DataFrame
-        df = pd.read_csv(file)
+# Function to read series data from a CSV (or record) file and populate a list
+def read_file_series(file, list_of_series):
+    with gc_paused():
+        read_file_series_unpaused(file, list_of_series)
 
-        # Clear the existing list of series
-        list_of_series.clear()
+def read_file_series_unpaused(file, list_of_series):
+    if is_record_file(file):
+        if Metrics.enabled:
+            Metrics.count_bytes('read_series', read=Metrics.file_size(file))
+        read_series_records(file, list_of_series)
+        return
 
-        # Convert DataFrame to a list of lists and create Series instances
-        data = df.values.tolist()
-        for series_data in data:
-            series_instance = Series(series_data[0], series_data[1], series_data[2], series_data[3], series_data[4], series_data[5], series_data[6])
-            list_of_series.append(series_instance)
-            print(f"Added Series: {series_instance}")
+    # Clear the existing list of series and fill it from the snapshot of the base file if it
+    # is valid, or else parse the base file into it (on every core if it is big enough, see
+    # ParallelFile) and save a new snapshot
+    list_of_series.clear()
+    columns = load_snapshot(file)
+    if columns is not None:
+        list_of_series.extend([Series(*row) for row in zip(*columns)])
+    else:
+        if Metrics.enabled:
+            Metrics.count_bytes('read_series', read=Metrics.file_size(file))
+        # A new catalogue has journal records before its first compaction writes the base file
+        if os.path.exists(file):
+            stat = os.stat(file)
+            if use_parallel(file):
+                for rows in iter_row_chunks_parallel(file):
+                    list_of_series.extend([Series(*row) for row in rows])
+            else:
+                for chunk in iter_series(file, chunk_size=CHUNK_SIZE):
+                    list_of_series.extend(chunk)
+            save_snapshot(file, (series.to_row() for series in list_of_series), stat)
 
-    except pd.errors.EmptyDataError:
-        print("The CSV file is empty.")
+    # Apply the changes logged since the last compaction onto the base snapshot
+    get_journal(file).replay(list_of_series)
+
+# Function to load a series CSV file into a columnar SeriesStore (for very large catalogues)
+def read_series_store(file, use_pandas=None):
+    store = SeriesStore()
+    if use_pandas is None:
+        use_pandas = load_pandas() is not None
+    with get_lock(file).shared():
+        rows = ()
+        if os.path.exists(file):
+            rows = iter_rows_pandas(file, CHUNK_SIZE) if use_pandas else iter_rows_csv(file)
+        # Pending journal records are applied in memory: a read does not rewrite the base file
+        journal = get_journal(file)
+        if journal.size():
+            rows = journal.merge_rows(rows)
+        for row in rows:
+            store.append_row(*row)
+    return store
+
+# Function to read series data from a fixed-width record file and populate a list
+def read_series_records(file, list_of_series):
+    # Clear the existing list of series (and its indexes)
+    list_of_series.clear()
+
+    # A new catalogue has no record file yet: it is just empty
+    if not os.path.exists(file):
+        return
+
+    for row in iter_series_records(file):
+        list_of_series.append(Series(*row))
@@ -1,4 +1,7 @@
 class Series:
+    # Fixed set of attributes: no per-instance __dict__ (see SeriesStore for memory figures)
+    __slots__ = ('ID', 'name', 'datecreation', 'season', 'director', 'posFile', 'erased')
+
     # Class-level attributes to define column headings and field labels
     headings = ['ID', 'Name', 'DateCreation', 'Season', 'Director', 'PosFile', 'Erased']
     fields = {
@@ -10,19 +13,20 @@ class Series:
         '-PosFile-': 'Position into File',
     }
 
-    # Set to keep track of used series IDs
-    used_ids = set()
-
     # Constructor to initialize series instances with specific attributes
     def __init__(self, ID="", name="", datecreation="", season="", director="", posFile="", erased=0):
-        # Ensure unique series IDs using the 'used_ids' set
-        if ID not in Series.used_ids:
-            self.ID = ID
-            Series.used_ids.add(ID)
-        else:
-            raise ValueError(f"The ID {ID} has already been assigned to another series.")
+        # Assign series attributes (ID uniqueness is enforced by SeriesCollection)
+        self.ID = ID
+        self.name = name
+        self.datecreation = datecreation
+        self.season = season
+        self.director = director
+        self.posFile = posFile
+        self.erased = erased
 
-        # Assign other series attributes
+    # Method to replace every attribute of the series at once
+    def set_series(self, ID, name, datecreation, season, director, posFile, erased):
+        self.ID = ID
         self.name = name
         self.datecreation = datecreation
         self.season = season
@@ -0,0 +1,133 @@
+import argparse
+import json
+import sys
+from Series import Series
+from SeriesEngine import *
+import Metrics
+
+# Command line entry point for batch jobs: python -m SeriesCLI <command> [...]
+# It uses the same storage engine as the GUI, without importing PySimpleGUI.
+
+# Function to build the argument parser with one sub-command per storage operation
+def build_parser():
+    parser = argparse.ArgumentParser(prog='python -m SeriesCLI', description='Series storage commands.')
+    parser.add_argument('--file', default=f_series, help='series file (.csv, .dat or .db)')
+    parser.add_argument('--metrics', action='store_true', help='print operation metrics at the end')
+    parser.add_argument('--profile', action='store_true', help='also profile the operations with cProfile')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    commands.add_parser('load', help='print every series of the file')
+
+    add = commands.add_parser('add', help='add a new series')
+    for field in ('ID', 'name', 'datecreation', 'season', 'director', 'posFile'):
+        add.add_argument(field)
+
+    modify = commands.add_parser('modify', help='change the fields of a series')
+    modify.add_argument('ID')
+    for field in ('name', 'datecreation', 'season', 'director', 'posFile'):
+        modify.add_argument(f'--{field}')
+
+    delete = commands.add_parser('delete', help='mark a series as erased')
+    delete.add_argument('ID')
+
+    commands.add_parser('purge', help='rewrite the file without the erased series')
+
+    search = commands.add_parser('search', help='print the series matching a search (same words as the GUI search box)')
+    search.add_argument('text', nargs='+')
+    search.add_argument('--prefix', action='store_true', help='match words by prefix instead of substring')
+    search.add_argument('--limit', type=int)
+
+    bulk = commands.add_parser('import', help='bulk import series from a CSV or JSONL file')
+    bulk.add_argument('source')
+
+    sort = commands.add_parser('sort', help='sort the file by one or more columns')
+    sort.add_argument('columns', nargs='+', choices=Series.headings)
+    sort.add_argument('--descending', action='store_true')
+
+    stats = commands.add_parser('stats', help='print series counts per director, season and year')
+    stats.add_argument('--director', action='append', help='only this director (can be repeated)')
+    stats.add_argument('--season-min', type=int)
+    stats.add_argument('--season-max', type=int)
+    stats.add_argument('--year-from', type=int)
+    stats.add_argument('--year-to', type=int)
+    stats.add_argument('--include-erased', action='store_true')
+    stats.add_argument('--top', type=int, help='number of directors listed')
+
+    export = commands.add_parser('export', help='export the catalogue in a columnar format')
+    export.add_argument('path', help='directory of .npy columns, or .parquet file')
+    export.add_argument('--format', choices=('npy', 'parquet'), default='npy')
+    return parser
+
+# Function to find a series by ID or stop with an error message
+def get_series(parser, series_list, series_id):
+    series = find_series_by_id(series_list, series_id)
+    if series is None:
+        parser.error(f"No series found with the ID {series_id}.")
+    return series
+
+# Function to run a command line; returns the process exit code
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    file = args.file
+    if args.metrics or args.profile:
+        Metrics.enable(profile=args.profile)
+
+    try:
+        if args.command == 'sort':
+            sort_series(file, args.columns, args.descending)
+            return 0
+        if args.command in ('stats', 'export'):
+            import Analytics
+            columns = Analytics.read_catalogue_columns(file)
+            if args.command == 'export' and args.format == 'parquet':
+                Analytics.export_parquet(columns, args.path)
+            elif args.command == 'export':
+                Analytics.export_columns(columns, args.path)
+            else:
+                filters = {name: getattr(args, name) for name in ('director', 'season_min', 'season_max',
+                                                                   'year_from', 'year_to', 'include_erased')}
+                summary = Analytics.CatalogueStats(columns).summary(args.top, **filters)
+                print(json.dumps(summary, ensure_ascii=False, indent=2))
+            return 0
+
+        series_list = load_series(file)
+        if args.command == 'load':
+            for series in series_list:
+                if not series.erased:
+                    print(series)
+        elif args.command == 'add':
+            create_series(file, series_list, args.ID, args.name, args.datecreation, args.season,
+                          args.director, args.posFile)
+        elif args.command == 'modify':
+            series = get_series(parser, series_list, args.ID)
+            fields = {field: getattr(args, field) for field in ('name', 'datecreation', 'season', 'director', 'posFile')
+                      if getattr(args, field) is not None}
+            old_pos = series.posFile
+            series_list.modify(series, **fields)
+            modify_series(file, series, old_pos=old_pos)
+        elif args.command == 'delete':
+            delete_series_file(file, series_list, get_series(parser, series_list, args.ID))
+        elif args.command == 'purge':
+            purge_series(file, series_list)
+        elif args.command == 'search':
+            from SeriesQuery import SeriesQuery, parse_search
+            filters = parse_search(' '.join(args.text))
+            match = 'prefix' if args.prefix else 'substring'
+            for series in SeriesQuery(series_list).search(match=match, limit=args.limit, **filters):
+                print(series)
+        elif args.command == 'import':
+            from BulkImport import bulk_import
+            report = bulk_import(args.source, file, series_list)
+            print(json.dumps(report.to_dict(), ensure_ascii=False, indent=2))
+    except (ValueError, ImportError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    finally:
+        close_storages()
+        if args.metrics or args.profile:
+            print(Metrics.export_text(), file=sys.stderr)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,254 @@
+from itertools import count
+from operator import attrgetter
+
+# Attribute names that can be given a secondary index
+SECONDARY_FIELDS = ('director', 'datecreation')
+# Ratio of removed series to list entries past which the list is compacted
+COMPACT_RATIO = 0.25
+# PosFile values below this are kept in the tombstone bitmap (8 MB at most); others in a set
+BITMAP_LIMIT = 1 << 26
+
+# Function to normalise ID/PosFile values so that 7 and '7' hit the same index entry
+def index_key(value):
+    if isinstance(value, str) and value.strip().lstrip('-').isdigit():
+        return int(value)
+    return value
+
+# Set of PosFile values, one bit per position
+class TombstoneBitmap:
+    def __init__(self):
+        self.bits = bytearray()
+        # PosFile values that are not small non-negative integers
+        self.others = set()
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def __contains__(self, pos):
+        if type(pos) is int and 0 <= pos < BITMAP_LIMIT:
+            byte = pos >> 3
+            return byte < len(self.bits) and bool(self.bits[byte] & (1 << (pos & 7)))
+        return pos in self.others
+
+    def add(self, pos):
+        if pos in self:
+            return
+        if type(pos) is int and 0 <= pos < BITMAP_LIMIT:
+            byte = pos >> 3
+            if byte >= len(self.bits):
+                self.bits.extend(bytes(byte + 1 - len(self.bits)))
+            self.bits[byte] |= 1 << (pos & 7)
+        else:
+            self.others.add(pos)
+        self.count += 1
+
+    def clear(self):
+        self.bits = bytearray()
+        self.others.clear()
+        self.count = 0
+
+# Ordered container of Series with hash indexes on ID and PosFile (and optionally
+# on Director and DateCreation). It behaves like the plain list the GUI used before.
+#
+# Removing a series drops it from the indexes and records its PosFile in a tombstone bitmap;
+# the list entry stays until the list is compacted, and iteration and positional reads skip it.
+# compact() drops the removed entries in a single pass without changing any PosFile; it runs
+# when compact_if_needed() finds more removed entries than compact_ratio of the list, on a
+# purge, and before a removed PosFile is used again (so a PosFile is never both live and
+# tombstoned).
+class SeriesCollection:
+    def __init__(self, series=(), secondary=SECONDARY_FIELDS, compact_ratio=COMPACT_RATIO):
+        for field in secondary:
+            if field not in SECONDARY_FIELDS:
+                raise ValueError(f"Cannot index the field {field}.")
+        self.items = []
+        self.by_id = {}
+        self.by_pos = {}
+        self.secondary = {field: {} for field in secondary}
+        # Extra indexes (e.g. SeriesQuery) told about every indexed/unindexed series
+        self.listeners = []
+        self.tombstones = TombstoneBitmap()
+        self.compact_ratio = compact_ratio
+        # The live series in list order, built by the first positional read after a change
+        # while there are tombstones
+        self.live = None
+        for s in series:
+            self.append(s)
+
+    # List-like behaviour used by the GUI (row index, iteration, len)
+    def __len__(self):
+        return len(self.items) - len(self.tombstones)
+
+    def __iter__(self):
+        if not self.tombstones:
+            return iter(self.items)
+        tombstones = self.tombstones
+        return (s for s in self.items if index_key(s.posFile) not in tombstones)
+
+    def __getitem__(self, index):
+        if not self.tombstones:
+            return self.items[index]
+        if self.live is None:
+            self.live = list(iter(self))
+        return self.live[index]
+
+    def __contains__(self, series):
+        return self.by_pos.get(index_key(series.posFile)) is series
+
+    # Method to register a series in every index
+    def index(self, series):
+        self.by_id[index_key(series.ID)] = series
+        self.by_pos[index_key(series.posFile)] = series
+        for field, index in self.secondary.items():
+            index.setdefault(getattr(series, field), []).append(series)
+        for listener in self.listeners:
+            listener.add(series)
+
+    # Method to drop a series from every index
+    def unindex(self, series):
+        self.by_id.pop(index_key(series.ID), None)
+        if self.by_pos.get(index_key(series.posFile)) is series:
+            del self.by_pos[index_key(series.posFile)]
+        for field, index in self.secondary.items():
+            key = getattr(series, field)
+            bucket = index.get(key, [])
+            for i, s in enumerate(bucket):
+                if s is series:
+                    del bucket[i]
+                    break
+            if not bucket:
+                index.pop(key, None)
+        for listener in self.listeners:
+            listener.remove(series)
+
+    # Method to check that an ID and a PosFile are not used by another series
+    def check_unique(self, ID, posFile, ignore=None):
+        other = self.by_id.get(index_key(ID))
+        if other is not None and other is not ignore:
+            raise ValueError(f"The ID {ID} has already been assigned to another series.")
+        other = self.by_pos.get(index_key(posFile))
+        if other is not None and other is not ignore:
+            raise ValueError(f"The PosFile {posFile} is already used by another series.")
+
+    # Method to compact the list before a removed PosFile is used again
+    def reuse_pos(self, posFile):
+        if self.tombstones and index_key(posFile) in self.tombstones:
+            self.compact()
+
+    # Method to add a series at the end of the collection
+    def append(self, series):
+        self.check_unique(series.ID, series.posFile)
+        self.reuse_pos(series.posFile)
+        self.items.append(series)
+        self.live = None
+        self.index(series)
+
+    # Method to add many series at the end (loads): the same checks as append, with the index
+    # updates done column by column instead of one call per series
+    def extend(self, series):
+        series = list(series)
+        ids = [index_key(s.ID) for s in series]
+        positions = [index_key(s.posFile) for s in series]
+        unique = (len(set(ids)) == len(ids) and len(set(positions)) == len(positions)
+                  and self.by_id.keys().isdisjoint(ids) and self.by_pos.keys().isdisjoint(positions))
+        if not unique:
+            # Add them one by one so the first repeated ID or PosFile raises like append does
+            for s in series:
+                self.append(s)
+            return
+        if self.tombstones and any(pos in self.tombstones for pos in positions):
+            self.compact()
+        self.items.extend(series)
+        self.live = None
+        self.by_id.update(zip(ids, series))
+        self.by_pos.update(zip(positions, series))
+        for field, index in self.secondary.items():
+            get = index.get
+            for s, value in zip(series, map(attrgetter(field), series)):
+                bucket = get(value)
+                if bucket is None:
+                    index[value] = [s]
+                else:
+                    bucket.append(s)
+        for listener in self.listeners:
+            for s in series:
+                listener.add(s)
+
+    # Method to remove a series from the collection (tombstoned, see above)
+    def remove(self, series):
+        key = index_key(series.posFile)
+        if self.by_pos.get(key) is not series:
+            raise ValueError("The series is not in the collection.")
+        self.unindex(series)
+        self.tombstones.add(key)
+        self.live = None
+
+    # Method to drop the entries of the removed series from the list in a single pass
+    def compact(self):
+        if self.tombstones:
+            self.items = list(iter(self))
+            self.tombstones.clear()
+            self.live = None
+
+    # Method to compact the list once the removed entries pass compact_ratio of it
+    def compact_if_needed(self):
+        if len(self.tombstones) > self.compact_ratio * len(self.items):
+            self.compact()
+
+    # Method to give the series the PosFile values 1, 2, 3... in list order, in a single pass
+    # (used by an explicit purge only: PosFile values are otherwise the ones the user gave)
+    def renumber(self, start=1):
+        self.compact()
+        for pos, series in enumerate(self.items, start):
+            series.posFile = pos
+        self.by_pos = dict(zip(count(start), self.items))
+
+    # Method to empty the collection and its indexes
+    def clear(self):
+        self.items.clear()
+        self.tombstones.clear()
+        self.live = None
+        self.by_id.clear()
+        self.by_pos.clear()
+        for index in self.secondary.values():
+            index.clear()
+        for listener in self.listeners:
+            listener.clear()
+
+    # Method to change the fields of a series keeping the indexes consistent
+    def modify(self, series, **fields):
+        self.check_unique(fields.get('ID', series.ID), fields.get('posFile', series.posFile), ignore=series)
+        self.reuse_pos(fields.get('posFile', series.posFile))
+
+        self.unindex(series)
+        for name, value in fields.items():
+            setattr(series, name, value)
+        self.index(series)
+
+    # Method to drop every erased series in a single pass
+    def purge(self):
+        self.compact()
+        removed = [s for s in self.items if s.erased]
+        for s in removed:
+            self.unindex(s)
+        self.items = [s for s in self.items if not s.erased]
+        return removed
+
+    # Lookup methods
+    def find_by_id(self, series_id):
+        return self.by_id.get(index_key(series_id))
+
+    def find_by_pos(self, pos):
+        return self.by_pos.get(index_key(pos))
+
+    def find_by(self, field, value):
+        if field not in self.secondary:
+            raise ValueError(f"The field {field} is not indexed.")
+        return list(self.secondary[field].get(value, []))
+
+    def find_by_director(self, director):
+        return self.find_by('director', director)
+
+    def find_by_datecreation(self, datecreation):
+        return self.find_by('datecreation', datecreation)
@@ -0,0 +1,194 @@
+import os
+import re
+import tempfile
+from Series import Series
+from SerializeFile import save_series, read_series
+from SeriesCollection import SeriesCollection
+from Storage import get_storage, close_storages, is_sqlite_file, default_series_file
+from FileLock import get_lock
+from Metrics import instrumented
+
+# Headless storage engine shared by the GUI (GUIp.py) and the command line (SeriesCLI.py).
+# It never imports PySimpleGUI, and pandas is only imported the first time a CSV is parsed
+# with it, so batch jobs and tests can import it cheaply.
+#
+# Cold-start import budget: `python -X importtime -c "import SeriesEngine"` must stay under
+# 50 ms (about 20 ms measured on CPython 3.11).
+
+# File path for storing series data (SERIES_FILE environment variable, 'series.csv' by default).
+# Its extension selects the storage backend: '.dat' for the fixed-width record format (see
+# convert_csv_to_records to migrate an existing CSV once), '.db' for SQLite, CSV otherwise.
+f_series = default_series_file()
+# Ratio of dead rows (deleted since the file was last compacted) to stored rows past which a
+# delete purges the file
+PURGE_RATIO = 0.25
+# Regular expressions for patterns
+pattern_season = r"\d+"
+pattern_date_creation = r"^(0[1-9]|[12][0-9]|3[01])/(0[1-9]|1[0-2])/\d{4}$"
+pattern_id = r"\d{1,3}"
+# Compiled once and reused for every validated series. The whole value must match: '12a' is
+# not an ID
+match_season = re.compile(pattern_season).fullmatch
+match_date_creation = re.compile(pattern_date_creation).fullmatch
+match_id = re.compile(pattern_id).fullmatch
+
+# Function to check the format of the values of a series; returns an error message or None
+def series_values_error(ID, name, datecreation, season):
+    if not match_id(str(ID)):
+        return "Invalid ID format. It must be a positive integer with at most 3 digits."
+
+    if not name:
+        return "Name cannot be empty."
+
+    if not match_date_creation(str(datecreation)):
+        return "Invalid date creation format. It must be in DD/MM/YYYY format."
+
+    if not match_season(str(season)):
+        return "Invalid season format. It must be a non-negative integer."
+    return None
+
+# Function to validate the values of a new series; raises ValueError with a user-facing message
+@instrumented('validate_series')
+def validate_series_values(series_list, ID, name, datecreation, season):
+    error = series_values_error(ID, name, datecreation, season)
+    if error:
+        raise ValueError(error)
+
+    # Check if the ID is already in the list
+    if find_series_by_id(series_list, ID) is not None:
+        raise ValueError("ID must be unique. This ID is already in use.")
+
+# Function to validate a new series, add it to the list and save it to the file
+@instrumented('add_series')
+def create_series(file, series_list, ID, name, datecreation, season, director, posFile):
+    storage = get_storage(file)
+    # Other processes may be adding series too: the list gets their changes and the write lock
+    # is held from the uniqueness checks to the write
+    with storage.locked():
+        storage.refresh(series_list)
+        validate_series_values(series_list, ID, name, datecreation, season)
+
+        # Create a new series object and add it to the list (the collection also rejects a used PosFile)
+        series = Series(ID, name, datecreation, season, director, posFile, 0)
+        series_list.append(series)
+
+        # Update the file with the new series
+        try:
+            save_series(file, series)
+        except Exception:
+            if series_list.find_by_id(series.ID) is series:
+                series_list.remove(series)
+            raise
+    return series
+
+# Function to save the series list to a file
+@instrumented('save_series_list')
+def save_series_list(file, series_list):
+    get_storage(file).save_all(series_list)
+
+# Function to move and clear a file
+def clean_and_move_file(original_file, new_file):
+    os.rename(original_file, new_file)
+    try:
+        os.remove(original_file)
+    except OSError as e:
+        print(f"Failed to remove the old file: {e}")
+    os.rename(new_file, original_file)
+
+# Function to find a series in the list based on position in the file
+def find_series_by_pos(series_list, pos):
+    if isinstance(series_list, SeriesCollection):
+        return series_list.find_by_pos(pos)
+    for series in series_list:
+        if series.series_in_pos(pos):
+            return series
+    return None
+
+# Function to find a series in the list based on ID
+def find_series_by_id(series_list, series_id):
+    if isinstance(series_list, SeriesCollection):
+        return series_list.find_by_id(series_id)
+    for series in series_list:
+        if series.ID == series_id:
+            return series
+    return None
+
+# Function to modify a series in the file (only the changed series is written, see FileStorage).
+# old_id and old_pos are the ID and PosFile the series was stored under, when the modification
+# changed them. If another process changed the same series since the list was loaded,
+# ValueError is raised and the list holds their version.
+@instrumented('modify_series')
+def modify_series(file, series, old_id=None, old_pos=None):
+    storage = get_storage(file)
+    if series.erased:
+        storage.tombstone(series)
+    else:
+        storage.upsert(series, old_id, old_pos)
+
+# Function to mark a series as erased in the file and drop it from the list
+@instrumented('delete_series')
+def delete_series_file(file, series_list, series):
+    series.erased = -1
+    modify_series(file, series)
+    series_list.remove(series)
+    if isinstance(series_list, SeriesCollection):
+        series_list.compact_if_needed()
+    purge_if_needed(file, series_list)
+
+# Function to purge the file once the rows deleted since it was last compacted reach ratio
+# (PURGE_RATIO by default) of its rows; returns True if it did. PosFile values are kept.
+def purge_if_needed(file, series_list, ratio=None):
+    ratio = PURGE_RATIO if ratio is None else ratio
+    dead = get_storage(file).dead
+    if dead and dead >= ratio * (len(series_list) + dead):
+        purge_series(file, series_list, renumber=False)
+        return True
+    return False
+
+# Function to drop the erased series from the list and rewrite the file without them. With
+# renumber (the purge the user asks for) series files number PosFile 1, 2, 3... again.
+@instrumented('purge_deleted_series')
+def purge_series(file, series_list, renumber=True):
+    storage = get_storage(file)
+    with storage.locked():
+        # Apply the changes of other processes first, so the rewrite keeps them
+        storage.refresh(series_list)
+
+        # Drop the erased series and their index entries in a single pass
+        series_list.purge()
+
+        # Remove them from the file too (CSV files are rewritten, compacting the journal into them)
+        storage.purge(series_list, renumber)
+
+# Function to move and clear a file
+def move_and_clear_file(file):
+    # A SQLite catalogue is kept open by its storage and is never moved
+    if is_sqlite_file(file):
+        return
+    lock = get_lock(file)
+    with lock.exclusive():
+        # A unique name next to the file, so two processes never use the same one
+        fd, new_file = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(file)), suffix='.clear')
+        os.close(fd)
+        os.replace(file, new_file)
+
+        if os.path.exists(file):  # Check if the original file still exists
+            try:
+                os.remove(file)
+            except OSError as e:
+                print(f"Failed to remove the old file: {e}")
+        os.replace(new_file, file)
+        lock.bump(rewrite=True)
+
+# Function to sort the series file based on specified columns. Columns are sorted by type
+# (ID, Season and PosFile as integers, DateCreation as a date); a column can be given as
+# (name, True) to sort it in descending order.
+@instrumented('sort_series')
+def sort_series(file_path, columns, descending=False):
+    get_storage(file_path).sort(columns, descending)
+
+# Function to load a file into a new indexed collection
+def load_series(file=f_series):
+    series_list = SeriesCollection()
+    read_series(file, series_list)
+    return series_list
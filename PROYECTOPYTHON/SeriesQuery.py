@@ -0,0 +1,307 @@
+from bisect import bisect_left, bisect_right, insort
+from SeriesCollection import index_key
+from SeriesStore import date_to_ordinal
+
+# Search over a loaded SeriesCollection. The query index registers itself as a listener of the
+# collection, so it follows every add, modify, delete and purge without a rebuild.
+#
+# Text fields (Name, Director) are indexed by word: every lower-cased word maps to the IDs whose
+# value contains it. Prefix queries bisect a sorted list of the words, and substring queries use
+# trigrams of the words (the vocabulary is much smaller than the catalogue, so this stays small).
+# DateCreation (as a date ordinal) and Season use sorted lists of their distinct values for range
+# queries. A search starts from the IDs of its most selective filter, intersects the ID sets of
+# filters of similar size and checks every filter against the values kept for each ID.
+
+# Function to get the trigrams of a lower-cased word
+def trigrams(word):
+    return {word[i:i + 3] for i in range(len(word) - 2)}
+
+# Word index of one text field
+class TextIndex:
+    def __init__(self):
+        self.ids = {}
+        self.grams = {}
+        # Sorted words for prefix queries; None until needed (e.g. while a catalogue is loaded)
+        self.sorted_words = None
+
+    def add(self, value, key):
+        for word in set(value.split()):
+            ids = self.ids.get(word)
+            if ids is None:
+                ids = self.ids[word] = set()
+                if self.sorted_words is not None:
+                    insort(self.sorted_words, word)
+                for gram in trigrams(word):
+                    self.grams.setdefault(gram, set()).add(word)
+            ids.add(key)
+
+    def remove(self, value, key):
+        for word in set(value.split()):
+            ids = self.ids.get(word)
+            if ids is None:
+                continue
+            ids.discard(key)
+            if not ids:
+                del self.ids[word]
+                if self.sorted_words is not None:
+                    del self.sorted_words[bisect_left(self.sorted_words, word)]
+                for gram in trigrams(word):
+                    words = self.grams[gram]
+                    words.discard(word)
+                    if not words:
+                        del self.grams[gram]
+
+    def clear(self):
+        self.ids.clear()
+        self.grams.clear()
+        self.sorted_words = None
+
+    # Method to get the indexed words starting with a text
+    def prefix_words(self, text):
+        if self.sorted_words is None:
+            self.sorted_words = sorted(self.ids)
+        words = []
+        for word in self.sorted_words[bisect_left(self.sorted_words, text):]:
+            if not word.startswith(text):
+                break
+            words.append(word)
+        return words
+
+    # Method to get the indexed words containing a text
+    def substring_words(self, text):
+        if len(text) < 3:
+            # Too short for trigrams: check the whole vocabulary
+            return [word for word in self.ids if text in word]
+        postings = sorted((self.grams.get(gram, ()) for gram in trigrams(text)), key=len)
+        rest = postings[1:]
+        return [word for word in postings[0] if all(word in p for p in rest) and text in word]
+
+    # Method to get the words a value matching the text must contain: for a prefix query its
+    # first word starts with the first query word; otherwise some word contains each query word
+    def matching_words(self, text, match):
+        words = text.split()
+        if not words:
+            return []
+        if match == 'prefix':
+            return self.prefix_words(words[0])
+        # The longest query word is usually the most selective
+        return self.substring_words(max(words, key=len))
+
+    def count(self, words):
+        return sum(len(self.ids[word]) for word in words)
+
+    # Method to get the IDs of some words (the indexed set itself for one word: do not modify it)
+    def ids_for(self, words):
+        if len(words) == 1:
+            return self.ids[words[0]]
+        result = set()
+        for word in words:
+            result |= self.ids[word]
+        return result
+
+# Sorted index of one numeric field for range queries
+class RangeIndex:
+    def __init__(self):
+        self.ids = {}
+        self.sorted_values = None
+
+    def add(self, value, key):
+        ids = self.ids.get(value)
+        if ids is None:
+            ids = self.ids[value] = set()
+            if self.sorted_values is not None:
+                insort(self.sorted_values, value)
+        ids.add(key)
+
+    def remove(self, value, key):
+        ids = self.ids.get(value)
+        if ids is None:
+            return
+        ids.discard(key)
+        if not ids:
+            del self.ids[value]
+            if self.sorted_values is not None:
+                del self.sorted_values[bisect_left(self.sorted_values, value)]
+
+    def clear(self):
+        self.ids.clear()
+        self.sorted_values = None
+
+    # Method to get the distinct values with low <= value <= high (None leaves that side open)
+    def values_between(self, low=None, high=None):
+        if self.sorted_values is None:
+            self.sorted_values = sorted(self.ids)
+        start = 0 if low is None else bisect_left(self.sorted_values, low)
+        stop = len(self.sorted_values) if high is None else bisect_right(self.sorted_values, high)
+        return self.sorted_values[start:stop]
+
+    def count(self, values):
+        return sum(len(self.ids[value]) for value in values)
+
+    def ids_for(self, values):
+        if len(values) == 1:
+            return self.ids[values[0]]
+        result = set()
+        for value in values:
+            result |= self.ids[value]
+        return result
+
+# Function to read a Season as an int (None when it is not a number)
+def season_value(season):
+    try:
+        return int(season)
+    except (TypeError, ValueError):
+        return None
+
+# Function to check a text against an indexed (lower-cased) value
+def text_matches(value, text, match):
+    return value.startswith(text) if match == 'prefix' else text in value
+
+# Function to check an indexed number against an inclusive range (None leaves that side open)
+def in_range(value, low, high):
+    return value is not None and (low is None or value >= low) and (high is None or value <= high)
+
+# A filter whose ID set is at most this many times bigger than the current candidates is
+# intersected with them (in C); bigger ones are checked per candidate instead
+INTERSECT_RATIO = 8
+
+# Positions of the values kept for each ID
+NAME, DIRECTOR, DATE, SEASON = range(4)
+
+class SeriesQuery:
+    def __init__(self, series_list):
+        self.series_list = series_list
+        self.names = TextIndex()
+        self.directors = TextIndex()
+        self.dates = RangeIndex()
+        self.seasons = RangeIndex()
+        # Indexed values of each ID: used to check filters, and to remove a series with the
+        # values it was added with even if its attributes were changed in between
+        self.values = {}
+        for series in series_list:
+            self.add(series)
+        series_list.listeners.append(self)
+
+    # Listener methods called by SeriesCollection
+    def add(self, series):
+        key = index_key(series.ID)
+        values = (str(series.name).lower(), str(series.director).lower(),
+                  date_to_ordinal(series.datecreation) or None, season_value(series.season))
+        self.values[key] = values
+        self.names.add(values[NAME], key)
+        self.directors.add(values[DIRECTOR], key)
+        if values[DATE] is not None:
+            self.dates.add(values[DATE], key)
+        if values[SEASON] is not None:
+            self.seasons.add(values[SEASON], key)
+
+    def remove(self, series):
+        key = index_key(series.ID)
+        values = self.values.pop(key, None)
+        if values is None:
+            return
+        self.names.remove(values[NAME], key)
+        self.directors.remove(values[DIRECTOR], key)
+        if values[DATE] is not None:
+            self.dates.remove(values[DATE], key)
+        if values[SEASON] is not None:
+            self.seasons.remove(values[SEASON], key)
+
+    def clear(self):
+        self.values.clear()
+        for index in (self.names, self.directors, self.dates, self.seasons):
+            index.clear()
+
+    def detach(self):
+        self.series_list.listeners.remove(self)
+
+    # Method to add a text filter over one or more fields: (estimated matches, candidate IDs, check)
+    def text_filter(self, steps, fields, text, match):
+        text = text.lower()
+        indexes = {NAME: self.names, DIRECTOR: self.directors}
+        found = [(indexes[field], words) for field in fields
+                 for words in [indexes[field].matching_words(text, match)] if words]
+        steps.append((sum(index.count(words) for index, words in found),
+                      lambda: found[0][0].ids_for(found[0][1]) if len(found) == 1
+                      else set().union(*(index.ids_for(words) for index, words in found)),
+                      lambda values: any(text_matches(values[field], text, match) for field in fields)))
+
+    # Method to add a range filter on DATE or SEASON: (estimated matches, candidate IDs, check)
+    def range_filter(self, steps, field, low, high):
+        index = self.dates if field == DATE else self.seasons
+        found = index.values_between(low, high)
+        steps.append((index.count(found), lambda: index.ids_for(found),
+                      lambda values: in_range(values[field], low, high)))
+
+    # Method to search the collection. Every given filter must match:
+    #   text      every word is in the Name or the Director
+    #   name      the Name contains the text (starts with it if match='prefix')
+    #   director  the Director contains the text (starts with it if match='prefix')
+    #   date_from, date_to      DateCreation range (DD/MM/YYYY, inclusive)
+    #   season_min, season_max  Season range (inclusive)
+    # Erased series are skipped. Results are ordered by ID; limit keeps only the first ones.
+    def search(self, text=None, name=None, director=None, date_from=None, date_to=None,
+               season_min=None, season_max=None, match='substring', limit=None):
+        steps = []
+        if text:
+            for word in text.split():
+                self.text_filter(steps, (NAME, DIRECTOR), word, match)
+        if name:
+            self.text_filter(steps, (NAME,), name, match)
+        if director:
+            self.text_filter(steps, (DIRECTOR,), director, match)
+        if date_from or date_to:
+            low = date_to_ordinal(date_from) if date_from else None
+            high = date_to_ordinal(date_to) if date_to else None
+            if (date_from and not low) or (date_to and not high):
+                raise ValueError("Invalid date format. It must be in DD/MM/YYYY format.")
+            self.range_filter(steps, DATE, low, high)
+        if season_min is not None or season_max is not None:
+            self.range_filter(steps, SEASON, season_value(season_min), season_value(season_max))
+
+        if not steps:
+            return [s for s in self.series_list if not s.erased][:limit]
+
+        # Start from the most selective filter and intersect the sets of the filters of similar
+        # size. The word indexes give a superset of the matches (a prefix query matches words
+        # anywhere in the value, a query of several words matches them in any order), so every
+        # filter is then checked against the kept values of the remaining candidates.
+        steps.sort(key=lambda step: step[0])
+        ids = steps[0][1]()
+        for estimate, filter_ids, check in steps[1:]:
+            if estimate <= len(ids) * INTERSECT_RATIO:
+                ids = ids & filter_ids()
+        checks = [check for _, _, check in steps]
+        values = self.values
+        keys = sorted(key for key in ids if all(check(values[key]) for check in checks))
+
+        results = []
+        for key in keys:
+            series = self.series_list.find_by_id(key)
+            if series is not None and not series.erased:
+                results.append(series)
+                if limit is not None and len(results) >= limit:
+                    break
+        return results
+
+# Function to turn the text of the GUI search box into search() arguments. Words of the form
+# season:1-3, date:01/01/2000-31/12/2010, name:text and director:text set a filter; the other
+# words are searched in the Name or the Director.
+def parse_search(text):
+    filters = {}
+    words = []
+    for word in text.split():
+        field, _, value = word.partition(':')
+        field = field.lower()
+        if value and field in ('season', 'date'):
+            low, dash, high = value.partition('-')
+            first, last = ('season_min', 'season_max') if field == 'season' else ('date_from', 'date_to')
+            filters[first] = low or None
+            filters[last] = (high or None) if dash else low
+        elif value and field in ('name', 'director'):
+            filters[field] = filters[field] + ' ' + value if field in filters else value
+        else:
+            words.append(word)
+    if words:
+        filters['text'] = ' '.join(words)
+    return filters
@@ -0,0 +1,169 @@
+import hashlib
+import os
+import struct
+import tempfile
+from array import array
+from SeriesCollection import index_key
+import Metrics
+
+# Binary snapshot of the parsed rows of a series CSV file, kept next to it
+# (series.csv -> series.csv.snap), so a load does not parse the CSV again. It holds the base
+# file only: journal records are still replayed on top of it.
+#
+# Layout: a header, then the columns one after the other. Numeric columns are array dumps
+# (ID, Season, PosFile as int64, Erased as int8, the Director codes as int32); Name,
+# DateCreation (verbatim) and the distinct Directors are UTF-8 blobs of NUL-separated values.
+#
+# The snapshot is keyed by the size, mtime and a content hash of the CSV file. It is used when
+# size and mtime match and the hash of the first and last blocks agrees; when only the mtime
+# differs (the file was touched or copied) the hash of the whole content decides. Otherwise
+# it is stale and is rebuilt by the next full read. Base rewrites (journal compaction, sort)
+# write a new one straight away.
+
+SNAPSHOT_SUFFIX = '.snap'
+SNAPSHOT_MAGIC = b'SERIESNP'
+SNAPSHOT_VERSION = 1
+# Magic, version, CSV size, CSV mtime (ns), hash of the first/last blocks, hash of the content, rows
+snapshot_header = struct.Struct('<8sHqq16s16sq')
+# Size of the blocks hashed at both ends of the file for the quick check
+SAMPLE_SIZE = 64 * 1024
+# Separator of the values of a text column (it cannot appear in the values)
+SEPARATOR = '\0'
+
+# Function to hash the first and last blocks of a file
+def sample_hash(file, size):
+    digest = hashlib.blake2b(digest_size=16)
+    with open(file, 'rb') as f:
+        digest.update(f.read(SAMPLE_SIZE))
+        if size > SAMPLE_SIZE:
+            f.seek(max(size - SAMPLE_SIZE, SAMPLE_SIZE))
+            digest.update(f.read(SAMPLE_SIZE))
+    return digest.digest()
+
+# Function to hash the whole content of a file
+def content_hash(file):
+    digest = hashlib.blake2b(digest_size=16)
+    with open(file, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.digest()
+
+def snapshot_path(file):
+    return file + SNAPSHOT_SUFFIX
+
+# Function to join the values of a text column into a blob (None if a value contains the separator)
+def join_text(values):
+    text = SEPARATOR.join(values)
+    if text.count(SEPARATOR) != max(len(values) - 1, 0):
+        return None
+    return text.encode('utf-8')
+
+def split_text(blob, count):
+    return blob.decode('utf-8').split(SEPARATOR) if count else []
+
+# Function to write the snapshot of a CSV file from its rows (lists in Series.headings order).
+# stat is the os.stat of the CSV file the
+# rows were read from (taken now if not given). Returns False if the rows cannot be stored
+# (non-numeric IDs, say), in which case the old snapshot is removed.
+def save_snapshot(file, rows, stat=None):
+    ids, seasons, positions, erased = array('q'), array('q'), array('q'), array('b')
+    names, dates, codes = [], [], array('i')
+    directors, director_index = [], {}
+    try:
+        for ID, name, datecreation, season, director, posFile, erased_flag in rows:
+            # Numbers typed in the GUI are strings until the file is read again
+            ids.append(index_key(ID))
+            seasons.append(index_key(season))
+            positions.append(index_key(posFile))
+            erased.append(index_key(erased_flag))
+            names.append(str(name))
+            dates.append(str(datecreation))
+            director = str(director)
+            code = director_index.get(director)
+            if code is None:
+                code = director_index[director] = len(directors)
+                directors.append(director)
+            codes.append(code)
+    except (TypeError, OverflowError, ValueError):
+        remove_snapshot(file)
+        return False
+    blobs = [join_text(names), join_text(dates), join_text(directors)]
+    if None in blobs:
+        remove_snapshot(file)
+        return False
+
+    if stat is None:
+        stat = os.stat(file)
+    header = snapshot_header.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, stat.st_size, stat.st_mtime_ns,
+                                  sample_hash(file, stat.st_size), content_hash(file), len(ids))
+    target = snapshot_path(file)
+    fd, temp_file = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(target)), suffix='.snap')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(header)
+            for column in (ids, seasons, positions, erased, codes):
+                column.tofile(f)
+            f.write(struct.pack('<qqqq', len(directors), *(len(blob) for blob in blobs)))
+            for blob in blobs:
+                f.write(blob)
+        os.replace(temp_file, target)
+    except OSError as e:
+        # The snapshot is only a cache: without it the CSV is parsed
+        print(f"Failed to save the snapshot: {e}")
+        if os.path.exists(temp_file):
+            os.remove(temp_file)
+        return False
+    if Metrics.enabled:
+        Metrics.count_bytes('snapshot', written=Metrics.file_size(target))
+    return True
+
+# Function to read the columns stored in the snapshot of a CSV file, in Series.headings order,
+# or None if there is no valid snapshot
+def load_snapshot(file):
+    try:
+        stat = os.stat(file)
+        with open(snapshot_path(file), 'rb') as f:
+            data = f.read(snapshot_header.size)
+            if len(data) < snapshot_header.size:
+                return None
+            magic, version, size, mtime, sample, content, count = snapshot_header.unpack(data)
+            if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION or size != stat.st_size:
+                return None
+            if sample != sample_hash(file, size):
+                return None
+            if mtime != stat.st_mtime_ns:
+                if content != content_hash(file):
+                    return None
+                touched = True
+            else:
+                touched = False
+
+            columns = []
+            for typecode in ('q', 'q', 'q', 'b', 'i'):
+                column = array(typecode)
+                column.fromfile(f, count)
+                columns.append(column)
+            director_count, *lengths = struct.unpack('<qqqq', f.read(32))
+            names, dates, directors = (f.read(length) for length in lengths)
+    except (OSError, EOFError, struct.error):
+        return None
+    if touched:
+        # Same content: store the new mtime so the next load takes the quick check again
+        try:
+            with open(snapshot_path(file), 'r+b') as f:
+                f.write(snapshot_header.pack(magic, version, size, stat.st_mtime_ns, sample, content, count))
+        except OSError:
+            pass
+    if Metrics.enabled:
+        Metrics.count_bytes('snapshot', read=Metrics.file_size(snapshot_path(file)))
+
+    ids, seasons, positions, erased, codes = (column.tolist() for column in columns)
+    directors = split_text(directors, director_count)
+    return [ids, split_text(names, count), split_text(dates, count), seasons,
+            [directors[code] for code in codes], positions, erased]
+
+def remove_snapshot(file):
+    try:
+        os.remove(snapshot_path(file))
+    except OSError:
+        pass
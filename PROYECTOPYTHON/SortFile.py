@@ -0,0 +1,141 @@
+import csv
+import heapq
+import os
+import tempfile
+from datetime import date
+from functools import lru_cache
+import Metrics
+
+# Files up to this size (in bytes) are sorted in memory; bigger files use an external merge sort
+IN_MEMORY_LIMIT = 64 * 1024 * 1024
+# Number of rows held in memory per sorted run of the external merge sort
+RUN_ROWS = 200000
+
+# Function to parse a DD/MM/YYYY date into a sortable ordinal (ValueError if it is not a date).
+# Split and int() are several times faster than strptime, and catalogues repeat the same dates
+# many times, so the results are cached.
+@lru_cache(maxsize=65536)
+def parse_date(value):
+    day, month, year = value.split('/')
+    return date(int(year), int(month), int(day)).toordinal()
+
+# Typed conversion used for every sortable column (columns not listed sort as text)
+column_types = {
+    'ID': int,
+    'Season': int,
+    'PosFile': int,
+    'Erased': int,
+    'DateCreation': parse_date,
+}
+
+# Key wrapper for mixed ascending/descending specs, where a plain tuple cannot be used
+class MixedKey:
+    __slots__ = ('values', 'descending')
+
+    def __init__(self, values, descending):
+        self.values = values
+        self.descending = descending
+
+    def __lt__(self, other):
+        for a, b, desc in zip(self.values, other.values, self.descending):
+            if a != b:
+                return (a > b) if desc else (a < b)
+        return False
+
+    def __eq__(self, other):
+        return self.values == other.values
+
+# Function to normalise the column specs: 'Season' or ('Season', True) for descending order
+def parse_specs(header, columns, descending=False):
+    specs = []
+    for column in columns:
+        if isinstance(column, (tuple, list)):
+            column, desc = column
+        else:
+            desc = descending
+        if column not in header:
+            raise ValueError(f"Unknown column {column}.")
+        specs.append((header.index(column), column_types.get(column, str), bool(desc)))
+    if not specs:
+        raise ValueError("Select at least one column to sort by.")
+    return specs
+
+# Function to build the key function and the reverse flag for a list of specs. The column
+# positions and converters are resolved once, not for every row.
+def make_key(specs):
+    indexes = [i for i, _, _ in specs]
+    converters = [convert for _, convert, _ in specs]
+    directions = [desc for _, _, desc in specs]
+    pairs = list(zip(indexes, converters))
+
+    def typed_values(row):
+        return tuple(convert(row[i]) for i, convert in pairs)
+
+    # All columns in the same direction: a plain tuple key and sorted(reverse=...) are enough
+    if all(directions) or not any(directions):
+        return typed_values, directions[0]
+    return (lambda row: MixedKey(typed_values(row), directions)), False
+
+# Function to write rows to a new temporary file in the directory of target
+def write_temp_rows(target, header, rows, suffix):
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(target)), suffix=suffix)
+    with os.fdopen(fd, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        if header is not None:
+            writer.writerow(header)
+        writer.writerows(rows)
+    return temp_path
+
+# Function to iterate over the rows of a sorted run file
+def iter_run(path):
+    with open(path, 'r', newline='', encoding='utf-8') as f:
+        yield from csv.reader(f)
+
+# Function to sort a CSV file in place by the given columns, choosing an in-memory sort for
+# small files and a chunked external merge sort with bounded memory for large ones. Large files
+# are sorted by a process pool when there are several cores (see ParallelFile; workers=1 keeps
+# the sort on one core). The result is written to a temporary file and atomically replaces the
+# original.
+def sort_file(file_path, columns, descending=False, in_memory_limit=None, run_rows=None, workers=None):
+    in_memory_limit = IN_MEMORY_LIMIT if in_memory_limit is None else in_memory_limit
+    run_rows = run_rows or RUN_ROWS
+    # Imported here: ParallelFile builds its sort tasks from this module
+    from ParallelFile import use_parallel, sort_file_parallel
+
+    with open(file_path, 'r', newline='', encoding='utf-8') as file:
+        reader = csv.reader(file)
+        header = next(reader, None)
+        if header is None:
+            return
+        key, reverse = make_key(parse_specs(header, columns, descending))
+
+        if use_parallel(file_path, workers):
+            temp_path = sort_file_parallel(file_path, header, columns, descending, workers)
+        elif os.path.getsize(file_path) <= in_memory_limit:
+            data = [row for row in reader if row]
+            data.sort(key=key, reverse=reverse)
+            temp_path = write_temp_rows(file_path, header, data, '.sorting')
+        else:
+            runs = []
+            try:
+                while True:
+                    chunk = []
+                    for row in reader:
+                        if row:
+                            chunk.append(row)
+                            if len(chunk) >= run_rows:
+                                break
+                    if not chunk:
+                        break
+                    chunk.sort(key=key, reverse=reverse)
+                    runs.append(write_temp_rows(file_path, None, chunk, '.run'))
+                merged = heapq.merge(*(iter_run(run) for run in runs), key=key, reverse=reverse)
+                temp_path = write_temp_rows(file_path, header, merged, '.sorting')
+            finally:
+                for run in runs:
+                    os.remove(run)
+
+    if Metrics.enabled:
+        size = Metrics.file_size(file_path)
+        Metrics.count_bytes('sort_series', read=size, written=Metrics.file_size(temp_path))
+    os.replace(temp_path, file_path)
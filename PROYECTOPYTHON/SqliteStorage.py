@@ -0,0 +1,168 @@
+import json
+import sqlite3
+from contextlib import contextmanager
+from Series import Series
+from Storage import SeriesStorage
+from SeriesStore import date_to_ordinal
+
+# Table columns by Series.headings name; DateCreation is sorted through its date ordinal
+sort_columns = {
+    'ID': 'id',
+    'Name': 'name',
+    'DateCreation': 'date_ordinal',
+    'Season': 'season',
+    'Director': 'director',
+    'PosFile': 'posfile',
+    'Erased': 'erased',
+}
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS series (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    datecreation TEXT NOT NULL,
+    date_ordinal INTEGER NOT NULL,
+    season INTEGER NOT NULL,
+    director TEXT NOT NULL,
+    posfile INTEGER NOT NULL UNIQUE,
+    erased INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS series_director ON series (director);
+CREATE TABLE IF NOT EXISTS settings (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+'''
+
+SELECT = 'SELECT id, name, datecreation, season, director, posfile, erased FROM series'
+INSERT = ('INSERT INTO series (id, name, datecreation, date_ordinal, season, director, posfile, erased) '
+          'VALUES (?, ?, ?, ?, ?, ?, ?, ?)')
+UPSERT = INSERT + (' ON CONFLICT (id) DO UPDATE SET name = excluded.name, datecreation = excluded.datecreation, '
+                   'date_ordinal = excluded.date_ordinal, season = excluded.season, director = excluded.director, '
+                   'posfile = excluded.posfile, erased = excluded.erased')
+UPDATE_ID = ('UPDATE series SET id = ?, name = ?, datecreation = ?, date_ordinal = ?, season = ?, director = ?, '
+             'posfile = ?, erased = ? WHERE id = ?')
+
+# Function to convert a series into the parameters of INSERT/UPSERT
+def series_params(series):
+    return (int(series.ID), str(series.name), str(series.datecreation), date_to_ordinal(series.datecreation),
+            int(series.season), str(series.director), int(series.posFile), int(series.erased))
+
+# Storage backend keeping the catalogue in a local SQLite database. The connection is opened
+# once and reused; sqlite3 caches the compiled (prepared) statements, which are always the
+# same SQL strings. Every write is committed at once, so the database is not kept locked against
+# other processes between edits; batch() groups many writes in one transaction.
+class SqliteStorage(SeriesStorage):
+    def __init__(self, file):
+        self.file = file
+        self.batching = 0
+        self.connection = sqlite3.connect(file, cached_statements=64)
+        self.connection.executescript(SCHEMA)
+
+    # Method to run a write statement, committed unless it is part of a batch
+    def write(self, sql, params):
+        try:
+            self.connection.execute(sql, params)
+        except sqlite3.IntegrityError as e:
+            if not self.batching:
+                self.connection.rollback()
+            raise ValueError(f"The series conflicts with another one ({e}).")
+        if not self.batching:
+            self.commit()
+
+    # Context manager grouping many writes in a single transaction
+    @contextmanager
+    def batch(self):
+        self.batching += 1
+        try:
+            yield self
+        except Exception:
+            self.connection.rollback()
+            raise
+        finally:
+            self.batching -= 1
+        if not self.batching:
+            self.commit()
+
+    def commit(self):
+        self.connection.commit()
+
+    def close(self):
+        self.commit()
+        self.connection.close()
+
+    # Method to read the load order saved by sort()
+    def order(self):
+        row = self.connection.execute("SELECT value FROM settings WHERE key = 'order'").fetchone()
+        if row is None:
+            return ['PosFile'], False
+        columns, descending = json.loads(row[0])
+        return columns, descending
+
+    def load(self, series_list):
+        series_list.clear()
+        for series in self.sorted_scan(*self.order()):
+            series_list.append(series)
+
+    def get_by_id(self, series_id):
+        row = self.connection.execute(SELECT + ' WHERE id = ?', (int(series_id),)).fetchone()
+        return Series(*row) if row else None
+
+    def get_by_pos(self, pos):
+        row = self.connection.execute(SELECT + ' WHERE posfile = ?', (int(pos),)).fetchone()
+        return Series(*row) if row else None
+
+    def insert(self, series):
+        self.write(INSERT, series_params(series))
+
+    def insert_many(self, series_list):
+        with self.batch():
+            for series in series_list:
+                self.insert(series)
+
+    # Rows are keyed by ID, so a changed PosFile is just another column
+    def upsert(self, series, old_id=None, old_pos=None):
+        if old_id is not None and int(old_id) != int(series.ID):
+            self.write(UPDATE_ID, series_params(series) + (int(old_id),))
+        else:
+            self.write(UPSERT, series_params(series))
+
+    def tombstone(self, series):
+        self.write('UPDATE series SET erased = -1 WHERE id = ?', (int(series.ID),))
+        self.dead += 1
+
+    # Rows are deleted where they are: PosFile values are kept (they are not table positions)
+    def purge(self, series_list, renumber=False):
+        with self.batch():
+            self.connection.execute('DELETE FROM series WHERE erased != 0')
+        self.dead = 0
+
+    def save_all(self, series_list):
+        with self.batch():
+            self.connection.execute('DELETE FROM series')
+            for series in series_list:
+                if not series.erased:
+                    self.insert(series)
+        self.dead = 0
+
+    # Method to build the ORDER BY clause from column specs ('Season' or ('Season', True))
+    def order_by(self, columns, descending=False):
+        terms = []
+        for column in columns:
+            if isinstance(column, (tuple, list)):
+                column, desc = column
+            else:
+                desc = descending
+            if column not in sort_columns:
+                raise ValueError(f"Unknown column {column}.")
+            terms.append(f"{sort_columns[column]} {'DESC' if desc else 'ASC'}")
+        if not terms:
+            raise ValueError("Select at least one column to sort by.")
+        return ', '.join(terms)
+
+    def sorted_scan(self, columns, descending=False):
+        cursor = self.connection.execute(f'{SELECT} WHERE erased = 0 ORDER BY {self.order_by(columns, descending)}')
+        for row in cursor:
+            yield Series(*row)
+
+    def sort(self, columns, descending=False):
+        self.order_by(columns, descending)
+        self.write("INSERT OR REPLACE INTO settings (key, value) VALUES ('order', ?)",
+                   (json.dumps([list(columns), bool(descending)]),))
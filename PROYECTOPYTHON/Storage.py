@@ -0,0 +1,123 @@
+import os
+from abc import ABC, abstractmethod
+from contextlib import nullcontext
+
+# Storage interface used by the engine. The backend of a file is chosen from its path, so
+# switching a catalogue to SQLite is a configuration change (SERIES_FILE=series.db), not a
+# GUI change:
+#   *.db / *.sqlite / *.sqlite3 -> SqliteStorage
+#   *.dat                       -> FileStorage (fixed-width record file)
+#   anything else               -> FileStorage (CSV base file plus journal)
+SQLITE_SUFFIXES = ('.db', '.sqlite', '.sqlite3')
+
+# Open storages, one per file, so connections and handles are reused
+storages = {}
+
+# Function to check whether a path refers to a SQLite catalogue
+def is_sqlite_file(file):
+    return str(file).endswith(SQLITE_SUFFIXES)
+
+# Base class of the storage backends. Series are matched by ID first and by PosFile otherwise.
+class SeriesStorage(ABC):
+    # Rows this process tombstoned since the storage was last compacted (see
+    # SeriesEngine.purge_if_needed)
+    dead = 0
+
+    # Method to fill a list (normally a SeriesCollection) with every live series
+    @abstractmethod
+    def load(self, series_list):
+        pass
+
+    @abstractmethod
+    def get_by_id(self, series_id):
+        pass
+
+    @abstractmethod
+    def get_by_pos(self, pos):
+        pass
+
+    # Method to insert a series or replace the stored one with the same ID (old_id and old_pos
+    # are the ID and PosFile it was stored under, when they were changed)
+    @abstractmethod
+    def upsert(self, series, old_id=None, old_pos=None):
+        pass
+
+    # Method to store a new series (backends may store it more cheaply than an upsert)
+    def insert(self, series):
+        self.upsert(series)
+
+    # Method to store many new series at once (one transaction or one buffered write)
+    def insert_many(self, series_list):
+        for series in series_list:
+            self.insert(series)
+
+    # Method to mark a series as erased
+    @abstractmethod
+    def tombstone(self, series):
+        pass
+
+    # Method to physically remove erased series; series_list is the already purged list. With
+    # renumber, backends whose PosFile is a position in the file give the series new ones.
+    @abstractmethod
+    def purge(self, series_list, renumber=False):
+        pass
+
+    # Method to replace the whole content with the live series of a list
+    @abstractmethod
+    def save_all(self, series_list):
+        pass
+
+    # Method to iterate over the live series ordered by columns (names of Series.headings)
+    @abstractmethod
+    def sorted_scan(self, columns, descending=False):
+        pass
+
+    # Method to make the order given by columns the one used by load()
+    @abstractmethod
+    def sort(self, columns, descending=False):
+        pass
+
+    # Method to hold the write lock of the storage across several operations (for backends
+    # shared by several processes; SQLite does its own locking)
+    def locked(self):
+        return nullcontext()
+
+    # Method to apply the changes other processes made to a list filled by load(); returns the
+    # IDs they changed, or None if the list was reloaded
+    def refresh(self, series_list=None):
+        return set()
+
+    # Method to make every pending change durable
+    def commit(self):
+        pass
+
+    def close(self):
+        self.commit()
+
+# Function to get the (shared) storage of a file
+def get_storage(file):
+    storage = storages.get(file)
+    if storage is None:
+        # Backends are imported on first use so importing the engine stays cheap
+        if is_sqlite_file(file):
+            from SqliteStorage import SqliteStorage
+            storage = SqliteStorage(file)
+        else:
+            from FileStorage import FileStorage
+            storage = FileStorage(file)
+        storages[file] = storage
+    return storage
+
+# Function to commit and close every open storage (called when the application exits)
+def close_storages():
+    for storage in storages.values():
+        storage.close()
+    storages.clear()
+    from Journal import close_journals
+    from FileLock import close_locks
+    close_journals()
+    close_locks()
+
+# Default file path for storing series data, overridable with the SERIES_FILE environment variable
+def default_series_file():
+    return os.environ.get('SERIES_FILE', 'series.csv')
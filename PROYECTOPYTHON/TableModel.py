@@ -0,0 +1,67 @@
+# Paged model behind the series table of the GUI. Only the rows of the visible page are
+# converted to table rows and coloured, so refreshing the table costs O(page size) instead of
+# O(catalogue size). It has no PySimpleGUI dependency.
+
+# Number of rows shown by the table (sg.Table num_rows)
+TABLE_ROWS = 10
+
+# Function to get color based on row index and total rows
+def get_color(i, total_rows):
+    r = int(255 - i / total_rows * 255)
+    return f'#{r:02X}0000'
+
+class TableModel:
+    def __init__(self, series_list, page_size=TABLE_ROWS):
+        self.series_list = series_list
+        self.page_size = page_size
+        self.first = 0
+        # Series of the rows last sent to the table by rows()
+        self.shown = []
+
+    # Method to get the number of pages (at least one, even for an empty list)
+    def page_count(self):
+        return max(1, -(-len(self.series_list) // self.page_size))
+
+    def page(self):
+        return self.first // self.page_size
+
+    # Method to move to a page, clamped to the existing ones
+    def go_to_page(self, page):
+        page = min(max(page, 0), self.page_count() - 1)
+        self.first = page * self.page_size
+
+    def scroll(self, pages):
+        self.go_to_page(self.page() + pages)
+
+    # Method to keep the visible page inside the list after rows were removed
+    def clamp(self):
+        self.go_to_page(self.page())
+
+    # Method to get the series of the visible page (erased series are not shown)
+    def visible_series(self):
+        end = min(self.first + self.page_size, len(self.series_list))
+        return [s for s in (self.series_list[i] for i in range(self.first, end)) if not s.erased]
+
+    def is_visible(self, series):
+        return any(s is series for s in self.visible_series())
+
+    # Method to get the series shown at a row of the table, or None. It uses the rows last sent
+    # to the table, so it stays right while a background job changes the list.
+    def series_at(self, table_row):
+        if 0 <= table_row < len(self.shown):
+            return self.shown[table_row]
+        return None
+
+    # Method to get the table rows of the visible page
+    def rows(self):
+        self.shown = self.visible_series()
+        return [[o.ID, o.name, o.datecreation, o.season, o.director, o.posFile] for o in self.shown]
+
+    # Method to get the row colours of the rows last sent to the table; the gradient runs over
+    # the whole catalogue but is only computed for the rows on screen
+    def row_colors(self):
+        total_rows = max(len(self.series_list), 1)
+        return [(i, get_color(self.first + i, total_rows)) for i in range(len(self.shown))]
+
+    def page_label(self):
+        return f'Page {self.page() + 1} of {self.page_count()} ({len(self.series_list)} series)'
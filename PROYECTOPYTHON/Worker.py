@@ -0,0 +1,107 @@
+import queue
+import threading
+import time
+
+# Background worker for the storage operations of the GUI. Jobs run one at a time, in the order
+# they were submitted, on a single thread: operations touching the same file or list (a sort
+# followed by a reload, two edits of the same series) are therefore serialized, and the event
+# loop of the window keeps running while they do.
+#
+# The worker has no PySimpleGUI dependency: it reports through a post(key, value) callable,
+# which in the GUI is window.write_event_value (safe to call from another thread).
+
+# Keys of the events posted back to the GUI loop
+JOB_PROGRESS = '-job-progress-'
+JOB_DONE = '-job-done-'
+
+# A loading job reports its progress every this many series
+PROGRESS_ROWS = 50000
+
+class Job:
+    def __init__(self, name, func, args, kwargs, post):
+        self.name = name
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.post = post
+        self.result = None
+        self.error = None
+        self.elapsed = 0.0
+
+    # Method to report progress from inside the job (total is None when it is not known)
+    def progress(self, done, total=None):
+        self.post(JOB_PROGRESS, (self.name, done, total))
+
+    def run(self):
+        start = time.perf_counter()
+        try:
+            self.result = self.func(*self.args, **self.kwargs)
+        except Exception as e:
+            self.error = e
+        self.elapsed = time.perf_counter() - start
+
+    def status(self):
+        if self.error is not None:
+            return f'{self.name} failed: {self.error}'
+        return f'{self.name} done in {self.elapsed:.2f} s'
+
+class StorageWorker:
+    def __init__(self, post):
+        self.post = post
+        self.jobs = queue.Queue()
+        self.lock = threading.Lock()
+        self.pending = 0
+        self.thread = threading.Thread(target=self.run, name='storage-worker', daemon=True)
+        self.thread.start()
+
+    # Method to queue a job; with progress=True the job is passed as the keyword argument 'job'
+    # so it can call job.progress(). JOB_DONE is posted with the job when it finishes.
+    def submit(self, name, func, *args, progress=False, **kwargs):
+        job = Job(name, func, args, kwargs, self.post)
+        if progress:
+            kwargs['job'] = job
+        with self.lock:
+            self.pending += 1
+        self.jobs.put(job)
+        return job
+
+    # Method to check if jobs are queued or running
+    def busy(self):
+        with self.lock:
+            return self.pending > 0
+
+    def run(self):
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                break
+            job.run()
+            with self.lock:
+                self.pending -= 1
+            self.post(JOB_DONE, job)
+
+    # Method to finish the queued jobs and stop the thread (final runs once the queue is empty,
+    # on the worker thread)
+    def stop(self, final=None):
+        if final is not None:
+            self.submit('Stop', final)
+        self.jobs.put(None)
+        self.thread.join()
+
+# Listener of a SeriesCollection reporting the progress of a load through a job
+class LoadProgress:
+    def __init__(self, job, every=PROGRESS_ROWS):
+        self.job = job
+        self.every = every
+        self.count = 0
+
+    def add(self, series):
+        self.count += 1
+        if self.count % self.every == 0:
+            self.job.progress(self.count)
+
+    def remove(self, series):
+        pass
+
+    def clear(self):
+        self.count = 0
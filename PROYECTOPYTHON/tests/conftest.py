@@ -0,0 +1,21 @@
+import os
+import sys
+import pytest
+
+# The modules of the application are imported by name from the folder above
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Series import Series
+from Storage import close_storages
+
+# Function to build a series with default values for the fields a test does not care about
+def make_series(ID, name=None, datecreation='01/01/2000', season=1, director='Director', posFile=None, erased=0):
+    return Series(ID, name or f'Series {ID}', datecreation, season, director,
+                  ID if posFile is None else posFile, erased)
+
+# Every test runs in its own folder, and the storages, journals and locks it opened are closed
+@pytest.fixture(autouse=True)
+def work_dir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    yield tmp_path
+    close_storages()
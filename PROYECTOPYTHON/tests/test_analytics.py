@@ -0,0 +1,91 @@
+import os
+import pytest
+from conftest import make_series
+from Analytics import (read_catalogue_columns, columns_from_series, CatalogueStats, export_columns,
+                       load_columns)
+from Journal import get_journal
+from SeriesCollection import SeriesCollection
+from SeriesEngine import save_series_list
+from Snapshot import remove_snapshot, snapshot_path
+
+@pytest.mark.parametrize('with_snapshot', [True, False])
+def test_columns_include_the_journal_without_writing(work_dir, with_snapshot):
+    save_series_list('series.csv', SeriesCollection([make_series(i, director='Ann') for i in range(1, 4)]))
+    if not with_snapshot:
+        remove_snapshot('series.csv')
+    journal = get_journal('series.csv')
+    journal.log_update(make_series(2, director='Bob'))
+    journal.log_delete(make_series(1))
+    journal.log_add(make_series(4, director='Cy'))
+    base = os.stat('series.csv').st_mtime_ns
+    size = journal.size()
+
+    columns = read_catalogue_columns('series.csv')
+    assert list(columns.ids) == [2, 3, 4]
+    assert [columns.directors[code] for code in columns.director_codes] == ['Bob', 'Ann', 'Cy']
+    assert os.stat('series.csv').st_mtime_ns == base and journal.size() == size
+    assert os.path.exists(snapshot_path('series.csv')) == with_snapshot
+
+CATALOGUE = [
+    make_series(1, 'Lost', '22/09/2004', 6, 'Abrams'),
+    make_series(2, 'Alias', '30/09/2001', 5, 'Abrams'),
+    make_series(3, 'Fringe', '09/09/2008', 5, 'Abrams'),
+    make_series(4, 'Fargo', '15/04/2014', 5, 'Hawley'),
+    make_series(5, 'Legion', '08/02/2017', 3, 'Hawley'),
+    make_series(6, 'Dark', '01/12/2017', 3, 'Odar'),
+    make_series(7, 'Ñ', 'unknown', 1, 'Odar'),
+    make_series(8, 'Gone', '01/01/2004', 2, 'Abrams', erased=-1),
+]
+
+@pytest.fixture(params=[False, True], ids=['python', 'numpy'])
+def stats(request):
+    if request.param:
+        pytest.importorskip('numpy')
+    return CatalogueStats(columns_from_series(CATALOGUE), use_numpy=request.param)
+
+def test_aggregations(stats):
+    assert stats.counts_by_director() == [('Abrams', 3), ('Hawley', 2), ('Odar', 2)]
+    assert stats.counts_by_director(top=1) == [('Abrams', 3)]
+    assert stats.season_distribution() == {1: 1, 3: 2, 5: 3, 6: 1}
+    # 'unknown' is not a date and is not counted by year
+    assert stats.titles_per_year() == {2001: 1, 2004: 1, 2008: 1, 2014: 1, 2017: 2}
+    # Erased series are skipped unless asked for
+    assert stats.counts_by_director(include_erased=True)[0] == ('Abrams', 4)
+    assert stats.summary(top=2) == {
+        'series': 7,
+        'directors': [{'director': 'Abrams', 'series': 3}, {'director': 'Hawley', 'series': 2}],
+        'seasons': {'1': 1, '3': 2, '5': 3, '6': 1},
+        'years': {'2001': 1, '2004': 1, '2008': 1, '2014': 1, '2017': 2},
+    }
+
+def test_filters(stats):
+    assert stats.season_distribution(director='Abrams') == {5: 2, 6: 1}
+    assert stats.counts_by_director(director=['Hawley', 'Odar'], season_min=3) == [('Hawley', 2), ('Odar', 1)]
+    assert stats.titles_per_year(season_min=4, season_max=5) == {2001: 1, 2008: 1, 2014: 1}
+    assert stats.titles_per_year(year_from=2005, year_to=2016) == {2008: 1, 2014: 1}
+    # A date range leaves out the values that are not dates
+    assert stats.summary(date_to='31/12/2005')['series'] == 2
+    assert stats.summary(date_from='01/01/2017', date_to='31/12/2017')['series'] == 2
+    assert stats.summary(director='Nobody')['series'] == 0
+    with pytest.raises(ValueError):
+        stats.summary(date_from='2017-01-01')
+
+def test_export_and_reload_columns(work_dir):
+    columns = columns_from_series(CATALOGUE)
+    export_columns(columns, 'export')
+    with load_columns('export') as loaded:
+        assert len(loaded) == len(columns)
+        for attribute in ('ids', 'dates', 'seasons', 'director_codes', 'positions', 'erased'):
+            assert list(getattr(loaded, attribute)) == list(getattr(columns, attribute))
+        assert list(loaded.names) == list(columns.names)
+        assert loaded.directors == columns.directors
+        assert loaded.raw_dates == {6: 'unknown'}
+        # The reloaded columns give the same aggregations
+        assert (CatalogueStats(loaded, use_numpy=False).summary()
+                == CatalogueStats(columns, use_numpy=False).summary())
+
+def test_reload_rejects_an_unfinished_export(work_dir):
+    export_columns(columns_from_series(CATALOGUE), 'export')
+    os.remove(os.path.join('export', 'meta.json'))
+    with pytest.raises(ValueError):
+        load_columns('export')
@@ -0,0 +1,45 @@
+import filecmp
+import json
+import os
+import pytest
+import Benchmark
+from Benchmark import generate_catalogue, run_once, operations
+from SeriesEngine import load_series, series_values_error
+from Storage import close_storages
+
+def test_catalogue_is_reproducible(work_dir):
+    generate_catalogue('a.csv', 250, seed=3)
+    generate_catalogue('b.csv', 250, seed=3)
+    generate_catalogue('c.csv', 250, seed=4)
+    assert filecmp.cmp('a.csv', 'b.csv', shallow=False) and not filecmp.cmp('a.csv', 'c.csv', shallow=False)
+    series_list = load_series('a.csv')
+    assert len(series_list) == 250
+    assert all(series_values_error(s.ID, s.name, s.datecreation, s.season) is None
+               for s in series_list if s.ID <= 999)
+
+@pytest.mark.parametrize('operation, rows', [
+    ('read_series', 1200), ('add_series', 1200), ('modify_series', 1200), ('delete_series', 1180),
+    ('purge_deleted_series', 1180), ('sort_series', 1200)])
+def test_operations_leave_the_expected_catalogue(work_dir, operation, rows):
+    generate_catalogue('source.csv', 1200)
+    os.mkdir('work')
+    elapsed, peak = run_once('source.csv', 'work', operation, 1200, 20, trace=True)
+    assert elapsed > 0 and peak > 0
+    close_storages()
+    series_list = load_series(os.path.join('work', 'series.csv'))
+    assert len(series_list) == rows
+    if operation == 'add_series':
+        assert series_list.find_by_id(1).name == 'Added 1' and series_list.find_by_id(1).posFile == 1201
+
+def test_main_writes_every_operation(work_dir):
+    assert Benchmark.main(['--sizes', '100', '--repeats', '1', '--warmup', '0', '--ops', '5',
+                           '--output', 'bench.json']) == 0
+    with open('bench.json', encoding='utf-8') as f:
+        results = json.load(f)
+    assert results['environment']['python']
+    assert [r['operation'] for r in results['results']] == list(operations)
+    assert all(r['rows'] == 100 and r['min_s'] <= r['median_s'] <= r['max_s'] for r in results['results'])
+
+def test_add_needs_ids_the_validator_accepts(work_dir):
+    with pytest.raises(SystemExit):
+        Benchmark.main(['--sizes', '100', '--ops', '1000'])
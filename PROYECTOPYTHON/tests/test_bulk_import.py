@@ -0,0 +1,77 @@
+import csv
+from BulkImport import bulk_import
+from SeriesCollection import SeriesCollection
+from SeriesEngine import load_series
+
+def write_source(path, rows):
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        csv.writer(f).writerows([['ID', 'Name', 'DateCreation', 'Season', 'Director', 'PosFile']] + rows)
+
+def test_bad_rows_are_rejected_and_valid_rows_stored(work_dir):
+    write_source('source.csv', [
+        ['1', 'Lost', '22/09/2004', '6', 'Abrams', '1'],
+        ['12a', 'Bad ID', '01/01/2000', '1', 'X', '2'],
+        ['3', 'Bad season', '01/01/2000', '3x', 'X', '3'],
+        ['4', 'Bad date', '2000-01-01', '1', 'X', '4'],
+        ['1234', 'Long ID', '01/01/2000', '1', 'X', '5'],
+        ['6', 'Bad PosFile', '01/01/2000', '1', 'X', '6b'],
+        ['7', 'Dark', '01/12/2017', '3', 'Odar', '7'],
+    ])
+    series_list = SeriesCollection()
+    report = bulk_import('source.csv', 'series.csv', series_list)
+
+    assert report.accepted == 2
+    assert [line for line, _, _ in report.rejected] == [3, 4, 5, 6, 7]
+    assert sorted(s.ID for s in series_list) == [1, 7]
+    # The file holds exactly what the collection holds
+    assert sorted((s.ID, s.name) for s in load_series('series.csv')) == [(1, 'Lost'), (7, 'Dark')]
+
+def test_duplicates_are_rejected(work_dir):
+    write_source('source.csv', [
+        ['1', 'Lost', '22/09/2004', '6', 'Abrams', '1'],
+        ['1', 'Same ID', '01/01/2000', '1', 'X', '2'],
+        ['2', 'Same PosFile', '01/01/2000', '1', 'X', '1'],
+    ])
+    series_list = SeriesCollection()
+    report = bulk_import('source.csv', 'series.csv', series_list)
+    assert report.accepted == 1
+    assert [reason.split()[1] for _, _, reason in report.rejected] == ['ID', 'PosFile']
+
+    # A second import is checked against the series already stored
+    report = bulk_import('source.csv', 'series.csv', series_list)
+    assert report.accepted == 0 and len(report.rejected) == 3
+    assert len(load_series('series.csv')) == 1
+
+def test_jsonl_source(work_dir):
+    with open('source.jsonl', 'w', encoding='utf-8') as f:
+        f.write('{"ID": 5, "Name": "Fargo", "DateCreation": "15/04/2014", "Season": 5, "Director": "Hawley", "PosFile": 5}\n')
+        f.write('not json\n')
+    series_list = SeriesCollection()
+    report = bulk_import('source.jsonl', 'series.csv', series_list)
+    assert report.accepted == 1 and report.rejected[0][0] == 2
+    assert series_list.find_by_id(5).name == 'Fargo'
+
+def test_pos_file_must_be_positive(work_dir):
+    write_source('source.csv', [
+        ['1', 'Zero', '01/01/2000', '1', 'X', '0'],
+        ['2', 'Lost', '22/09/2004', '6', 'Abrams', '2'],
+    ])
+    for catalogue in ('series.csv', 'series.dat'):
+        report = bulk_import('source.csv', catalogue, SeriesCollection())
+        assert report.accepted == 1
+        assert report.rejected[0][0] == 2 and 'PosFile' in report.rejected[0][2]
+        assert [s.ID for s in load_series(catalogue)] == [2]
+
+def test_batch_that_cannot_be_written_is_reported(work_dir):
+    # A name too long for a fixed-width record passes validation but cannot be stored
+    write_source('source.csv', [
+        ['1', 'Lost', '22/09/2004', '6', 'Abrams', '1'],
+        ['2', 'x' * 150, '01/01/2000', '1', 'X', '2'],
+    ])
+    series_list = SeriesCollection()
+    report = bulk_import('source.csv', 'series.dat', series_list)
+    assert report.accepted == 0
+    assert [line for line, _, _ in report.rejected] == [2, 3]
+    assert 'could not be written' in report.rejected[0][2]
+    # Nothing of the batch was written or added
+    assert len(series_list) == 0 and len(load_series('series.dat')) == 0
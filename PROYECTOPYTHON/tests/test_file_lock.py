@@ -0,0 +1,76 @@
+import os
+import subprocess
+import sys
+import pytest
+from conftest import make_series
+from FileLock import get_lock
+from RecordFile import create_record_file
+from SeriesCollection import SeriesCollection
+from SeriesEngine import load_series, save_series_list, create_series, modify_series
+from Storage import get_storage
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Function to run statements in another process, in the current folder
+def run_other(code):
+    code = 'from SeriesEngine import *\nfrom Storage import close_storages\n' + code + '\nclose_storages()\n'
+    env = dict(os.environ, PYTHONPATH=APP_DIR)
+    subprocess.run([sys.executable, '-c', code], check=True, env=env, timeout=60)
+
+@pytest.fixture(params=['series.csv', 'series.dat'])
+def catalogue(request, work_dir):
+    if request.param.endswith('.dat'):
+        create_record_file(request.param)
+    save_series_list(request.param, SeriesCollection([make_series(i) for i in range(1, 4)]))
+    return request.param
+
+def test_counters_are_shared_by_processes(work_dir):
+    lock = get_lock('series.csv')
+    assert lock.counters() == (0, 0)
+    lock.bump()
+    run_other("from FileLock import get_lock\nget_lock('series.csv').bump(rewrite=True)")
+    assert lock.counters() == (2, 1)
+
+def test_conflicting_modify(catalogue):
+    series_list = load_series(catalogue)
+    run_other(f"s = load_series({catalogue!r})\n"
+              f"x = s.find_by_id(2)\n"
+              f"s.modify(x, name='Theirs')\n"
+              f"modify_series({catalogue!r}, x)")
+
+    series = series_list.find_by_id(2)
+    series_list.modify(series, name='Mine')
+    with pytest.raises(ValueError):
+        modify_series(catalogue, series)
+    # The list holds their version, and so does the file
+    assert series_list.find_by_id(2).name == 'Theirs'
+    assert load_series(catalogue).find_by_id(2).name == 'Theirs'
+
+def test_duplicate_id_added_by_another_process(catalogue):
+    series_list = load_series(catalogue)
+    run_other(f"create_series({catalogue!r}, load_series({catalogue!r}), '4', 'Theirs', '01/01/2000', '1', 'X', '4')")
+
+    with pytest.raises(ValueError):
+        create_series(catalogue, series_list, '4', 'Mine', '01/01/2000', '1', 'Y', '5')
+    assert series_list.find_by_id(4).name == 'Theirs'
+    assert sorted(s.ID for s in load_series(catalogue)) == [1, 2, 3, 4]
+
+def test_reload_after_another_process_rewrites_the_base(catalogue):
+    series_list = load_series(catalogue)
+    storage = get_storage(catalogue)
+    run_other(f"s = load_series({catalogue!r})\n"
+              f"s.find_by_id(1).erased = -1\n"
+              f"purge_series({catalogue!r}, s, renumber=False)\n"
+              f"sort_series({catalogue!r}, [('ID', True)])")
+
+    # The base was replaced: the list is reloaded rather than patched from the journal
+    assert storage.refresh(series_list) is None
+    assert [s.ID for s in series_list] == [3, 2]
+
+def test_record_file_sort_order_reaches_other_processes(work_dir):
+    create_record_file('series.dat')
+    save_series_list('series.dat', SeriesCollection([make_series(i, season=i) for i in range(1, 4)]))
+    series_list = load_series('series.dat')
+    run_other("sort_series('series.dat', ['Season'], descending=True)")
+    get_storage('series.dat').refresh(series_list)
+    assert [s.ID for s in series_list] == [3, 2, 1]
@@ -0,0 +1,42 @@
+from conftest import make_series
+from RecordFile import create_record_file, read_series_record
+from SeriesCollection import SeriesCollection
+from SeriesEngine import load_series, save_series_list, modify_series
+from Storage import get_storage, close_storages
+
+def load_ids(file):
+    series_list = SeriesCollection()
+    get_storage(file).load(series_list)
+    return [series.ID for series in series_list]
+
+def test_record_file_sort_survives_a_restart(work_dir):
+    create_record_file('series.dat')
+    storage = get_storage('series.dat')
+    storage.insert_many([make_series(1, season=3), make_series(2, season=1), make_series(3, season=2)])
+    storage.sort(['Season'], descending=True)
+    assert load_ids('series.dat') == [1, 3, 2]
+
+    # A new storage (a restart, or another process) loads the file in the same order
+    close_storages()
+    assert load_ids('series.dat') == [1, 3, 2]
+    # Records are still stored by PosFile
+    assert get_storage('series.dat').get_by_pos(2).ID == 2
+
+def test_record_file_without_sort_loads_by_pos_file(work_dir):
+    create_record_file('series.dat')
+    get_storage('series.dat').insert_many([make_series(2, posFile=1), make_series(1, posFile=2)])
+    close_storages()
+    assert load_ids('series.dat') == [2, 1]
+
+def test_record_file_pos_file_change_frees_the_old_slot(work_dir):
+    save_series_list('series.dat', SeriesCollection([make_series(i) for i in range(1, 4)]))
+    series_list = load_series('series.dat')
+    series = series_list.find_by_id(1)
+    series_list.modify(series, posFile=7, name='Moved')
+    modify_series('series.dat', series, old_pos=1)
+
+    close_storages()
+    reloaded = load_series('series.dat')
+    assert sorted((s.ID, s.name, s.posFile) for s in reloaded) == [
+        (1, 'Moved', 7), (2, 'Series 2', 2), (3, 'Series 3', 3)]
+    assert read_series_record('series.dat', 1) is None
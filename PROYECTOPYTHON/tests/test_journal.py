@@ -0,0 +1,78 @@
+import csv
+import pytest
+from conftest import make_series
+from Journal import Journal, get_journal, OP_ADD, OP_UPDATE, OP_DELETE
+from SeriesCollection import SeriesCollection
+from SeriesEngine import load_series, save_series_list, modify_series, delete_series_file
+from Storage import close_storages
+
+# Function to read the rows of a base CSV file as (ID, Name) pairs
+def base_rows(path):
+    with open(path, newline='', encoding='utf-8') as f:
+        return [(int(row[0]), row[1]) for row in list(csv.reader(f))[1:]]
+
+@pytest.fixture
+def catalogue(work_dir):
+    save_series_list('series.csv', SeriesCollection([make_series(i) for i in range(1, 5)]))
+    return 'series.csv'
+
+def test_replay_applies_adds_updates_and_deletes(catalogue):
+    journal = get_journal(catalogue)
+    journal.log_add(make_series(5))
+    journal.log_update(make_series(2, 'Renamed'))
+    journal.log_delete(make_series(3))
+    assert [op for op, _, _ in journal.entries()] == [OP_ADD, OP_UPDATE, OP_DELETE]
+
+    close_storages()
+    series_list = load_series(catalogue)
+    assert [(s.ID, s.name) for s in series_list] == [(1, 'Series 1'), (2, 'Renamed'), (4, 'Series 4'), (5, 'Series 5')]
+
+def test_torn_last_record_is_ignored(catalogue):
+    get_journal(catalogue).log_add(make_series(5))
+    close_storages()
+    with open(catalogue + '.journal', 'a', encoding='utf-8') as f:
+        f.write('A,6,Torn')
+    assert [s.ID for s in load_series(catalogue)] == [1, 2, 3, 4, 5]
+
+@pytest.mark.parametrize('from_list', [False, True])
+def test_compaction_folds_the_journal_into_the_base(catalogue, from_list):
+    series_list = load_series(catalogue)
+    modify_series(catalogue, series_list.find_by_id(2))
+    series = series_list.find_by_id(1)
+    series_list.modify(series, name='Changed')
+    modify_series(catalogue, series)
+    delete_series_file(catalogue, series_list, series_list.find_by_id(4))
+
+    journal = get_journal(catalogue)
+    journal.compact(series_list if from_list else None)
+    assert journal.size() == 0
+    assert base_rows(catalogue) == [(1, 'Changed'), (2, 'Series 2'), (3, 'Series 3')]
+
+def test_changed_id_is_not_duplicated(catalogue):
+    series_list = load_series(catalogue)
+    series = series_list.find_by_id(2)
+    series_list.modify(series, ID=20, posFile=20, name='New ID')
+    modify_series(catalogue, series, old_id=2)
+
+    # Replayed onto the base by another reader
+    close_storages()
+    assert sorted((s.ID, s.name) for s in load_series(catalogue)) == [
+        (1, 'Series 1'), (3, 'Series 3'), (4, 'Series 4'), (20, 'New ID')]
+    # Merged into the base from disk
+    get_journal(catalogue).compact()
+    assert sorted(base_rows(catalogue)) == [(1, 'Series 1'), (3, 'Series 3'), (4, 'Series 4'), (20, 'New ID')]
+
+def test_changed_id_in_sqlite(work_dir):
+    series_list = SeriesCollection([make_series(i) for i in range(1, 3)])
+    save_series_list('series.db', series_list)
+    series = series_list.find_by_id(2)
+    series_list.modify(series, ID=20)
+    modify_series('series.db', series, old_id=2)
+    assert [s.ID for s in load_series('series.db')] == [1, 20]
+
+def test_automatic_compaction_past_the_threshold(catalogue):
+    journal = Journal(catalogue, compact_threshold=1)
+    journal.log_update(make_series(1, 'Changed'))
+    assert journal.needs_compaction()
+    journal.compact()
+    assert not journal.needs_compaction() and base_rows(catalogue)[0] == (1, 'Changed')
@@ -0,0 +1,71 @@
+import csv
+import os
+from conftest import make_series
+from Journal import get_journal
+from MappedFile import MappedSeriesFile, open_mapped_series
+from Series import Series
+from TableModel import TableModel
+
+def write_rows(file, rows):
+    with open(file, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(Series.headings)
+        writer.writerows(rows)
+
+def test_rows_and_ranges(work_dir):
+    write_rows('series.csv', [make_series(i).to_row() for i in range(1, 26)])
+    with MappedSeriesFile('series.csv') as mapped:
+        assert len(mapped) == 25
+        assert mapped[0].to_row() == make_series(1).to_row()
+        assert mapped[-1].ID == 25
+        assert [s.ID for s in mapped[10:13]] == [11, 12, 13]
+        assert [s.ID for s in mapped[0:6:2]] == [1, 3, 5]
+        # It works as the list of the table model
+        model = TableModel(mapped)
+        model.go_to_page(2)
+        assert [row[0] for row in model.rows()] == [21, 22, 23, 24, 25]
+
+def test_quoted_newlines(work_dir):
+    write_rows('series.csv', [
+        [1, 'Line one\nline two', '01/01/2000', 1, 'Director', 1, 0],
+        [2, 'Say "hi"\n\nagain', '01/01/2000', 1, 'Director, Jr.', 2, 0],
+        [3, 'Plain', '01/01/2000', 1, 'Director', 3, 0],
+    ])
+    with MappedSeriesFile('series.csv') as mapped:
+        assert len(mapped) == 3
+        assert mapped[0].name == 'Line one\nline two'
+        assert (mapped[1].name, mapped[1].director) == ('Say "hi"\n\nagain', 'Director, Jr.')
+        assert [s.ID for s in mapped[0:3]] == [1, 2, 3]
+
+def test_index_is_reused_and_rebuilt_when_stale(work_dir, monkeypatch):
+    write_rows('series.csv', [make_series(i).to_row() for i in range(1, 4)])
+    MappedSeriesFile('series.csv').close()
+    assert os.path.exists('series.csv.idx')
+    assert [name for name in os.listdir('.') if name.endswith('.idx')] == ['series.csv.idx']
+
+    # A reopen only reads the index
+    def fail(self):
+        raise AssertionError('the index was rebuilt')
+    with monkeypatch.context() as patch:
+        patch.setattr(MappedSeriesFile, 'build_index', fail)
+        with MappedSeriesFile('series.csv') as mapped:
+            assert len(mapped) == 3
+
+    # A changed file gets a new index
+    write_rows('series.csv', [make_series(i).to_row() for i in range(1, 6)])
+    with MappedSeriesFile('series.csv') as mapped:
+        assert [s.ID for s in mapped] == [1, 2, 3, 4, 5]
+    with MappedSeriesFile('series.csv') as mapped:
+        assert len(mapped) == 5
+
+def test_open_mapped_series_only_when_the_base_is_current(work_dir):
+    assert open_mapped_series('series.csv') is None
+    write_rows('series.csv', [make_series(1).to_row()])
+    mapped = open_mapped_series('series.csv')
+    assert len(mapped) == 1
+    mapped.close()
+
+    # Pending journal records are not in the base file
+    get_journal('series.csv').log_add(make_series(2))
+    assert open_mapped_series('series.csv') is None
+    assert open_mapped_series('series.dat') is None and open_mapped_series('series.db') is None
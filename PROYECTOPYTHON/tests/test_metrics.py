@@ -0,0 +1,51 @@
+import os
+import subprocess
+import sys
+import threading
+import pytest
+import Metrics
+
+@pytest.fixture
+def metrics():
+    was_enabled = Metrics.enabled
+    Metrics.enable(profile=True)
+    Metrics.reset()
+    yield Metrics
+    Metrics.reset()
+    Metrics.disable()
+    Metrics.enabled = was_enabled
+
+def test_trace_alone_prints_the_calls(work_dir):
+    code = ("import Metrics\n"
+            "@Metrics.instrumented('demo')\n"
+            "def demo():\n"
+            "    return 1\n"
+            "demo()\n")
+    env = dict(os.environ, SERIES_TRACE='1', PYTHONPATH=os.path.dirname(Metrics.__file__))
+    env.pop('SERIES_METRICS', None)
+    env.pop('SERIES_PROFILE', None)
+    result = subprocess.run([sys.executable, '-c', code], env=env, capture_output=True, text=True, check=True)
+    assert result.stderr.startswith('[metrics] demo ')
+
+def test_calls_from_several_threads(metrics):
+    @metrics.instrumented('inner')
+    def inner():
+        metrics.count_bytes('inner', read=1)
+
+    @metrics.instrumented('outer')
+    def outer():
+        for _ in range(200):
+            inner()
+
+    threads = [threading.Thread(target=outer) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    outer()
+
+    figures = metrics.snapshot()
+    assert figures['outer']['calls'] == 5
+    assert figures['inner']['calls'] == 1000 and figures['inner']['bytes_read'] == 1000
+    assert not metrics.profiling.locked()
+    assert 'outer' in metrics.export_text()
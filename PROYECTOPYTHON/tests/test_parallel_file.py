@@ -0,0 +1,60 @@
+import csv
+import random
+import shutil
+import pytest
+import ParallelFile
+from ParallelFile import chunk_ranges, iter_row_chunks_parallel
+from Series import Series
+from SerializeFile import iter_rows_csv, iter_rows_pandas
+from SortFile import sort_file
+
+# Function to write a CSV file with awkward values: quoted newlines and quotes, commas, non-ASCII
+# text, all-digit names and empty cells
+def write_catalogue(path, count=300):
+    rng = random.Random(7)
+    names = ['Plain', 'With, comma', 'Two\nlines', 'Say "hi"', 'Ñandú', '007', '', 'NA']
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(Series.headings)
+        for i in range(1, count + 1):
+            writer.writerow([i, f'{rng.choice(names)} {i % 7}' if i % 5 else rng.choice(names),
+                             f'{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/{rng.randint(1990, 2020)}',
+                             rng.randint(0, 9), rng.choice(['Ann', 'Bob', '', 'Çelik']), i, rng.choice([0, 0, -1])])
+
+def test_ranges_end_on_record_boundaries(work_dir):
+    write_catalogue('series.csv')
+    ranges = chunk_ranges('series.csv', 9)
+    assert len(ranges) >= 9
+    assert all(end == start for (_, end), (start, _) in zip(ranges, ranges[1:]))
+    rows = [row for start, end in ranges for row in ParallelFile.read_range_rows('series.csv', start, end)]
+    assert [ParallelFile.parse_row(row) for row in rows] == list(iter_rows_csv('series.csv'))
+
+def test_parallel_rows_equal_serial_rows(work_dir):
+    write_catalogue('series.csv')
+    parallel = [list(row) for rows in iter_row_chunks_parallel('series.csv', workers=2) for row in rows]
+    assert parallel == list(iter_rows_csv('series.csv'))
+
+def test_pandas_rows_equal_csv_rows(work_dir):
+    pytest.importorskip('pandas')
+    write_catalogue('series.csv')
+    assert list(iter_rows_pandas('series.csv', 64)) == list(iter_rows_csv('series.csv'))
+
+@pytest.mark.parametrize('columns, descending', [
+    (['Director', 'Season'], False),
+    ([('Season', True), 'DateCreation'], False),
+    (['Name'], True),
+])
+def test_parallel_sort_equals_serial_sort(work_dir, monkeypatch, columns, descending):
+    write_catalogue('series.csv')
+    shutil.copy('series.csv', 'memory.csv')
+    shutil.copy('series.csv', 'external.csv')
+    sort_file('memory.csv', columns, descending, workers=1)
+    sort_file('external.csv', columns, descending, in_memory_limit=0, run_rows=17, workers=1)
+    monkeypatch.setattr(ParallelFile, 'PARALLEL_MIN_SIZE', 0)
+    sort_file('series.csv', columns, descending, workers=2)
+
+    with open('memory.csv', 'rb') as f:
+        expected = f.read()
+    for path in ('external.csv', 'series.csv'):
+        with open(path, 'rb') as f:
+            assert f.read() == expected
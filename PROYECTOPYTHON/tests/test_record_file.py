@@ -0,0 +1,53 @@
+import csv
+import pytest
+from conftest import make_series
+from RecordFile import (HEADER_SIZE, RECORD_SIZE, create_record_file, write_series_record,
+                        write_series_records, read_series_record, erase_series_record,
+                        iter_series_records, convert_csv_to_records)
+from Series import Series
+
+def test_records_round_trip_by_pos_file(work_dir):
+    create_record_file('series.dat')
+    write_series_records('series.dat', [make_series(1, 'Dark', director='Baran bo Odar'),
+                                        make_series(2, 'Ñandú', posFile=4)])
+    assert read_series_record('series.dat', 1) == [1, 'Dark', '01/01/2000', 1, 'Baran bo Odar', 1, 0]
+    assert read_series_record('series.dat', 4) == [2, 'Ñandú', '01/01/2000', 1, 'Director', 4, 0]
+    # Slots in between were never written, and nothing is stored past the last record
+    assert read_series_record('series.dat', 2) is None
+    assert read_series_record('series.dat', 9) is None
+    with open('series.dat', 'rb') as f:
+        assert len(f.read()) == HEADER_SIZE + 4 * RECORD_SIZE
+
+    # Rewriting in place leaves the size unchanged
+    write_series_record('series.dat', make_series(1, 'Dark (2017)', posFile=1))
+    erase_series_record('series.dat', 4)
+    assert [row[:2] + row[5:] for row in iter_series_records('series.dat')] == [
+        [1, 'Dark (2017)', 1, 0], [2, 'Ñandú', 4, -1]]
+    with open('series.dat', 'rb') as f:
+        assert len(f.read()) == HEADER_SIZE + 4 * RECORD_SIZE
+
+def test_invalid_records_and_files_are_rejected(work_dir):
+    create_record_file('series.dat')
+    with pytest.raises(ValueError):
+        write_series_record('series.dat', make_series(1, 'x' * 101))
+    with pytest.raises(ValueError):
+        write_series_record('series.dat', make_series(1, posFile=0))
+    with pytest.raises(ValueError):
+        erase_series_record('series.dat', 3)
+
+    with open('other.dat', 'wb') as f:
+        f.write(b'NOTSERIES' + bytes(RECORD_SIZE))
+    with pytest.raises(ValueError):
+        list(iter_series_records('other.dat'))
+
+def test_convert_csv_to_records(work_dir):
+    with open('series.csv', 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(Series.headings)
+        writer.writerow([7, 'Lost', '22/09/2004', 6, 'J. J. Abrams', 2, 0])
+        writer.writerow([])
+        writer.writerow([3, 'Fargo', '15/04/2014', 5, 'Noah Hawley', 1, -1])
+    assert convert_csv_to_records('series.csv', 'series.dat') == 2
+    assert list(iter_series_records('series.dat')) == [
+        [3, 'Fargo', '15/04/2014', 5, 'Noah Hawley', 1, -1],
+        [7, 'Lost', '22/09/2004', 6, 'J. J. Abrams', 2, 0]]
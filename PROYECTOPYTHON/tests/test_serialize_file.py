@@ -0,0 +1,54 @@
+import csv
+import pytest
+import SerializeFile
+from conftest import make_series
+from Series import Series
+from SerializeFile import iter_series, read_series_records
+from SeriesCollection import SeriesCollection
+
+ROWS = [make_series(i, director='Ann' if i % 2 else 'Bob').to_row() for i in range(1, 8)]
+
+@pytest.fixture
+def catalogue(work_dir):
+    with open('series.csv', 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(Series.headings)
+        writer.writerows(ROWS[:3])
+        # Blank lines are skipped
+        writer.writerow([])
+        writer.writerows(ROWS[3:])
+    return 'series.csv'
+
+@pytest.fixture
+def no_pandas(monkeypatch):
+    monkeypatch.setattr(SerializeFile, 'pandas_module', False)
+
+def test_iter_series(catalogue, no_pandas):
+    series = list(iter_series(catalogue))
+    assert all(isinstance(s, Series) for s in series)
+    assert [s.to_row() for s in series] == ROWS
+
+def test_iter_series_in_chunks(catalogue, no_pandas):
+    chunks = list(iter_series(catalogue, chunk_size=3))
+    assert [len(chunk) for chunk in chunks] == [3, 3, 1]
+    assert [s.to_row() for chunk in chunks for s in chunk] == ROWS
+
+def test_pandas_is_optional(catalogue, no_pandas):
+    # Without pandas the csv module is used, unless pandas is asked for explicitly
+    assert [s.ID for s in iter_series(catalogue, use_pandas=None)] == list(range(1, 8))
+    # The generator is lazy: the error comes with the first row
+    rows = iter_series(catalogue, use_pandas=True)
+    with pytest.raises(ImportError):
+        next(rows)
+
+def test_pandas_gives_the_same_series(catalogue):
+    pytest.importorskip('pandas')
+    assert [s.to_row() for s in iter_series(catalogue, use_pandas=True)] == ROWS
+    assert [[s.to_row() for s in chunk] for chunk in iter_series(catalogue, chunk_size=4, use_pandas=True)] == [
+        ROWS[:4], ROWS[4:]]
+
+def test_missing_record_file_is_an_empty_catalogue(work_dir, capsys):
+    series_list = SeriesCollection([make_series(1)])
+    read_series_records('series.dat', series_list)
+    assert len(series_list) == 0
+    assert capsys.readouterr().out == ''
@@ -0,0 +1,63 @@
+import os
+import subprocess
+import sys
+import pytest
+from SeriesCLI import main
+from SeriesEngine import load_series
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Function to run the command line on a catalogue of the test folder; returns (exit code, output)
+def run(capsys, *argv):
+    code = main(['--file', 'series.csv', *argv])
+    return code, capsys.readouterr()
+
+@pytest.fixture
+def catalogue(capsys):
+    for row in (['1', 'Lost', '22/09/2004', '6', 'J. J. Abrams', '1'],
+                ['2', 'Fargo', '15/04/2014', '5', 'Noah Hawley', '2'],
+                ['3', 'Legion', '08/02/2017', '3', 'Noah Hawley', '3']):
+        assert run(capsys, 'add', *row)[0] == 0
+    return 'series.csv'
+
+def test_add_and_load(catalogue, capsys):
+    code, out = run(capsys, 'load')
+    assert code == 0
+    assert out.out.splitlines()[0] == str(load_series(catalogue).find_by_id(1))
+    assert len(out.out.splitlines()) == 3
+
+def test_modify_and_delete(catalogue, capsys):
+    assert run(capsys, 'modify', '2', '--name', 'Fargo (2014)', '--posFile', '7')[0] == 0
+    assert run(capsys, 'delete', '1')[0] == 0
+    series_list = load_series(catalogue)
+    assert sorted(s.ID for s in series_list) == [2, 3]
+    assert (series_list.find_by_id(2).name, series_list.find_by_id(2).posFile) == ('Fargo (2014)', 7)
+
+def test_search(catalogue, capsys):
+    code, out = run(capsys, 'search', 'hawley', 'season:4-5')
+    assert code == 0 and [line.split(',')[0] for line in out.out.splitlines()] == ['Series(ID=2']
+    assert len(run(capsys, 'search', 'Noah')[1].out.splitlines()) == 2
+    assert run(capsys, 'search', 'oah', '--prefix')[1].out == ''
+    assert len(run(capsys, 'search', 'Noah', '--limit', '1')[1].out.splitlines()) == 1
+
+def test_exit_codes(catalogue, capsys):
+    # Invalid values and duplicates: error message and exit code 1, nothing written
+    code, out = run(capsys, 'add', '12a', 'Bad', '01/01/2000', '1', 'X', '9')
+    assert code == 1 and out.err.startswith('Error: Invalid ID format')
+    assert run(capsys, 'add', '1', 'Again', '01/01/2000', '1', 'X', '9')[0] == 1
+    assert len(load_series(catalogue)) == 3
+    # Unknown series and bad arguments are usage errors (exit code 2)
+    with pytest.raises(SystemExit) as exit_info:
+        run(capsys, 'delete', '99')
+    assert exit_info.value.code == 2
+    with pytest.raises(SystemExit) as exit_info:
+        run(capsys, 'sort', 'Rating')
+    assert exit_info.value.code == 2
+
+def test_module_entry_point(catalogue):
+    result = subprocess.run([sys.executable, '-m', 'SeriesCLI', '--file', 'series.csv', 'load'],
+                            capture_output=True, text=True, env=dict(os.environ, PYTHONPATH=APP_DIR), timeout=60)
+    assert result.returncode == 0 and len(result.stdout.splitlines()) == 3
+    result = subprocess.run([sys.executable, '-m', 'SeriesCLI', '--file', 'series.csv', 'delete', '99'],
+                            capture_output=True, text=True, env=dict(os.environ, PYTHONPATH=APP_DIR), timeout=60)
+    assert result.returncode == 2
@@ -0,0 +1,117 @@
+import pytest
+from conftest import make_series
+from SeriesCollection import SeriesCollection, TombstoneBitmap, index_key
+from SeriesEngine import find_series_by_id, find_series_by_pos
+
+@pytest.fixture
+def collection():
+    return SeriesCollection([make_series(i, director='Ann' if i % 2 else 'Bob') for i in range(1, 11)])
+
+def test_indexes(collection):
+    assert collection.find_by_id('3').ID == 3
+    assert collection.find_by_pos(7) is collection.find_by_id(7)
+    assert [s.ID for s in collection.find_by_director('Bob')] == [2, 4, 6, 8, 10]
+    assert collection.find_by_datecreation('01/01/2000') == list(collection)
+
+    series = collection.find_by_id(2)
+    collection.modify(series, ID=20, posFile=200, director='Ann')
+    assert collection.find_by_id(2) is None and collection.find_by_id(20) is series
+    assert collection.find_by_pos(2) is None and collection.find_by_pos(200) is series
+    assert series in collection.find_by_director('Ann') and series not in collection.find_by_director('Bob')
+
+def test_ids_typed_as_text_hit_the_same_entry(collection):
+    assert index_key('7') == 7 and index_key(' 7') == 7 and index_key('7a') == '7a'
+    assert collection.find_by_pos('7') is collection.find_by_id(7)
+    # The engine lookups use the indexes of a collection and scan plain lists
+    assert find_series_by_id(collection, '4') is collection.find_by_id(4)
+    assert find_series_by_pos(list(collection), 4) is collection.find_by_id(4)
+
+def test_extend_indexes_like_append():
+    appended = SeriesCollection()
+    for i in range(1, 6):
+        appended.append(make_series(i, director=f'D{i % 2}'))
+    extended = SeriesCollection()
+    extended.extend(make_series(i, director=f'D{i % 2}') for i in range(1, 6))
+    assert extended.by_id.keys() == appended.by_id.keys() and extended.by_pos.keys() == appended.by_pos.keys()
+    assert ([s.ID for s in extended.find_by_director('D1')] == [s.ID for s in appended.find_by_director('D1')]
+            == [1, 3, 5])
+
+def test_secondary_indexes_are_optional(collection):
+    plain = SeriesCollection([make_series(1)], secondary=())
+    with pytest.raises(ValueError):
+        plain.find_by_director('Director')
+    with pytest.raises(ValueError):
+        SeriesCollection(secondary=('name',))
+
+    collection.clear()
+    assert len(collection) == 0 and collection.find_by_id(1) is None
+    assert collection.find_by_director('Ann') == []
+    collection.append(make_series(1))
+    assert collection.find_by_pos(1).ID == 1
+
+def test_unique_id_and_posfile(collection):
+    with pytest.raises(ValueError):
+        collection.append(make_series(3, posFile=99))
+    with pytest.raises(ValueError):
+        collection.append(make_series(99, posFile=3))
+    with pytest.raises(ValueError):
+        collection.extend([make_series(11), make_series(12, posFile=11)])
+    with pytest.raises(ValueError):
+        collection.modify(collection.find_by_id(1), posFile=2)
+    assert len(collection) == 11 and collection.find_by_id(1).posFile == 1
+
+def test_removed_series_are_tombstoned(collection):
+    for i in (2, 5, 9):
+        collection.remove(collection.find_by_id(i))
+    assert len(collection) == 7 and len(collection.items) == 10
+    assert [s.ID for s in collection] == [1, 3, 4, 6, 7, 8, 10]
+    assert [collection[i].ID for i in range(len(collection))] == [1, 3, 4, 6, 7, 8, 10]
+    assert collection[-1].ID == 10
+    # A positional read does not compact the list
+    assert len(collection.tombstones) == 3 and len(collection.items) == 10
+    assert collection.find_by_id(5) is None and collection.find_by_pos(5) is None
+    with pytest.raises(ValueError):
+        collection.remove(make_series(5))
+
+    collection.append(make_series(11))
+    assert collection[-1].ID == 11
+
+def test_compaction_keeps_posfile(collection):
+    for i in (1, 2):
+        collection.remove(collection.find_by_id(i))
+    collection.compact_if_needed()
+    assert len(collection.items) == 10
+    collection.remove(collection.find_by_id(3))
+    collection.compact_if_needed()
+    assert len(collection.items) == 7 and not collection.tombstones
+    assert [(s.ID, s.posFile) for s in collection] == [(i, i) for i in range(4, 11)]
+
+def test_removed_posfile_can_be_used_again(collection):
+    collection.remove(collection.find_by_id(4))
+    collection.append(make_series(40, posFile=4))
+    assert not collection.tombstones
+    assert [s.ID for s in collection] == [1, 2, 3, 5, 6, 7, 8, 9, 10, 40]
+    collection.remove(collection.find_by_id(5))
+    collection.modify(collection.find_by_id(40), posFile=5)
+    assert collection.find_by_pos(5).ID == 40 and len(collection) == 9
+
+def test_purge_and_renumber(collection):
+    collection.remove(collection.find_by_id(1))
+    collection.modify(collection.find_by_id(2), erased=-1)
+    removed = collection.purge()
+    assert [s.ID for s in removed] == [2] and len(collection) == 8
+    assert collection.find_by_director('Bob')[0].ID == 4
+
+    collection.renumber()
+    assert [(s.ID, s.posFile) for s in collection] == [(i, i - 2) for i in range(3, 11)]
+    assert collection.find_by_pos(1).ID == 3 and collection.find_by_pos(9) is None
+
+def test_tombstone_bitmap():
+    tombstones = TombstoneBitmap()
+    for pos in (0, 7, 8, 100000, -1, 'x', 1 << 40, 7):
+        tombstones.add(pos)
+    assert len(tombstones) == 7
+    assert all(pos in tombstones for pos in (0, 7, 8, 100000, -1, 'x', 1 << 40))
+    assert not any(pos in tombstones for pos in (1, 9, 99999, 'y', 200000))
+    tombstones.clear()
+    assert len(tombstones) == 0 and 7 not in tombstones
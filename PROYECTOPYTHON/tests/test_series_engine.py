@@ -0,0 +1,47 @@
+import pytest
+from conftest import make_series
+from SeriesCollection import SeriesCollection
+from SeriesEngine import (load_series, save_series_list, delete_series_file, purge_series,
+                          purge_if_needed, create_series, series_values_error)
+from Storage import close_storages, get_storage
+
+@pytest.mark.parametrize('value, valid', [('7', True), ('123', True), ('1234', False), ('12a', False), ('', False)])
+def test_id_validation_matches_the_whole_value(value, valid):
+    assert (series_values_error(value, 'Name', '01/01/2000', '1') is None) == valid
+
+def test_create_series_rejects_a_used_id(work_dir):
+    series_list = SeriesCollection()
+    create_series('series.csv', series_list, '1', 'Lost', '22/09/2004', '6', 'Abrams', 1)
+    with pytest.raises(ValueError):
+        create_series('series.csv', series_list, '1', 'Other', '22/09/2004', '1', 'X', 2)
+    close_storages()
+    assert [s.name for s in load_series('series.csv')] == ['Lost']
+
+@pytest.mark.parametrize('file', ['series.csv', 'series.dat', 'series.db'])
+def test_deletes_purge_automatically_and_keep_posfile(work_dir, file):
+    save_series_list(file, SeriesCollection([make_series(i, posFile=i * 10) for i in range(1, 9)]))
+    series_list = load_series(file)
+    delete_series_file(file, series_list, series_list.find_by_id(1))
+    assert get_storage(file).dead == 1 and not purge_if_needed(file, series_list)
+    # 2 dead rows of 8 reach PURGE_RATIO: the file is purged, with the PosFile values kept
+    delete_series_file(file, series_list, series_list.find_by_id(2))
+    assert get_storage(file).dead == 0
+    expected = [(i, i * 10) for i in range(3, 9)]
+    assert [(s.ID, s.posFile) for s in series_list] == expected
+    close_storages()
+    reloaded = load_series(file)
+    assert [(s.ID, s.posFile) for s in reloaded if not s.erased] == expected
+    assert not any(s.erased for s in reloaded)
+
+@pytest.mark.parametrize('file, renumbered', [('series.csv', True), ('series.dat', True), ('series.db', False)])
+def test_explicit_purge_renumbers_posfile(work_dir, file, renumbered):
+    save_series_list(file, SeriesCollection([make_series(i, posFile=i * 10) for i in range(1, 9)]))
+    series_list = load_series(file)
+    delete_series_file(file, series_list, series_list.find_by_id(2))
+    purge_series(file, series_list)
+
+    expected = [(i, p) for p, i in enumerate([1, 3, 4, 5, 6, 7, 8], 1)] if renumbered else \
+        [(i, i * 10) for i in (1, 3, 4, 5, 6, 7, 8)]
+    assert [(s.ID, s.posFile) for s in series_list] == expected
+    close_storages()
+    assert [(s.ID, s.posFile) for s in load_series(file)] == expected
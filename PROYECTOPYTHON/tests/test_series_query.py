@@ -0,0 +1,51 @@
+import pytest
+from conftest import make_series
+from SeriesCollection import SeriesCollection
+from SeriesQuery import SeriesQuery, parse_search
+
+@pytest.fixture
+def query():
+    series_list = SeriesCollection([
+        make_series(1, 'The Walking Dead', '31/10/2010', 11, 'Frank Darabont'),
+        make_series(2, 'Walking Tall', '01/01/2004', 1, 'Kevin Bray'),
+        make_series(3, 'Dead Like Me', '27/06/2003', 2, 'Bryan Fuller'),
+        make_series(4, 'Breaking Bad', '20/01/2008', 5, 'Vince Gilligan'),
+        make_series(5, 'Better Call Saul', '08/02/2015', 6, 'Vince Gilligan'),
+    ])
+    return SeriesQuery(series_list)
+
+def ids(results):
+    return [series.ID for series in results]
+
+def test_prefix_matches_the_start_of_the_value(query):
+    assert ids(query.search(name='walking', match='prefix')) == [2]
+    assert ids(query.search(name='the walk', match='prefix')) == [1]
+    assert ids(query.search(director='vince', match='prefix')) == [4, 5]
+
+def test_substring_of_several_words_keeps_their_order(query):
+    assert ids(query.search(name='walking dead')) == [1]
+    assert ids(query.search(name='dead walking')) == []
+    assert ids(query.search(name='alking')) == [1, 2]
+
+def test_text_words_match_name_or_director(query):
+    assert ids(query.search(text='dead fuller')) == [3]
+    assert ids(query.search(text='gilligan')) == [4, 5]
+
+def test_ranges_and_combined_filters(query):
+    assert ids(query.search(season_min=5, season_max=6)) == [4, 5]
+    assert ids(query.search(date_from='01/01/2005', date_to='31/12/2010')) == [1, 4]
+    assert ids(query.search(director='gilligan', season_min=6)) == [5]
+    with pytest.raises(ValueError):
+        query.search(date_from='2010-01-01')
+
+def test_index_follows_the_collection(query):
+    series_list = query.series_list
+    series_list.remove(series_list.find_by_id(1))
+    assert ids(query.search(name='walking')) == [2]
+    series_list.modify(series_list.find_by_id(2), name='Running Tall')
+    assert ids(query.search(name='walking')) == []
+    assert ids(query.search(name='running', match='prefix')) == [2]
+
+def test_parse_search():
+    assert parse_search('dead season:2-3 director:fuller') == {
+        'season_min': '2', 'season_max': '3', 'director': 'fuller', 'text': 'dead'}
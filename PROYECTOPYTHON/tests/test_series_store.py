@@ -0,0 +1,42 @@
+import os
+from conftest import make_series
+from Journal import get_journal
+from SeriesCollection import SeriesCollection
+from SeriesEngine import save_series_list
+from SerializeFile import read_series_store
+from Series import Series
+from SeriesStore import SeriesStore, SeriesRow
+
+def test_rows_round_trip():
+    store = SeriesStore([make_series(1, datecreation='31/12/1999', director='Ann'),
+                         make_series(2, datecreation='not a date', director='Ann', erased=-1)])
+    assert [row.to_row() for row in store] == [
+        [1, 'Series 1', '31/12/1999', 1, 'Ann', 1, 0],
+        [2, 'Series 2', 'not a date', 1, 'Ann', 2, -1]]
+    assert store.directors == ['Ann']
+
+    row = store[-1]
+    row.name, row.datecreation, row.director, row.season = 'Renamed', '01/02/2003', 'Bob', 4
+    assert store[1].to_row() == [2, 'Renamed', '01/02/2003', 4, 'Bob', 2, -1]
+
+def test_row_view_has_only_its_own_slots():
+    store = SeriesStore([make_series(1), make_series(2)])
+    row = store[0]
+    assert not isinstance(row, Series)
+    assert SeriesRow.__slots__ == ('store', 'row') and not hasattr(row, '__dict__')
+    # It still behaves like a Series for the code that reads rows
+    assert str(row) == str(make_series(1)) and row == make_series(1) and row != store[1]
+    assert row.series_in_pos(1)
+
+def test_read_series_store_applies_the_journal_without_writing(work_dir):
+    save_series_list('series.csv', SeriesCollection([make_series(i) for i in range(1, 4)]))
+    journal = get_journal('series.csv')
+    journal.log_update(make_series(2, 'Renamed'))
+    journal.log_delete(make_series(3))
+    journal.log_add(make_series(4))
+    base = os.stat('series.csv')
+    size = journal.size()
+
+    store = read_series_store('series.csv', use_pandas=False)
+    assert [(row.ID, row.name) for row in store] == [(1, 'Series 1'), (2, 'Renamed'), (4, 'Series 4')]
+    assert os.stat('series.csv').st_mtime_ns == base.st_mtime_ns and journal.size() == size
@@ -0,0 +1,69 @@
+import csv
+import os
+import pytest
+import Snapshot
+from conftest import make_series
+from Series import Series
+from Snapshot import save_snapshot, load_snapshot, snapshot_path, snapshot_header
+
+ROWS = [make_series(i, director='Ann' if i % 2 else 'Bob').to_row() for i in range(1, 21)]
+
+@pytest.fixture
+def catalogue(work_dir, monkeypatch):
+    # Small sample blocks, so a change in the middle of the file is only seen by the full hash
+    monkeypatch.setattr(Snapshot, 'SAMPLE_SIZE', 64)
+    with open('series.csv', 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(Series.headings)
+        writer.writerows(ROWS)
+    assert save_snapshot('series.csv', ROWS)
+    return 'series.csv'
+
+# Function to replace bytes of a file in place, keeping its size
+def patch_file(file, offset, data, keep_mtime=False):
+    stat = os.stat(file)
+    with open(file, 'r+b') as f:
+        f.seek(offset)
+        f.write(data)
+    os.utime(file, ns=(stat.st_atime_ns, stat.st_mtime_ns if keep_mtime else stat.st_mtime_ns + 10**9))
+
+def test_round_trip(catalogue):
+    assert load_snapshot(catalogue) == [list(column) for column in zip(*ROWS)]
+
+def test_stale_when_the_size_changes(catalogue):
+    with open(catalogue, 'a', encoding='utf-8') as f:
+        f.write('21,Series 21,01/01/2000,1,Ann,21,0\n')
+    assert load_snapshot(catalogue) is None
+
+def test_stale_when_the_sampled_blocks_change(catalogue):
+    # Same size and mtime, but the first block differs
+    patch_file(catalogue, len('ID,Name,DateCreation,Season,Director,PosFile,Erased\n1,Series '), b'X',
+               keep_mtime=True)
+    assert load_snapshot(catalogue) is None
+
+def test_stale_when_the_content_hash_changes(catalogue):
+    # Same size and sampled blocks; only the mtime and the full hash tell
+    size = os.path.getsize(catalogue)
+    with open(catalogue, 'rb') as f:
+        middle = f.read().index(b'Series 10')
+    assert 64 < middle < size - 64
+    patch_file(catalogue, middle, b'Xeries')
+    assert load_snapshot(catalogue) is None
+
+def test_touched_file_with_the_same_content_is_reused(catalogue):
+    patch_file(catalogue, 0, b'ID')
+    assert load_snapshot(catalogue) == [list(column) for column in zip(*ROWS)]
+    # The new mtime is stored, so the next load takes the quick check
+    with open(snapshot_path(catalogue), 'rb') as f:
+        mtime = snapshot_header.unpack(f.read(snapshot_header.size))[3]
+    assert mtime == os.stat(catalogue).st_mtime_ns
+
+@pytest.mark.parametrize('row', [
+    ['abc', 'Name', '01/01/2000', 1, 'Ann', 1, 0],
+    [1, 'Name\0with a NUL', '01/01/2000', 1, 'Ann', 1, 0],
+    [1, 'Name', '01/01/2000', 2**70, 'Ann', 1, 0],
+])
+def test_values_that_cannot_be_stored_remove_the_snapshot(catalogue, row):
+    assert save_snapshot(catalogue, ROWS + [row]) is False
+    assert not os.path.exists(snapshot_path(catalogue))
+    assert load_snapshot(catalogue) is None
@@ -0,0 +1,54 @@
+import csv
+import pytest
+from Series import Series
+from SortFile import sort_file
+
+ROWS = [
+    ['10', 'Lost', '22/09/2004', '6', 'Abrams', '1', '0'],
+    ['9', 'Fargo', '15/04/2014', '5', 'Hawley', '2', '0'],
+    ['100', 'Dark', '01/12/2017', '3', 'Odar', '3', '0'],
+    ['2', 'Alias', '30/09/2001', '5', 'Abrams', '4', '0'],
+    ['33', 'Fringe', '09/09/2008', '5', 'Abrams', '5', '0'],
+]
+
+def write_rows(file, rows):
+    with open(file, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(Series.headings)
+        writer.writerows(rows)
+
+def sorted_ids(file, columns, descending=False, **options):
+    write_rows(file, ROWS)
+    sort_file(file, columns, descending, workers=1, **options)
+    with open(file, newline='', encoding='utf-8') as f:
+        reader = csv.reader(f)
+        assert next(reader) == Series.headings
+        return [row[0] for row in reader]
+
+def test_numeric_and_date_columns_sort_by_value(work_dir):
+    # As text '10' < '100' < '2' < '33' < '9'
+    assert sorted_ids('series.csv', ['ID']) == ['2', '9', '10', '33', '100']
+    # As text '01/12/2017' would come first
+    assert sorted_ids('series.csv', ['DateCreation']) == ['2', '10', '33', '9', '100']
+    assert sorted_ids('series.csv', ['Name'], descending=True) == ['10', '33', '9', '100', '2']
+
+def test_mixed_directions(work_dir):
+    # Director ascending, then Season descending, then ID ascending for the ties
+    assert sorted_ids('series.csv', ['Director', ('Season', True), 'ID']) == ['10', '2', '33', '9', '100']
+    assert sorted_ids('series.csv', [('Season', True), 'DateCreation']) == ['10', '2', '33', '9', '100']
+
+def test_external_merge_matches_in_memory_sort(work_dir):
+    for columns in (['ID'], ['Director', ('Season', True), 'ID'], [('DateCreation', True)]):
+        expected = sorted_ids('memory.csv', columns)
+        assert sorted_ids('external.csv', columns, in_memory_limit=0, run_rows=2) == expected
+
+def test_invalid_specs_leave_the_file_untouched(work_dir):
+    write_rows('series.csv', ROWS)
+    with open('series.csv', 'rb') as f:
+        before = f.read()
+    with pytest.raises(ValueError):
+        sort_file('series.csv', ['Rating'])
+    with pytest.raises(ValueError):
+        sort_file('series.csv', [])
+    with open('series.csv', 'rb') as f:
+        assert f.read() == before
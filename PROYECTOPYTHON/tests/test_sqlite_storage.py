@@ -0,0 +1,48 @@
+import sqlite3
+import pytest
+from conftest import make_series
+from SeriesCollection import SeriesCollection
+from SqliteStorage import SqliteStorage
+from Storage import SeriesStorage, get_storage
+
+def test_storage_interface_is_abstract():
+    with pytest.raises(TypeError):
+        SeriesStorage()
+
+def test_single_writes_are_committed_at_once(work_dir):
+    storage = get_storage('series.db')
+    storage.insert(make_series(1))
+    storage.upsert(make_series(1, 'Renamed'))
+
+    # Another connection (another process) sees the write and can write itself
+    other = sqlite3.connect('series.db', timeout=0)
+    assert other.execute('SELECT name FROM series').fetchall() == [('Renamed',)]
+    other.execute("UPDATE series SET season = 3")
+    other.commit()
+    other.close()
+    assert storage.get_by_id(1).season == 3
+
+def test_failed_batch_is_rolled_back(work_dir):
+    storage = get_storage('series.db')
+    storage.insert(make_series(1))
+    with pytest.raises(ValueError):
+        storage.insert_many([make_series(2), make_series(3, posFile=1)])
+    assert storage.get_by_id(2) is None
+    # A failed single write does not keep a transaction open either
+    with pytest.raises(ValueError):
+        storage.insert(make_series(1))
+    assert not storage.connection.in_transaction
+
+def test_round_trip_sort_and_purge(work_dir):
+    storage = get_storage('series.db')
+    storage.insert_many([make_series(1, season=3), make_series(2, season=1), make_series(3, season=2)])
+    storage.sort(['Season'])
+    storage.tombstone(make_series(2))
+    series_list = SeriesCollection()
+    storage.load(series_list)
+    assert [s.ID for s in series_list] == [3, 1]
+
+    storage.purge(series_list)
+    reopened = SqliteStorage('series.db')
+    assert reopened.get_by_id(2) is None and reopened.order() == (['Season'], False)
+    reopened.close()
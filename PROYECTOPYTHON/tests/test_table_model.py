@@ -0,0 +1,57 @@
+from conftest import make_series
+from SeriesCollection import SeriesCollection
+from TableModel import TableModel, get_color
+
+def make_model(count, page_size=10):
+    return TableModel(SeriesCollection([make_series(i) for i in range(1, count + 1)]), page_size)
+
+def test_paging_is_clamped_to_the_existing_pages():
+    model = make_model(25)
+    assert model.page_count() == 3
+    assert [row[0] for row in model.rows()] == list(range(1, 11))
+    model.scroll(1)
+    assert [row[0] for row in model.rows()] == list(range(11, 21))
+    model.scroll(5)
+    assert model.page() == 2 and [row[0] for row in model.rows()] == list(range(21, 26))
+    model.scroll(-9)
+    assert model.page() == 0
+    # An empty list still has one (empty) page
+    assert make_model(0).page_count() == 1 and make_model(0).rows() == []
+
+def test_clamp_after_deletes_and_a_shorter_search_result():
+    model = make_model(25)
+    model.go_to_page(2)
+    for series in list(model.series_list)[15:]:
+        model.series_list.remove(series)
+    model.clamp()
+    assert model.page() == 1 and [row[0] for row in model.rows()] == list(range(11, 16))
+
+    model.series_list = [make_series(3), make_series(4)]
+    model.clamp()
+    assert model.page() == 0 and [row[0] for row in model.rows()] == [3, 4]
+
+def test_erased_series_are_not_shown():
+    model = make_model(5)
+    model.series_list[1].erased = -1
+    assert [row[0] for row in model.rows()] == [1, 3, 4, 5]
+    assert not model.is_visible(model.series_list[1]) and model.is_visible(model.series_list[2])
+
+def test_page_label_and_series_at():
+    model = make_model(25)
+    model.scroll(1)
+    assert model.page_label() == 'Page 2 of 3 (25 series)'
+    model.rows()
+    assert model.series_at(0).ID == 11 and model.series_at(9).ID == 20
+    assert model.series_at(10) is None and model.series_at(-1) is None
+
+    # It keeps answering with the rows last sent, even if the list changed since
+    model.series_list.remove(model.series_list.find_by_id(11))
+    assert model.series_at(0).ID == 11
+
+def test_row_colors_follow_the_whole_catalogue():
+    model = make_model(25)
+    model.go_to_page(1)
+    model.rows()
+    colors = model.row_colors()
+    assert len(colors) == 10
+    assert colors[0] == (0, get_color(10, 25)) and colors[-1] == (9, get_color(19, 25))
@@ -0,0 +1,71 @@
+import queue
+import threading
+import pytest
+from conftest import make_series
+from SeriesCollection import SeriesCollection
+from Worker import StorageWorker, LoadProgress, JOB_PROGRESS, JOB_DONE
+
+@pytest.fixture
+def events():
+    return queue.Queue()
+
+@pytest.fixture
+def worker(events):
+    worker = StorageWorker(lambda key, value: events.put((key, value)))
+    yield worker
+    if worker.thread.is_alive():
+        worker.stop()
+
+# Function to get the next event posted by the worker
+def next_event(events):
+    return events.get(timeout=10)
+
+def test_jobs_run_in_submit_order(worker, events):
+    done = []
+    for i in range(5):
+        worker.submit(f'Job {i}', done.append, i)
+    names = [next_event(events)[1].name for _ in range(5)]
+    assert names == [f'Job {i}' for i in range(5)] and done == list(range(5))
+
+def test_error_is_kept_in_the_job(worker, events):
+    def fail():
+        raise ValueError('Invalid ID format.')
+    failed = worker.submit('Add', fail)
+    ok = worker.submit('Load', lambda: 42)
+    assert next_event(events) == (JOB_DONE, failed)
+    assert isinstance(failed.error, ValueError) and failed.status() == 'Add failed: Invalid ID format.'
+    # The thread keeps running the next jobs
+    assert next_event(events) == (JOB_DONE, ok)
+    assert ok.error is None and ok.result == 42 and ok.status().startswith('Load done in')
+
+def test_busy_until_the_queue_is_empty(worker, events):
+    release = threading.Event()
+    worker.submit('Slow', release.wait, 10)
+    worker.submit('Next', lambda: None)
+    assert worker.busy()
+    release.set()
+    next_event(events)
+    next_event(events)
+    assert not worker.busy()
+
+def test_progress_events(worker, events):
+    def load(job):
+        series_list = SeriesCollection()
+        series_list.listeners.append(LoadProgress(job, every=2))
+        series_list.extend(make_series(i) for i in range(1, 6))
+        return len(series_list)
+    job = worker.submit('Load', load, progress=True)
+    assert [next_event(events) for _ in range(3)] == [
+        (JOB_PROGRESS, ('Load', 2, None)), (JOB_PROGRESS, ('Load', 4, None)), (JOB_DONE, job)]
+    assert job.result == 5
+
+def test_stop_runs_its_callback_after_the_queue(worker, events):
+    release = threading.Event()
+    order = []
+    worker.submit('Slow', lambda: (release.wait(10), order.append('slow')))
+    worker.submit('Write', order.append, 'write')
+    release.set()
+    worker.stop(lambda: order.append('final'))
+    assert order == ['slow', 'write', 'final']
+    assert not worker.thread.is_alive()
+    assert [next_event(events)[1].name for _ in range(3)] == ['Slow', 'Write', 'Stop']